@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Run the command line interface with python -m easyp2p, see p2p_cli."""
+
+import sys
+
+from easyp2p.p2p_cli import main
+
+sys.exit(main())
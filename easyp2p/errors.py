@@ -4,9 +4,9 @@
 Module providing error messages common to all supported P2P platforms.
 """
 
-from PyQt5.QtCore import QCoreApplication
+from easyp2p import p2p_qt
 
-_translate = QCoreApplication.translate
+_translate = p2p_qt.translate
 
 CHROME_NOT_FOUND = _translate(
     'P2PChrome', 'Either Chrome or Chromium must be installed to evaluate '
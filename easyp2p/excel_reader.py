@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module for reading account statements of P2P platforms from Excel files.
+
+By default xlsx files are read with pandas.read_excel. The optional streaming
+engine parses the worksheet XML row by row with lxml and keeps only the cell
+values. The cells are converted with the rules of openpyxl and the rows are
+passed to the same TextParser as used by pandas.read_excel. The pinned pandas
+version reads xlsx files with xlrd though, whose results may differ in edge
+cases, thus the streaming engine must be enabled explicitly.
+
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+import logging
+import re
+from typing import (
+    Callable, Dict, FrozenSet, IO, List, Mapping, Optional, Tuple, Union)
+import zipfile
+
+from lxml import etree
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+logger = logging.getLogger('easyp2p.excel_reader')
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_DOC_REL_NS = \
+    '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = \
+    '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_ROW_TAG = _MAIN_NS + 'row'
+_CELL_TAG = _MAIN_NS + 'c'
+_VALUE_TAG = _MAIN_NS + 'v'
+_INLINE_STRING_TAG = _MAIN_NS + 'is'
+_TEXT_TAG = _MAIN_NS + 't'
+_RICH_TEXT_TAG = _MAIN_NS + 'r'
+
+_WINDOWS_EPOCH = datetime(1899, 12, 30)
+_MAC_EPOCH = datetime(1904, 1, 1)
+
+# Built-in number formats which represent dates/times, see ECMA-376 18.8.30
+_BUILTIN_DATE_FORMATS = frozenset((*range(14, 23), 45, 46, 47))
+_BUILTIN_TIMEDELTA_FORMATS = frozenset((46,))
+# Same rules as used by openpyxl for custom number formats
+_STRIP_RE = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_DATE_RE = re.compile(r'(?<![_\\])[dmhysDMHYS]')
+_TIMEDELTA_RE = re.compile(
+    r'\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?', re.I)
+
+Cell = Union[str, int, float, bool, datetime, time, timedelta]
+
+
+@dataclass(frozen=True)
+class _Workbook:
+    """Workbook wide data which is needed for converting the cells."""
+    # Shared strings table of the workbook
+    shared_strings: List[str]
+    # Indices of cell styles with date formats
+    date_styles: FrozenSet[int]
+    # Indices of cell styles with time delta formats
+    timedelta_styles: FrozenSet[int]
+    # Start date for the conversion of dates
+    epoch: datetime
+
+
+def read_xlsx_streaming(
+        input_file: str, header: int = 0, skipfooter: int = 0,
+        usecols: Optional[Callable[[str], bool]] = None,
+        dtype: Optional[Mapping[str, str]] = None) -> pd.DataFrame:
+    """
+    Read the first worksheet of an xlsx file row by row.
+
+    Args:
+        input_file: File name including path.
+        header: Row number to use as column names and start of data.
+        skipfooter: Rows to skip at the end of the worksheet.
+        usecols: Columns which will be read. If None, all columns will be read.
+        dtype: Dictionary with data types of the columns.
+
+    Returns:
+        DataFrame with the same content as pandas.read_excel would return
+        with openpyxl.
+
+    Raises:
+        ValueError: If input_file is not a valid xlsx file.
+
+    """
+    try:
+        with zipfile.ZipFile(input_file) as archive:
+            sheet_path, workbook = _read_workbook(archive)
+            with archive.open(sheet_path) as sheet:
+                data = _read_rows(sheet, workbook)
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as err:
+        raise ValueError(f'{input_file} is not a valid xlsx file!') from err
+
+    if not data:
+        return pd.DataFrame()
+
+    parser = TextParser(
+        data, header=header, skipfooter=skipfooter, usecols=usecols,
+        dtype=dtype, skip_blank_lines=False)
+    return parser.read()
+
+
+XLSX_ENGINES: Dict[str, Callable[..., pd.DataFrame]] = {
+    'pandas': pd.read_excel,
+    'streaming': read_xlsx_streaming,
+}
+# The streaming engine is opt-in until it is shown to give the same results as
+# the xlrd reader of the pinned pandas version
+DEFAULT_XLSX_ENGINE = 'pandas'
+
+
+def read_xlsx(
+        input_file: str, engine: Optional[str] = None,
+        **kwargs) -> pd.DataFrame:
+    """
+    Read an xlsx file with the given engine.
+
+    Args:
+        input_file: File name including path.
+        engine: Name of the engine in XLSX_ENGINES. If None,
+            DEFAULT_XLSX_ENGINE will be used.
+        **kwargs: Keyword arguments for the engine: header, skipfooter,
+            usecols and dtype.
+
+    Returns:
+        DataFrame which was read from the file.
+
+    Raises:
+        KeyError: If engine is unknown.
+
+    """
+    reader = XLSX_ENGINES[engine or DEFAULT_XLSX_ENGINE]
+    logger.debug('Reading %s with %s.', input_file, reader.__name__)
+    return reader(input_file, **kwargs)
+
+
+def _read_workbook(archive: zipfile.ZipFile) -> Tuple[str, _Workbook]:
+    """
+    Get the location of the first worksheet and the data for converting its
+    cells.
+
+    Args:
+        archive: The xlsx file.
+
+    Returns:
+        Tuple (worksheet path, workbook data).
+
+    """
+    workbook = etree.fromstring(archive.read('xl/workbook.xml'))
+    properties = workbook.find(_MAIN_NS + 'workbookPr')
+    epoch = _WINDOWS_EPOCH
+    if properties is not None \
+            and properties.get('date1904') in ('1', 'true'):
+        epoch = _MAC_EPOCH
+
+    sheet = workbook.find(f'{_MAIN_NS}sheets/{_MAIN_NS}sheet')
+    if sheet is None:
+        raise KeyError('Workbook contains no worksheet')
+    sheet_id = sheet.get(_DOC_REL_NS + 'id')
+
+    targets = {}
+    rels = etree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(_PKG_REL_NS + 'Relationship'):
+        target = rel.get('Target')
+        target = target[1:] if target.startswith('/') else 'xl/' + target
+        targets[rel.get('Id')] = target
+        if rel.get('Type', '').endswith('/sharedStrings'):
+            targets['sharedStrings'] = target
+
+    shared_strings = _read_shared_strings(
+        archive, targets.get('sharedStrings', 'xl/sharedStrings.xml'))
+    date_styles, timedelta_styles = _read_date_styles(archive)
+    return targets[sheet_id], _Workbook(
+        shared_strings, date_styles, timedelta_styles, epoch)
+
+
+def _read_shared_strings(archive: zipfile.ZipFile, path: str) -> List[str]:
+    """
+    Read the shared strings table.
+
+    Args:
+        archive: The xlsx file.
+        path: Location of the shared strings in archive.
+
+    Returns:
+        List of all shared strings. The list is empty if the file does not
+        contain shared strings.
+
+    """
+    if path not in archive.namelist():
+        return []
+
+    strings = []
+    with archive.open(path) as file:
+        for _, node in etree.iterparse(file, tag=_MAIN_NS + 'si'):
+            strings.append(_get_text(node).replace('x005F_', ''))
+            node.clear()
+    return strings
+
+
+def _get_text(node: etree._Element) -> str:
+    """
+    Get the text of a string item. Phonetic runs are ignored.
+
+    Args:
+        node: si or is element.
+
+    Returns:
+        Concatenated text of all plain and rich text runs.
+
+    """
+    text = []
+    for child in node:
+        if child.tag == _RICH_TEXT_TAG:
+            child = child.find(_TEXT_TAG)
+        elif child.tag != _TEXT_TAG:
+            continue
+        if child is not None and child.text:
+            text.append(child.text)
+    return ''.join(text)
+
+
+def _read_date_styles(
+        archive: zipfile.ZipFile) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+    """
+    Find the cell styles whose number formats are dates or time deltas.
+
+    Args:
+        archive: The xlsx file.
+
+    Returns:
+        Tuple (indices of date styles, indices of time delta styles).
+
+    """
+    try:
+        styles = etree.fromstring(archive.read('xl/styles.xml'))
+    except KeyError:
+        return frozenset(), frozenset()
+
+    custom_formats = {
+        int(fmt.get('numFmtId')): fmt.get('formatCode', '')
+        for fmt in styles.iterfind(f'{_MAIN_NS}numFmts/{_MAIN_NS}numFmt')}
+
+    date_styles, timedelta_styles = set(), set()
+    xfs = styles.iterfind(f'{_MAIN_NS}cellXfs/{_MAIN_NS}xf')
+    for index, xf in enumerate(xfs):
+        format_id = int(xf.get('numFmtId', 0))
+        if format_id in custom_formats:
+            fmt = custom_formats[format_id].split(';')[0]
+            is_date = _DATE_RE.search(_STRIP_RE.sub('', fmt)) is not None
+            is_timedelta = _TIMEDELTA_RE.search(fmt) is not None
+        else:
+            is_date = format_id in _BUILTIN_DATE_FORMATS
+            is_timedelta = format_id in _BUILTIN_TIMEDELTA_FORMATS
+        if is_date:
+            date_styles.add(index)
+        if is_timedelta:
+            timedelta_styles.add(index)
+
+    return frozenset(date_styles), frozenset(timedelta_styles)
+
+
+def _read_rows(sheet: IO[bytes], workbook: _Workbook) -> List[List[Cell]]:
+    """
+    Read the cell values of a worksheet row by row.
+
+    Missing rows and cells are filled with empty strings like pandas does it
+    for openpyxl. Trailing empty cells and rows are removed.
+
+    Args:
+        sheet: Worksheet XML.
+        workbook: Workbook data for converting the cells.
+
+    Returns:
+        List of rows. All rows have the same length.
+
+    """
+    data: List[List[Cell]] = []
+    row_number = 0
+    for _, row in etree.iterparse(sheet, tag=_ROW_TAG):
+        reference = row.get('r')
+        # Like openpyxl ignore rows which are out of order
+        if not reference or int(reference) > row_number:
+            row_number = int(reference) if reference else row_number + 1
+            values = _read_row(row, workbook)
+            # Empty rows are only added if they are followed by data. Some
+            # worksheets contain formatted empty rows up to the last row of
+            # Excel.
+            if values:
+                data.extend([] for _ in range(row_number - len(data) - 1))
+                data.append(values)
+
+        row.clear()
+        while row.getprevious() is not None:
+            del row.getparent()[0]
+
+    if data:
+        max_width = max(len(values) for values in data)
+        for values in data:
+            values.extend([''] * (max_width - len(values)))
+    return data
+
+
+def _read_row(row: etree._Element, workbook: _Workbook) -> List[Cell]:
+    """
+    Read the cell values of a single row.
+
+    Args:
+        row: row element of the worksheet.
+        workbook: Workbook data for converting the cells.
+
+    Returns:
+        Cell values of the row without trailing empty cells.
+
+    """
+    values: List[Cell] = []
+    column = 0
+    for cell in row.iterchildren(_CELL_TAG):
+        reference = cell.get('r')
+        if reference:
+            column = _get_column(reference.rstrip('0123456789'))
+        else:
+            column += 1
+        value = _convert_cell(cell, workbook)
+        if value == '':
+            continue
+        if column > len(values):
+            values.extend([''] * (column - len(values)))
+        values[column - 1] = value
+    return values
+
+
+@lru_cache(maxsize=None)
+def _get_column(letters: str) -> int:
+    """
+    Get the column number from the letters of a cell reference.
+
+    Args:
+        letters: Column letters of a cell reference, e.g. 'AB' for 'AB12'.
+
+    Returns:
+        Column number starting with 1, e.g. 28.
+
+    """
+    column = 0
+    for char in letters.upper():
+        column = column * 26 + ord(char) - 64
+    return column
+
+
+def _convert_cell(cell: etree._Element, workbook: _Workbook) -> Cell:
+    """
+    Convert a cell to the same value as pandas.read_excel does with openpyxl.
+
+    Args:
+        cell: c element of the worksheet.
+        workbook: Workbook data for converting the cells.
+
+    Returns:
+        Cell value. Empty cells are returned as empty strings, errors as NaN.
+
+    """
+    data_type = cell.get('t', 'n')
+    if data_type == 'inlineStr':
+        inline_string = cell.find(_INLINE_STRING_TAG)
+        if inline_string is None:
+            return ''
+        return _get_text(inline_string)
+
+    value = cell.findtext(_VALUE_TAG)
+    if not value:
+        return ''
+    converter = _CONVERTERS.get(data_type)
+    if converter is None:
+        return value
+    return converter(value, cell, workbook)
+
+
+def _convert_number(
+        value: str, cell: etree._Element, workbook: _Workbook) -> Cell:
+    """
+    Convert the value of a numeric cell. Numbers with date formats are
+    converted to dates.
+
+    Args:
+        value: Text of the v element of the cell.
+        cell: c element of the worksheet.
+        workbook: Workbook data for converting the cells.
+
+    Returns:
+        Number or date. Dates which are out of range are returned as NaN.
+
+    """
+    if '.' in value or 'E' in value or 'e' in value:
+        number = float(value)
+    else:
+        number = int(value)
+    style = int(cell.get('s') or 0)
+    if style in workbook.date_styles:
+        try:
+            return _from_excel(
+                number, workbook.epoch, style in workbook.timedelta_styles)
+        except (OverflowError, ValueError):
+            return np.nan
+    if isinstance(number, float) and number.is_integer():
+        return int(number)
+    return number
+
+
+# Converters for the values of the cell data types, see ECMA-376 18.18.11.
+# Values of other data types, e.g. formula strings, are returned unchanged.
+_CONVERTERS: Dict[str, Callable[[str, etree._Element, _Workbook], Cell]] = {
+    'n': _convert_number,
+    's': lambda value, _, workbook: workbook.shared_strings[int(value)],
+    'b': lambda value, *_: bool(int(value)),
+    'e': lambda *_: np.nan,
+    'd': lambda value, *_: pd.Timestamp(value).to_pydatetime(),
+}
+
+
+def _from_excel(
+        value: Union[int, float], epoch: datetime,
+        is_timedelta: bool) -> Union[datetime, time, timedelta]:
+    """
+    Convert an Excel serial date like openpyxl does it.
+
+    Args:
+        value: Excel serial date.
+        epoch: Start date of the serial dates.
+        is_timedelta: If True, value is a duration instead of a date.
+
+    Returns:
+        Converted date. Values below 1 are returned as time of day.
+
+    """
+    if is_timedelta:
+        delta = timedelta(days=value)
+        if delta.microseconds:
+            delta = timedelta(
+                seconds=delta.total_seconds() // 1,
+                microseconds=round(delta.microseconds, -3))
+        return delta
+
+    day, fraction = divmod(value, 1)
+    diff = timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        minutes, seconds = divmod(diff.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return time(hours, minutes, seconds, diff.microseconds)
+    # Excel treats 1900 as leap year
+    if 0 < value < 60 and epoch == _WINDOWS_EPOCH:
+        day += 1
+    return epoch + timedelta(days=day) + diff
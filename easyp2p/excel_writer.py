@@ -15,12 +15,12 @@ import logging
 from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
-from PyQt5.QtCore import QCoreApplication
 
+from easyp2p import p2p_qt
 from easyp2p.p2p_signals import Signals
 from easyp2p.p2p_parser import P2PParser
 
-_translate = QCoreApplication.translate
+_translate = p2p_qt.translate
 logger = logging.getLogger('easyp2p.excel_writer')
 
 DAILY_RESULTS = _translate('excel_writer', 'Daily results')
@@ -166,7 +166,7 @@ def _get_total_results(df_monthly: pd.DataFrame) -> pd.DataFrame:
     df_total[P2PParser.PLATFORM] = 'Total'
     df_total = df_total.reset_index().set_index(
         [P2PParser.PLATFORM, P2PParser.CURRENCY])
-    df = df_pivot.append(df_total, sort=True)
+    df = pd.concat([df_pivot, df_total], sort=True)
     df.dropna(how='all', inplace=True)
 
     return df
@@ -0,0 +1,182 @@
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module implementing AsyncP2PSession, the asyncio version of P2PSession.
+
+AsyncP2PSession runs the same flows as P2PSession, see p2p_session, but sends
+the requests with httpx and waits with asyncio.sleep. Thus a single thread can
+evaluate all session based platforms concurrently and waiting for the
+statement generation does not block a thread. It relies on httpx, which is an
+optional dependency, see p2p_http.ASYNC_AVAILABLE.
+
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Any, AsyncIterator, Mapping, Optional, Tuple, Union
+
+from easyp2p.p2p_credentials import get_credentials
+from easyp2p.p2p_http import create_async_client
+from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_signals import Signals
+
+
+# The network operations and run are coroutines instead of functions
+# pylint: disable=invalid-overridden-method
+class AsyncP2PSession(P2PSession):
+    """
+    Asyncio representation of P2P session. All helper methods of P2PSession
+    return awaitables.
+
+    """
+
+    def __init__(
+            self, name: str, logout_url: str,
+            signals: Optional[Signals], json: bool = False,
+            html_backend: Optional[str] = None) -> None:
+        """
+        Constructor of AsyncP2PSession class.
+
+        Args:
+            name: Name of the P2P platform.
+            logout_url: URL of the logout page.
+            signals: Signals instance for communicating with the calling class.
+            json: If True post data in requests in JSON format.
+            html_backend: Backend for extracting values from HTML pages, see
+                p2p_html.HTML_BACKENDS. If None, the default backend will be
+                used.
+
+        """
+        super().__init__(name, logout_url, signals, json, html_backend)
+        self.logger = logging.getLogger(
+            'easyp2p.p2p_async_session.AsyncP2PSession')
+
+    async def __aenter__(self) -> 'AsyncP2PSession':
+        """
+        Start of async context management protocol.
+
+        Returns:
+            Instance of AsyncP2PSession class.
+
+        """
+        self.sess = create_async_client()
+        self.logger.debug('%s: created context manager.', self.name)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """
+        End of async context management protocol.
+
+        If the context manager finishes the user will be logged out of the
+        P2P platform. This ensures that easyp2p cleanly logs out of the website
+        even in case of errors.
+
+        """
+        try:
+            await self._logout()
+        finally:
+            await self.sess.aclose()
+
+    async def run(self, flow: Any) -> Any:
+        """
+        Run a flow of the session or of a platform. The awaitables yielded by
+        the flow are awaited and their results are sent back into the flow.
+        Their exceptions are raised in the flow.
+
+        Args:
+            flow: Flow to run. Awaitables are awaited, other values are
+                returned unchanged.
+
+        Returns:
+            Return value of the flow.
+
+        """
+        if not inspect.isgenerator(flow):
+            if inspect.isawaitable(flow):
+                return await flow
+            return flow
+        result, error = None, None
+        while True:
+            try:
+                if error is None:
+                    step = flow.send(result)
+                else:
+                    step = flow.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                result = await step if inspect.isawaitable(step) else step
+            except BaseException as err:  # pylint: disable=broad-except
+                error = err
+
+    async def _send(
+            self, method: str, url: str, stream: bool = False,
+            headers: Optional[Mapping[str, str]] = None,
+            **body) -> 'httpx.Response':
+        """
+        Send a request with httpx. See P2PSession._send.
+
+        """
+        request = self.sess.build_request(
+            method.upper(), url, headers=headers, **body)
+        return await self.sess.send(request, stream=stream)
+
+    @staticmethod
+    def _chunks(
+            resp: 'httpx.Response', size: int,
+            text: bool = False) -> AsyncIterator[Union[bytes, str]]:
+        """
+        Iterate asynchronously over the body of a streamed response in
+        chunks. See P2PSession._chunks.
+
+        """
+        if text:
+            return resp.aiter_text(size)
+        return resp.aiter_bytes(size)
+
+    @staticmethod
+    async def _next_chunk(
+            chunks: AsyncIterator[Union[bytes, str]]) \
+            -> Optional[Union[bytes, str]]:
+        """
+        Get the next chunk of a response body. See P2PSession._next_chunk.
+
+        """
+        async for chunk in chunks:
+            return chunk
+        return None
+
+    @staticmethod
+    async def _sleep(delay: float) -> None:
+        """
+        Sleep between two polls of wait without blocking the thread.
+
+        Args:
+            delay: Delay in seconds.
+
+        """
+        await asyncio.sleep(delay)
+
+    @staticmethod
+    async def close_response(
+            resp: 'httpx.Response') -> None:
+        """
+        Close a streamed response which is not consumed.
+
+        Args:
+            resp: Response of a request with stream=True.
+
+        """
+        await resp.aclose()
+
+    async def get_credentials(
+            self) -> Optional[Tuple[str, str]]:
+        """
+        Get the credentials of the platform in a separate thread, since the
+        user may be asked for them. See P2PSession.get_credentials.
+
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, get_credentials, self.name, self.signals)
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module for caching parsed account statements on disk.
+
+The parsed statement is stored next to the downloaded statement as a csv file
+together with a JSON file containing the cache key, the dates of all cash
+flow types and the types of all columns. The cache is only valid if the
+content of the statement, the options for reading it, the parser settings of
+the platform and the easyp2p version are the same as when the cache was
+written. The cache does not depend on the date range, it contains the results
+for all dates of the statement. Both files only contain data, thus loading a
+manipulated cache cannot execute code.
+
+"""
+from datetime import date, datetime
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from easyp2p import __version__
+from easyp2p.p2p_parser import ReadOptions
+
+logger = logging.getLogger('easyp2p.p2p_cache')
+
+CACHE_SUFFIX = '.parsed.csv'
+META_SUFFIX = '.parsed.json'
+# Version of the cache format, caches with another format are ignored
+CACHE_FORMAT = 3
+
+
+def get_file_hash(file_name: str) -> str:
+    """
+    Calculate the SHA-256 hash of the content of a file.
+
+    Args:
+        file_name: File name including path.
+
+    Returns:
+        Hex digest of the file content.
+
+    Raises:
+        OSError: If the file cannot be read.
+
+    """
+    file_hash = hashlib.sha256()
+    with open(file_name, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def _get_type(series: pd.Series) -> str:
+    """
+    Get the type of a column which is stored in the cache metadata.
+
+    Args:
+        series: Column or index level of the parsed data frame.
+
+    Returns:
+        'date' or 'str' for columns of datetime.date or str objects, the
+        dtype name for all other columns.
+
+    Raises:
+        ValueError: If the column contains objects of other types.
+
+    """
+    if series.dtype != object:
+        return str(series.dtype)
+    if all(isinstance(value, date) and not isinstance(value, datetime)
+           for value in series):
+        return 'date'
+    if all(isinstance(value, str) for value in series):
+        return 'str'
+    raise ValueError(f'Column {series.name} cannot be cached!')
+
+
+def _write_file(file_name: str, write) -> None:
+    """
+    Write a file via a temporary file, thus it is replaced only if writing
+    succeeds.
+
+    Args:
+        file_name: File name including path.
+        write: Function which writes to the text file object passed to it.
+
+    """
+    tmp_file = file_name + '.tmp'
+    try:
+        with open(tmp_file, 'w', encoding='utf-8', newline='') as file:
+            write(file)
+        os.replace(tmp_file, file_name)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def _dump_type_dates(
+        type_dates: Mapping[str, Sequence[date]]) -> Dict[str, List[str]]:
+    """Convert the dates of cash flow types to ISO format strings."""
+    return {
+        cf_type: [day.isoformat() for day in dates]
+        for cf_type, dates in type_dates.items()}
+
+
+def _load_type_dates(
+        type_dates: Mapping[str, Sequence[str]]) -> Dict[str, List[date]]:
+    """Convert the dates of cash flow types from ISO format strings."""
+    return {
+        cf_type: [date.fromisoformat(day) for day in dates]
+        for cf_type, dates in type_dates.items()}
+
+
+class ParserCache:
+
+    """Cache for the parse results of a single account statement."""
+
+    def __init__(
+            self, statement: str, read_options: ReadOptions,
+            parser_settings: Optional[Mapping[str, Any]] = None) -> None:
+        """
+        Constructor of ParserCache class.
+
+        Args:
+            statement: File name including path of the account statement.
+            read_options: Options for reading the statement.
+            parser_settings: Settings of the platform which influence the
+                parse result, e.g. the cash flow type mapping. Default is
+                None.
+
+        """
+        self.statement = statement
+        self.read_options = read_options
+        self.parser_settings = dict(parser_settings or {})
+        stem = os.path.splitext(statement)[0]
+        self.cache_file = stem + CACHE_SUFFIX
+        self.meta_file = stem + META_SUFFIX
+        self._key: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """
+        Key which identifies the statement content, read options, parser
+        settings and easyp2p version.
+
+        Raises:
+            OSError: If the statement cannot be read.
+
+        """
+        if self._key is None:
+            key = hashlib.sha256(__version__.encode())
+            key.update(repr(self.read_options).encode())
+            key.update(repr(sorted(self.parser_settings.items())).encode())
+            key.update(get_file_hash(self.statement).encode())
+            self._key = key.hexdigest()
+        return self._key
+
+    def load(self) -> Optional[Tuple[
+            pd.DataFrame, Dict[str, List[date]], Dict[str, List[date]]]]:
+        """
+        Load the parse results from the cache.
+
+        Returns:
+            Tuple (parsed data frame, dates of the unknown cash flow types,
+            dates of the known cash flow types) or None if there is no valid
+            cache for the statement.
+
+        """
+        if not os.path.isfile(self.meta_file):
+            return None
+
+        try:
+            with open(self.meta_file, encoding='utf-8') as file:
+                meta = json.load(file)
+            if meta['format'] != CACHE_FORMAT or meta['key'] != self.key:
+                logger.debug('Cache %s is outdated.', self.cache_file)
+                return None
+            if get_file_hash(self.cache_file) != meta['data_hash']:
+                logger.warning(
+                    'Cache %s does not match its metadata.', self.cache_file)
+                return None
+            df = self._read_df(meta)
+            unknown_cf_type_dates = _load_type_dates(
+                meta['unknown_cf_type_dates'])
+            cf_type_dates = _load_type_dates(meta['cf_type_dates'])
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning(
+                'Cache %s could not be loaded.', self.cache_file,
+                exc_info=True)
+            return None
+
+        logger.debug('Loaded parse results from %s.', self.cache_file)
+        return df, unknown_cf_type_dates, cf_type_dates
+
+    def _read_df(self, meta: Mapping[str, Any]) -> pd.DataFrame:
+        """
+        Read the parsed data frame from the csv file and restore the column
+        types and index.
+
+        Args:
+            meta: Metadata of the cache.
+
+        Returns:
+            Parsed data frame.
+
+        """
+        types: Dict[str, str] = meta['types']
+        df = pd.read_csv(
+            self.cache_file, keep_default_na=False, na_values=[''],
+            float_precision='round_trip',
+            dtype={
+                name: 'object' for name, type_ in types.items()
+                if type_ in ('date', 'str')})
+        if list(df.columns) != meta['index'] + meta['columns']:
+            raise ValueError('Columns do not match the metadata!')
+
+        for name, type_ in types.items():
+            if type_ == 'date':
+                df[name] = pd.to_datetime(df[name]).dt.date
+            elif type_ == 'str':
+                df[name] = df[name].fillna('').astype(str)
+            elif type_.startswith('datetime64'):
+                df[name] = pd.to_datetime(df[name])
+            else:
+                df[name] = df[name].astype(type_)
+
+        if meta['index']:
+            df.set_index(meta['index'], inplace=True)
+        df.columns.name = meta['columns_name']
+        return df
+
+    def save(
+            self, df: pd.DataFrame,
+            unknown_cf_type_dates: Mapping[str, Sequence[date]],
+            cf_type_dates: Mapping[str, Sequence[date]]) -> None:
+        """
+        Save the parse results to the cache. Errors are only logged since
+        the cache is not essential.
+
+        Args:
+            df: Parsed data frame.
+            unknown_cf_type_dates: Dates on which the unknown cash flow types
+                of the statement occur.
+            cf_type_dates: Dates on which the known cash flow types of the
+                statement occur.
+
+        """
+        try:
+            columns = list(df.columns)
+            if isinstance(df.index, pd.RangeIndex) and df.index.name is None:
+                index = []
+                data = df.reset_index(drop=True)
+            else:
+                index = list(df.index.names)
+                if None in index:
+                    raise ValueError('Unnamed index levels cannot be cached!')
+                data = df.reset_index()
+            names = index + columns
+            if len(set(names)) != len(names) or not all(
+                    isinstance(name, str) for name in names):
+                raise ValueError('Column names cannot be cached!')
+
+            meta = {
+                'format': CACHE_FORMAT,
+                'key': self.key,
+                'unknown_cf_type_dates': _dump_type_dates(
+                    unknown_cf_type_dates),
+                'cf_type_dates': _dump_type_dates(cf_type_dates),
+                'index': index,
+                'columns': columns,
+                'columns_name': df.columns.name,
+                'types': {name: _get_type(data[name]) for name in names},
+            }
+            _write_file(
+                self.cache_file,
+                lambda file: data.to_csv(file, index=False))
+            meta['data_hash'] = get_file_hash(self.cache_file)
+            _write_file(
+                self.meta_file, lambda file: json.dump(meta, file, indent=2))
+        except (OSError, ValueError, TypeError):
+            logger.warning(
+                'Cache %s could not be written.', self.cache_file,
+                exc_info=True)
@@ -1,15 +1,33 @@
 # -*- coding: utf-8 -*-
 #  Copyright (c) 2018-2020 Niko Sandschneider
 
-"""Module implementing P2PWebDriver."""
+"""
+Module implementing P2PChrome and ChromePool.
 
+Starting Chrome takes several seconds. Therefore P2PWebDriver gets its
+P2PChrome instance from chrome_pool, which keeps the browsers running between
+platforms. Each platform uses a new isolated browser context with its own
+cookies and download directory, which is disposed after the platform is done.
+
+The path of ChromeDriver is resolved by webdriver_manager only if Chrome was
+updated since the last start, see get_chromedriver_path.
+
+"""
+
+import atexit
+import json
 import logging
-from typing import Optional, Tuple
+import os
+import shutil
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
 
 from selenium.webdriver import Chrome, ChromeOptions
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import (
-    NoSuchElementException, StaleElementReferenceException, TimeoutException)
+    NoSuchElementException, StaleElementReferenceException, TimeoutException,
+    WebDriverException)
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
@@ -17,8 +35,250 @@ from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
 from easyp2p.errors import CHROME_NOT_FOUND, CHROME_DRIVER_NOT_FOUND
+from easyp2p.p2p_settings import CONFIG_DIRECTORY
 from easyp2p.p2p_signals import Signals
 
+logger = logging.getLogger('easyp2p.p2p_chrome')
+
+# File for caching the resolved ChromeDriver path and the Chrome version
+DRIVER_CACHE_FILE = os.path.join(CONFIG_DIRECTORY, 'chromedriver.json')
+
+# Estimated memory usage of a headless Chrome instance in MB
+BROWSER_MEMORY = 300
+
+# Executable names of Chrome and Chromium on Linux
+CHROME_COMMANDS = (
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser')
+
+
+def _find_chrome() -> Optional[str]:
+    """
+    Find the Chrome executable in its default install locations.
+
+    Returns:
+        Absolute path of the Chrome executable or None if it is not found.
+
+    """
+    if sys.platform.startswith('win'):
+        candidates = [
+            os.path.join(
+                os.environ[var], 'Google', 'Chrome', 'Application',
+                'chrome.exe')
+            for var in ('PROGRAMFILES', 'PROGRAMFILES(X86)', 'LOCALAPPDATA')
+            if var in os.environ]
+    elif sys.platform == 'darwin':
+        candidates = [
+            '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome']
+    else:
+        candidates = [shutil.which(cmd) for cmd in CHROME_COMMANDS]
+
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            return os.path.realpath(candidate)
+    return None
+
+
+def get_available_memory() -> Optional[int]:
+    """
+    Get the memory which is available for new processes.
+
+    Returns:
+        Available memory in MB or None if it cannot be determined. Currently
+        only Linux is supported.
+
+    """
+    try:
+        with open('/proc/meminfo', encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def get_browser_slots(
+        max_browsers: int, cpu_limit: Optional[int] = None,
+        memory_limit: Optional[int] = None) -> int:
+    """
+    Get the number of headless browsers which can run side by side. Each
+    browser needs one CPU core and BROWSER_MEMORY MB of memory.
+
+    Args:
+        max_browsers: Maximal number of browsers.
+        cpu_limit: Number of CPU cores which may be used by the browsers. If
+            None, all cores can be used. Default is None.
+        memory_limit: Memory in MB which may be used by the browsers. If None,
+            the available memory can be used. Default is None.
+
+    Returns:
+        Number of browsers, at least 1.
+
+    """
+    slots = max_browsers
+    cpus = os.cpu_count() or 1
+    if cpu_limit is not None:
+        cpus = min(cpus, cpu_limit)
+    slots = min(slots, cpus)
+
+    memory = get_available_memory()
+    if memory_limit is not None:
+        memory = memory_limit if memory is None else min(memory, memory_limit)
+    if memory is not None:
+        slots = min(slots, memory // BROWSER_MEMORY)
+
+    return max(slots, 1)
+
+
+def _stat_signature(path: Optional[str]) -> Optional[List[int]]:
+    """
+    Get size and modification time of a file. They change whenever the file
+    is replaced, e.g. by an update.
+
+    Args:
+        path: File name including path.
+
+    Returns:
+        List [size, mtime in ns] or None if the file does not exist.
+
+    """
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _load_driver_cache(cache_file: str) -> Dict[str, object]:
+    """
+    Load the cached ChromeDriver resolution.
+
+    Args:
+        cache_file: File name including path of the cache.
+
+    Returns:
+        Cached values or an empty dictionary if there is no valid cache.
+
+    """
+    try:
+        with open(cache_file, encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return dict()
+    return cache if isinstance(cache, dict) else dict()
+
+
+def _save_driver_cache(cache_file: str, cache: Dict[str, object]) -> None:
+    """
+    Save the ChromeDriver resolution. Errors are only logged since the cache
+    is not essential.
+
+    Args:
+        cache_file: File name including path of the cache.
+        cache: Values to be cached.
+
+    """
+    tmp_file = cache_file + '.tmp'
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, 'w', encoding='utf-8') as file:
+            json.dump(cache, file, indent=2)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        logger.warning('ChromeDriver cache could not be saved.', exc_info=True)
+
+
+def invalidate_driver_cache(cache_file: Optional[str] = None) -> None:
+    """
+    Delete the cached ChromeDriver resolution, e.g. if the driver cannot be
+    started.
+
+    Args:
+        cache_file: File name including path of the cache. If None,
+            DRIVER_CACHE_FILE will be used. Default is None.
+
+    """
+    try:
+        os.remove(cache_file or DRIVER_CACHE_FILE)
+    except OSError:
+        pass
+
+
+def _get_chrome_version(manager: ChromeDriverManager) -> Optional[str]:
+    """
+    Get the version of the installed Chrome from webdriver-manager.
+
+    Args:
+        manager: ChromeDriverManager instance.
+
+    Returns:
+        Chrome version or None if the installed webdriver-manager cannot
+        determine it. Older versions do not provide
+        get_browser_version_from_os.
+
+    """
+    get_version = getattr(
+        getattr(manager, 'driver', None), 'get_browser_version_from_os',
+        None)
+    if get_version is None:
+        return None
+    return get_version()
+
+
+def get_chromedriver_path(cache_file: Optional[str] = None) -> str:
+    """
+    Get the path of a ChromeDriver which matches the installed Chrome.
+
+    The result of ChromeDriverManager().install() is cached together with the
+    Chrome version. The cache is valid as long as the driver exists and the
+    Chrome executable was not changed, which is checked by comparing their
+    size and modification time. If the Chrome executable was changed, its
+    version is determined again and the driver is only resolved again if the
+    version differs. If the Chrome version cannot be determined, the driver
+    is always resolved again in this case.
+
+    Args:
+        cache_file: File name including path of the cache. If None,
+            DRIVER_CACHE_FILE will be used. Default is None.
+
+    Returns:
+        Absolute path of the ChromeDriver executable.
+
+    Raises:
+        ValueError: If Chrome cannot be found.
+
+    """
+    cache_file = cache_file or DRIVER_CACHE_FILE
+    cache = _load_driver_cache(cache_file)
+    driver_path = cache.get('driver_path')
+    chrome_stat = _stat_signature(_find_chrome())
+
+    driver_valid = bool(driver_path) and (
+        _stat_signature(driver_path) == cache.get('driver_stat'))
+    if (driver_valid and chrome_stat is not None
+            and chrome_stat == cache.get('chrome_stat')):
+        return driver_path
+
+    manager = ChromeDriverManager()
+    chrome_version = _get_chrome_version(manager)
+    if (driver_valid and chrome_version is not None
+            and chrome_version == cache.get('chrome_version')):
+        # Chrome was reinstalled without a version change
+        cache['chrome_stat'] = chrome_stat
+        _save_driver_cache(cache_file, cache)
+        return driver_path
+
+    logger.info('Resolving ChromeDriver for Chrome %s.', chrome_version)
+    driver_path = manager.install()
+    _save_driver_cache(cache_file, {
+        'driver_path': driver_path,
+        'driver_stat': _stat_signature(driver_path),
+        'chrome_version': chrome_version,
+        'chrome_stat': chrome_stat})
+    return driver_path
+
 
 class P2PChrome(Chrome):
 
@@ -41,6 +301,12 @@ class P2PChrome(Chrome):
 
         """
         self.download_directory = download_directory
+        self.headless = headless
+        # Id of the browser context opened by open_context
+        self.context_id: Optional[str] = None
+        # Window of the default context which is kept open while browser
+        # contexts come and go
+        self.default_window: Optional[str] = None
         self.logger = logging.getLogger('easyp2p.p2p_webdriver')
         options = ChromeOptions()
         prefs = {"download.default_directory": self.download_directory}
@@ -53,12 +319,14 @@ class P2PChrome(Chrome):
             self.signals.connect_signals(signals)
 
         try:
-            super().__init__(ChromeDriverManager().install(), options=options)
+            super().__init__(get_chromedriver_path(), options=options)
         except ValueError:
             self.logger.exception('Error opening Chrome.')
+            invalidate_driver_cache()
             raise RuntimeError(CHROME_NOT_FOUND)
         except Exception:
             self.logger.exception('Error opening ChromeDriver.')
+            invalidate_driver_cache()
             raise RuntimeError(CHROME_DRIVER_NOT_FOUND)
 
         if headless:
@@ -67,6 +335,63 @@ class P2PChrome(Chrome):
                 'behavior': 'allow', 'downloadPath': self.download_directory}
             self.execute_cdp_cmd('Page.setDownloadBehavior', params)
 
+    def open_context(self, download_directory: str) -> None:
+        """
+        Open a new isolated browser context and switch to its window. The
+        context has its own cookies and saves downloads in
+        download_directory.
+
+        Args:
+            download_directory: Download directory of the new context.
+
+        Raises:
+            WebDriverException: If the context cannot be created.
+
+        """
+        if self.default_window is None:
+            self.default_window = self.current_window_handle
+        context_id = self.execute_cdp_cmd(
+            'Target.createBrowserContext', {})['browserContextId']
+        self.context_id = context_id
+        target = self.execute_cdp_cmd(
+            'Target.createTarget',
+            {'url': 'about:blank', 'browserContextId': context_id})
+        # ChromeDriver uses the target ids as window handles
+        self.switch_to.window(target['targetId'])
+        self.execute_cdp_cmd(
+            'Browser.setDownloadBehavior',
+            {'behavior': 'allow', 'browserContextId': context_id,
+             'downloadPath': download_directory})
+        self.download_directory = download_directory
+
+    @signals.update_progress
+    def reuse(self, download_directory: str) -> None:
+        """
+        Prepare a running browser for the next platform, see open_context.
+
+        Args:
+            download_directory: Download directory of the new context.
+
+        """
+        self.open_context(download_directory)
+
+    def close_context(self) -> None:
+        """
+        Dispose the browser context opened by open_context. This closes its
+        windows and deletes its cookies.
+
+        Raises:
+            WebDriverException: If the context cannot be disposed.
+
+        """
+        if self.context_id is None:
+            return
+        context_id = self.context_id
+        self.context_id = None
+        self.switch_to.window(self.default_window)
+        self.execute_cdp_cmd(
+            'Target.disposeBrowserContext', {'browserContextId': context_id})
+
     def wait(
             self, wait_until: EC, delay: float = 15.0) -> WebElement:
         """
@@ -214,3 +539,117 @@ class P2PChrome(Chrome):
                 wait_time += reload_freq
                 if wait_time > max_wait_time:
                     raise RuntimeError(error_msg)
+
+
+class ChromePool:
+
+    """
+    Thread safe pool of running P2PChrome instances. A browser is used by
+    only one platform at a time since WebDriver commands always act on the
+    current window of the browser.
+    """
+
+    # Default maximal number of idle browsers per headless mode
+    MAX_IDLE = 2
+
+    def __init__(self) -> None:
+        """Constructor of ChromePool class."""
+        self.max_idle = self.MAX_IDLE
+        self._lock = threading.Lock()
+        self._idle: Dict[bool, List[P2PChrome]] = {True: [], False: []}
+        self.logger = logging.getLogger('easyp2p.p2p_chrome.ChromePool')
+
+    def acquire(
+            self, download_directory: str, headless: bool,
+            signals: Optional[Signals] = None) -> P2PChrome:
+        """
+        Get a browser with a new browser context. An idle browser is reused
+        if possible, otherwise a new browser is started.
+
+        Args:
+            download_directory: Download directory of the new context.
+            headless: If True run ChromeDriver in headless mode.
+            signals: Signals instance for communicating with the calling
+                class.
+
+        Returns:
+            P2PChrome instance for exclusive use until release is called.
+
+        """
+        while True:
+            with self._lock:
+                if not self._idle[headless]:
+                    break
+                driver = self._idle[headless].pop()
+            try:
+                driver.reuse(download_directory)
+                self.logger.debug('Reusing running Chrome.')
+                return driver
+            except WebDriverException:
+                self.logger.warning(
+                    'Chrome cannot be reused.', exc_info=True)
+                self._quit(driver)
+
+        driver = P2PChrome(download_directory, headless, signals)
+        try:
+            driver.open_context(download_directory)
+        except WebDriverException:
+            # The driver can still be used with its default context, it is
+            # just not returned to the pool
+            self.logger.warning(
+                'Creating browser context failed.', exc_info=True)
+        return driver
+
+    def release(self, driver: P2PChrome) -> None:
+        """
+        Dispose the browser context of driver and keep the browser running
+        for the next platform.
+
+        Args:
+            driver: P2PChrome instance returned by acquire.
+
+        """
+        if driver.context_id is None:
+            # The default context cannot be reset
+            self._quit(driver)
+            return
+
+        try:
+            driver.close_context()
+        except WebDriverException:
+            self.logger.warning(
+                'Closing browser context failed.', exc_info=True)
+            self._quit(driver)
+            return
+
+        with self._lock:
+            if len(self._idle[driver.headless]) < self.max_idle:
+                self._idle[driver.headless].append(driver)
+                return
+        self._quit(driver)
+
+    def close(self) -> None:
+        """Quit all idle browsers."""
+        with self._lock:
+            drivers = self._idle[True] + self._idle[False]
+            self._idle = {True: [], False: []}
+        for driver in drivers:
+            self._quit(driver)
+
+    def _quit(self, driver: P2PChrome) -> None:
+        """
+        Quit driver and ignore errors since the browser may already be gone.
+
+        Args:
+            driver: P2PChrome instance to quit.
+
+        """
+        try:
+            driver.quit()
+        except WebDriverException:
+            self.logger.debug('Quitting Chrome failed.', exc_info=True)
+
+
+# Browsers shared by all webdriver platforms
+chrome_pool = ChromePool()
+atexit.register(chrome_pool.close)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module implementing the command line interface of easyp2p.
+
+The command line interface evaluates the platforms without the GUI, e.g. for
+scheduled runs on a server:
+
+    python -m easyp2p run --platforms Bondora Mintos --from 2020-01-01 \
+        --to 2020-03-31
+
+It switches p2p_qt to headless mode before importing the other easyp2p
+modules, thus PyQt5 is not imported. The credentials must be saved in the
+keyring since there is no user to ask.
+
+"""
+
+import argparse
+from datetime import date
+import logging
+import os
+import sys
+from typing import List, Optional, Sequence
+
+from easyp2p import __version__, p2p_qt
+
+logger = logging.getLogger('easyp2p.p2p_cli')
+
+
+def _parse_date(value: str) -> date:
+    """
+    Parse a date in ISO format for argparse.
+
+    Args:
+        value: Date in the format YYYY-MM-DD.
+
+    Returns:
+        Parsed date.
+
+    Raises:
+        argparse.ArgumentTypeError: If value is not a valid date.
+
+    """
+    try:
+        return date.fromisoformat(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(
+            f'{value} is not a date in the format YYYY-MM-DD!') from err
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Create the parser for the command line arguments.
+
+    Returns:
+        Argument parser of the command line interface.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='easyp2p',
+        description='Download and aggregate account statements from P2P '
+                    'lending platforms without the GUI.')
+    parser.add_argument(
+        '--version', action='version', version=f'%(prog)s {__version__}')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser(
+        'run', help='evaluate the platforms and write the results')
+    run_parser.add_argument(
+        '--platforms', nargs='+', required=True, metavar='PLATFORM',
+        help='names of the P2P platforms, separated by spaces or commas')
+    run_parser.add_argument(
+        '--from', dest='start_date', type=_parse_date, required=True,
+        metavar='YYYY-MM-DD', help='first day of the date range')
+    run_parser.add_argument(
+        '--to', dest='end_date', type=_parse_date, required=True,
+        metavar='YYYY-MM-DD', help='last day of the date range')
+    run_parser.add_argument(
+        '--output', help='Excel file for the results, default is '
+                         'P2P_Results_<from>-<to>.xlsx in the directory')
+    run_parser.add_argument(
+        '--directory',
+        help='directory for the downloaded statements, default is '
+             '~/easyp2p')
+    run_parser.add_argument(
+        '--max-workers', type=int,
+        help='number of session based platforms evaluated concurrently')
+    run_parser.add_argument(
+        '--reuse-statements', action='store_true',
+        help='use previously downloaded statements')
+    run_parser.add_argument(
+        '--verbose', '-v', action='store_true',
+        help='log the progress of the evaluation')
+    run_parser.add_argument(
+        '--debug', action='store_true',
+        help='log debug messages including the tracebacks of errors')
+    return parser
+
+
+def get_platforms(
+        parser: argparse.ArgumentParser, values: Sequence[str]) -> List[str]:
+    """
+    Get the names of the platforms from the command line arguments.
+
+    Args:
+        parser: Argument parser for reporting errors.
+        values: Platform arguments, every argument may contain several
+            comma separated names.
+
+    Returns:
+        Sorted names of the platforms.
+
+    """
+    # pylint: disable=import-outside-toplevel
+    import easyp2p.platforms as p2p_platforms
+
+    names = sorted({
+        name.strip() for value in values for name in value.split(',')
+        if name.strip()})
+    for name in names:
+        platform = getattr(p2p_platforms, name, None)
+        if not name[0].isupper() or not isinstance(platform, type):
+            parser.error(f'unknown platform: {name}')
+        if platform.DOWNLOAD_METHOD == 'recaptcha':
+            parser.error(
+                f'{name} requires solving a captcha and can only be '
+                f'evaluated in the GUI')
+    return names
+
+
+def run(args: argparse.Namespace, platforms: List[str]) -> int:
+    """
+    Evaluate the platforms with WorkerThread in the current thread.
+
+    Args:
+        args: Parsed command line arguments of the run command.
+        platforms: Names of the platforms.
+
+    Returns:
+        Exit code, 0 if all platforms were evaluated without errors.
+
+    """
+    # pylint: disable=import-outside-toplevel
+    from easyp2p.p2p_settings import Settings
+    from easyp2p.p2p_worker import WorkerThread
+
+    settings = Settings((args.start_date, args.end_date), '')
+    if args.directory:
+        settings.directory = os.path.abspath(args.directory)
+    settings.output_file = os.path.abspath(args.output or os.path.join(
+        settings.directory,
+        f'P2P_Results_{args.start_date:%d%m%Y}-{args.end_date:%d%m%Y}.xlsx'))
+    settings.platforms = set(platforms)
+    if args.max_workers:
+        settings.max_workers = args.max_workers
+    settings.reuse_statements = args.reuse_statements
+    os.makedirs(settings.directory, exist_ok=True)
+
+    errors = []
+
+    def print_progress(text: str, error: bool) -> None:
+        if error:
+            errors.append(text)
+        print(text, file=sys.stderr if error else sys.stdout, flush=True)
+
+    worker = WorkerThread(settings)
+    worker.signals.add_progress_text.connect(print_progress)
+    worker.run()
+
+    if worker.results_written:
+        print(f'Results written to {settings.output_file}.')
+    return 1 if errors else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Entry point of the command line interface.
+
+    Args:
+        argv: Command line arguments without the program name. If None,
+            sys.argv is used. Default is None.
+
+    Returns:
+        Exit code.
+
+    """
+    p2p_qt.use_headless()
+
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    if args.debug:
+        level = logging.DEBUG
+    elif args.verbose:
+        level = logging.INFO
+    else:
+        level = logging.WARNING
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    if args.start_date > args.end_date:
+        parser.error('--from must not be after --to')
+    platforms = get_platforms(parser, args.platforms)
+    logger.info(
+        'Evaluating %s from %s to %s.', platforms, args.start_date,
+        args.end_date)
+    return run(args, platforms)
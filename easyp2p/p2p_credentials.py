@@ -4,18 +4,161 @@
 """
 Module for getting and saving credentials in the system keyring / from the user.
 
+Credentials found in the keyring are kept in credential_cache for
+CREDENTIAL_CACHE_TTL seconds, thus repeated and concurrent lookups of a
+platform only query the keyring backend once.
+
 """
-from typing import Optional, Tuple
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Mapping, Optional, Tuple
 
 import keyring
-from keyring.errors import PasswordDeleteError
-from PyQt5.QtCore import (
-    QCoreApplication, QObject, pyqtSignal, QEventLoop, pyqtSlot)
+from keyring.backend import KeyringBackend
+from keyring.errors import KeyringError, PasswordDeleteError
 
+from easyp2p import p2p_qt
+from easyp2p.p2p_qt import QObject, Signal, Slot
 from easyp2p.p2p_signals import Signals
-from easyp2p.ui.credentials_window import CredentialsWindow
 
-_translate = QCoreApplication.translate
+_translate = p2p_qt.translate
+
+# All CredentialReceivers listen to the same send_credentials signal. Only one
+# platform at a time may ask the user for credentials, otherwise concurrently
+# evaluated platforms could receive the credentials of another platform.
+_user_credentials_lock = threading.Lock()
+
+# Credentials which were resolved before the evaluation started, see
+# preload_credentials
+_preloaded_credentials: Dict[str, Tuple[str, str]] = dict()
+_preloaded_lock = threading.Lock()
+
+logger = logging.getLogger('easyp2p.p2p_credentials')
+
+# Time in seconds for which credentials from the keyring are cached
+CREDENTIAL_CACHE_TTL = 300
+
+
+class CredentialCache:
+
+    """
+    Thread safe cache for credentials from the keyring which expire after a
+    fixed time. Passwords are kept in bytearrays which are overwritten with
+    zeros when the credentials expire or are invalidated. The strings
+    returned by get cannot be zeroed, thus callers should not keep them.
+    """
+
+    def __init__(self, ttl: float = CREDENTIAL_CACHE_TTL) -> None:
+        """
+        Constructor of CredentialCache class.
+
+        Args:
+            ttl: Time in seconds after which cached credentials expire.
+
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[str, bytearray, float]] = dict()
+        # One lock per platform, thus concurrent lookups of the same platform
+        # wait for the first one instead of querying the keyring again
+        self._platform_locks: Dict[str, threading.Lock] = dict()
+
+    def platform_lock(self, platform: str) -> threading.Lock:
+        """
+        Get the lock which serializes the keyring lookups of platform.
+
+        Args:
+            platform: Name of the P2P platform.
+
+        Returns:
+            Lock of the platform.
+
+        """
+        with self._lock:
+            return self._platform_locks.setdefault(platform, threading.Lock())
+
+    def get(self, platform: str) -> Optional[Tuple[str, str]]:
+        """
+        Get the cached credentials of platform.
+
+        Args:
+            platform: Name of the P2P platform.
+
+        Returns:
+            Tuple (username, password) or None if the credentials are not
+            cached or expired.
+
+        """
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(platform)
+            if entry is None:
+                return None
+            return entry[0], entry[1].decode('utf-8')
+
+    def put(self, platform: str, username: str, password: str) -> None:
+        """
+        Cache the credentials of platform.
+
+        Args:
+            platform: Name of the P2P platform.
+            username: Username for platform.
+            password: Password for platform.
+
+        """
+        with self._lock:
+            self._purge_expired()
+            self._remove(platform)
+            self._entries[platform] = (
+                username, bytearray(password.encode('utf-8')),
+                time.monotonic() + self.ttl)
+
+    def invalidate(self, platform: str) -> None:
+        """
+        Remove the cached credentials of platform.
+
+        Args:
+            platform: Name of the P2P platform.
+
+        """
+        with self._lock:
+            self._remove(platform)
+
+    def clear(self) -> None:
+        """Remove all cached credentials."""
+        with self._lock:
+            for platform in list(self._entries):
+                self._remove(platform)
+
+    def _purge_expired(self) -> None:
+        """Remove all expired credentials. The caller must hold the lock."""
+        now = time.monotonic()
+        for platform, (_, _, expires) in list(self._entries.items()):
+            if expires <= now:
+                logger.debug('Cached credentials of %s expired.', platform)
+                self._remove(platform)
+
+    def _remove(self, platform: str) -> None:
+        """
+        Remove the credentials of platform and zero the password. The caller
+        must hold the lock.
+
+        Args:
+            platform: Name of the P2P platform.
+
+        """
+        entry = self._entries.pop(platform, None)
+        if entry is not None:
+            password = entry[1]
+            password[:] = bytes(len(password))
+
+
+# Credentials from the keyring of all platforms evaluated by this process
+credential_cache = CredentialCache()
+# Zero the cached passwords when the GUI or command line interface exits
+atexit.register(credential_cache.clear)
 
 
 def keyring_exists() -> bool:
@@ -31,29 +174,139 @@ def keyring_exists() -> bool:
 
 def get_credentials_from_keyring(platform):
     """
-    Try to get credentials for platform from keyring.
+    Try to get credentials for platform from credential_cache or keyring.
 
     Args:
         platform: Name of the P2P platform
 
     Returns:
         Tuple (username, password) or None if credentials were not found in the
-        keyring.
+        keyring or the keyring lookup failed.
 
     """
-    username, password = None, None
+    credentials = credential_cache.get(platform)
+    if credentials is not None:
+        return credentials
 
-    if keyring.get_keyring():
-        username = keyring.get_password(platform, 'username')
-        if username is not None:
-            password = keyring.get_password(platform, username)
+    with credential_cache.platform_lock(platform):
+        # Another thread may have looked up the platform in the meantime
+        credentials = credential_cache.get(platform)
+        if credentials is not None:
+            return credentials
+
+        username, password = None, None
+
+        try:
+            if keyring.get_keyring():
+                username = keyring.get_password(platform, 'username')
+                if username is not None:
+                    password = keyring.get_password(platform, username)
+        except KeyringError:
+            logger.warning(
+                'Keyring lookup for %s failed.', platform, exc_info=True)
+            return None
+
+        if username is None or password is None:
+            return None
+
+        credential_cache.put(platform, username, password)
+        return username, password
 
-    if username is None or password is None:
-        return None
 
+def get_all_credentials_from_keyring(
+        platforms: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+    """
+    Get the credentials of several platforms from the keyring in one batch.
+    The keyring backend is only looked up once and keyring errors are only
+    logged, thus the caller can ask the user for the missing credentials.
+    Credentials in credential_cache are not looked up again.
+
+    Args:
+        platforms: Names of the P2P platforms.
+
+    Returns:
+        Dictionary with platform names as keys and tuples (username,
+        password) as values. Platforms without credentials in the keyring are
+        missing.
+
+    """
+    credentials = dict()
+    missing = []
+    for platform in platforms:
+        cached = credential_cache.get(platform)
+        if cached is None:
+            missing.append(platform)
+        else:
+            credentials[platform] = cached
+    if not missing:
+        return credentials
+
+    backend = keyring.get_keyring()
+    if not backend:
+        return credentials
+
+    for platform in missing:
+        with credential_cache.platform_lock(platform):
+            # Another thread may have looked up the platform in the meantime
+            cached = credential_cache.get(platform) \
+                or _get_credentials_from_backend(backend, platform)
+        if cached is not None:
+            credentials[platform] = cached
+    return credentials
+
+
+def _get_credentials_from_backend(
+        backend: KeyringBackend,
+        platform: str) -> Optional[Tuple[str, str]]:
+    """
+    Look up the credentials of platform in a keyring backend and cache them
+    in credential_cache. The caller must hold the platform lock of
+    credential_cache.
+
+    Args:
+        backend: Keyring backend.
+        platform: Name of the P2P platform.
+
+    Returns:
+        Tuple (username, password) or None if the credentials were not found
+        or the lookup failed.
+
+    """
+    try:
+        username = backend.get_password(platform, 'username')
+        if username is None:
+            return None
+        password = backend.get_password(platform, username)
+    except KeyringError:
+        logger.warning(
+            'Keyring lookup for %s failed.', platform, exc_info=True)
+        return None
+    if password is None:
+        return None
+    credential_cache.put(platform, username, password)
     return username, password
 
 
+def preload_credentials(credentials: Mapping[str, Tuple[str, str]]) -> None:
+    """
+    Store credentials which get_credentials returns without asking the
+    keyring or the user.
+
+    Args:
+        credentials: Dictionary with platform names as keys and tuples
+            (username, password) as values.
+
+    """
+    with _preloaded_lock:
+        _preloaded_credentials.update(credentials)
+
+
+def clear_preloaded_credentials() -> None:
+    """Remove all credentials stored by preload_credentials."""
+    with _preloaded_lock:
+        _preloaded_credentials.clear()
+
+
 def get_credentials_from_user(
         platform: str, save_in_keyring: bool = False) \
         -> Tuple[Optional[str], Optional[str]]:
@@ -69,6 +322,9 @@ def get_credentials_from_user(
         Tuple (username, password)
 
     """
+    # The dialogs for asking the user are only available in the GUI
+    # pylint: disable=import-outside-toplevel
+    from easyp2p.ui.credentials_window import CredentialsWindow
     cred_window = CredentialsWindow(
         platform, keyring.get_keyring(), save_in_keyring)
     cred_window.exec_()
@@ -88,7 +344,8 @@ def get_credentials_from_user(
 def get_credentials(platform: str, signals: Signals) -> Tuple[str, str]:
     """
     Helper function to get credentials for platform from keyring or from user,
-    if they are not available in the keyring.
+    if they are not available in the keyring. Credentials stored by
+    preload_credentials take precedence.
 
     Args:
         platform: Platform for which to get credentials.
@@ -101,12 +358,14 @@ def get_credentials(platform: str, signals: Signals) -> Tuple[str, str]:
         RuntimeError: If no credentials were provided by the user.
 
     """
-    credentials = get_credentials_from_keyring(platform)
+    with _preloaded_lock:
+        credentials = _preloaded_credentials.get(platform)
     if credentials is None:
-        credential_receiver = CredentialReceiver(signals)
-        credentials = credential_receiver.wait_for_credentials(platform)
+        credentials = get_credentials_from_keyring(platform)
+    if credentials is None:
+        credentials = ask_user_for_credentials(platform, signals)
 
-    if credentials[0] == '' or credentials[1] == '':
+    if not credentials[0] or not credentials[1]:
         raise RuntimeError(_translate(
             'p2p_credentials',
             f'No credentials for {platform} provided! Aborting!'))
@@ -114,6 +373,29 @@ def get_credentials(platform: str, signals: Signals) -> Tuple[str, str]:
     return credentials
 
 
+def ask_user_for_credentials(
+        platform: str, signals: Signals) -> Tuple[str, str]:
+    """
+    Ask the user for the credentials of platform via the GUI thread. In
+    headless mode there is no user to ask.
+
+    Args:
+        platform: Platform for which to get credentials.
+        signals: Signals for communicating with the GUI.
+
+    Returns:
+        Tuple (username, password) entered by the user. (None, None) in
+        headless mode.
+
+    """
+    if p2p_qt.is_headless():
+        logger.warning('%s: no credentials found in the keyring.', platform)
+        return None, None
+    with _user_credentials_lock:
+        credential_receiver = CredentialReceiver(signals)
+        return credential_receiver.wait_for_credentials(platform)
+
+
 def get_password_from_keyring(platform: str, username: str) -> Optional[str]:
     """
     Get password for platform:username from keyring.
@@ -143,16 +425,23 @@ def delete_platform_from_keyring(platform: str) -> bool:
         RuntimeError: If 'username' for platform cannot be found in the keyring
 
     """
-    try:
-        username = keyring.get_password(platform, 'username')
-        if not username:
-            raise RuntimeError(
-                _translate(
-                    'p2p_credentials', f'{platform} was not found in keyring!'))
-        keyring.delete_password(platform, username)
-        keyring.delete_password(platform, 'username')
-    except PasswordDeleteError:
-        return False
+    # Invalidate the cache only after changing the keyring and while holding
+    # the platform lock. Otherwise a concurrent lookup could cache the old
+    # credentials again.
+    with credential_cache.platform_lock(platform):
+        try:
+            username = keyring.get_password(platform, 'username')
+            if not username:
+                raise RuntimeError(
+                    _translate(
+                        'p2p_credentials',
+                        f'{platform} was not found in keyring!'))
+            keyring.delete_password(platform, username)
+            keyring.delete_password(platform, 'username')
+        except PasswordDeleteError:
+            return False
+        finally:
+            credential_cache.invalidate(platform)
     return True
 
 
@@ -181,28 +470,35 @@ def save_platform_in_keyring(
             _translate(
                 'p2p_credentials', 'User name "username" is not allowed!'))
 
-    try:
-        keyring.set_password(platform, 'username', username)
-        keyring.set_password(platform, username, password)
-    except keyring.errors.PasswordSetError:
-        return False
+    # See delete_platform_from_keyring for the cache invalidation
+    with credential_cache.platform_lock(platform):
+        try:
+            keyring.set_password(platform, 'username', username)
+            keyring.set_password(platform, username, password)
+        except keyring.errors.PasswordSetError:
+            return False
+        finally:
+            credential_cache.invalidate(platform)
     return True
 
 
 class CredentialReceiver(QObject):
-    """Class for getting platform credentials via signals."""
+    """
+    Class for getting platform credentials via signals. It is only available
+    in the GUI.
+    """
 
-    get_credentials = pyqtSignal(str)
-    send_credentials = pyqtSignal(str, str)
+    get_credentials = Signal(str)
+    send_credentials = Signal(str, str)
 
     def __init__(self, signals):
         super().__init__()
         self.credentials = None
-        self.event_loop = QEventLoop()
+        self.event_loop = _create_event_loop()
         self.get_credentials.connect(signals.get_credentials)
         signals.send_credentials.connect(self.stop_waiting_for_credentials)
 
-    @pyqtSlot(str, str)
+    @Slot(str, str)
     def stop_waiting_for_credentials(
             self, username: str, password: str) -> None:
         """
@@ -216,7 +512,7 @@ class CredentialReceiver(QObject):
         self.credentials = (username, password)
         self.event_loop.exit()
 
-    @pyqtSlot(str)
+    @Slot(str)
     def wait_for_credentials(self, platform: str) -> Tuple[str, str]:
         """
         Start an event loop to wait until the user entered credentials.
@@ -229,6 +525,22 @@ class CredentialReceiver(QObject):
 
         """
         self.get_credentials.emit(platform)
-        self.event_loop = QEventLoop(self)
+        self.event_loop = _create_event_loop(self)
         self.event_loop.exec()
         return self.credentials
+
+
+def _create_event_loop(parent: Optional[QObject] = None) -> QObject:
+    """
+    Create a Qt event loop. Only available in the GUI.
+
+    Args:
+        parent: Parent of the event loop. Default is None.
+
+    Returns:
+        QEventLoop instance.
+
+    """
+    # pylint: disable=import-outside-toplevel
+    from PyQt5.QtCore import QEventLoop
+    return QEventLoop(parent)
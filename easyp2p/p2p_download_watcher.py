@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module for waiting on changes in the download directory of the webdriver.
+
+On Linux DownloadWatcher uses inotify, thus P2PWebDriver.download_finished
+wakes up as soon as Chrome renames the finished download. On other operating
+systems the directory is polled in short intervals.
+
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import time
+from typing import Optional
+
+logger = logging.getLogger('easyp2p.p2p_download_watcher')
+
+# Polling interval in seconds if inotify is not available
+POLL_INTERVAL = 0.1
+
+# inotify events which indicate that a download started or finished. Writes
+# to the download are not watched since they would wake up the watcher for
+# every chunk.
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CLOSE_WRITE = 0x8
+WATCH_MASK = (
+    IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE)
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    """
+    Load the C library if it provides inotify.
+
+    Returns:
+        C library or None if inotify is not available.
+
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1  # pylint: disable=pointless-statement
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_LIBC = _load_libc()
+
+
+class DownloadWatcher:
+
+    """Context manager which waits for changes in a directory."""
+
+    def __init__(self, directory: str) -> None:
+        """
+        Constructor of DownloadWatcher class.
+
+        Args:
+            directory: Directory which should be watched.
+
+        """
+        self.directory = directory
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> 'DownloadWatcher':
+        if _LIBC is not None:
+            fd = _LIBC.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                logger.debug(
+                    'inotify_init1 failed: %s', os.strerror(ctypes.get_errno()))
+            elif _LIBC.inotify_add_watch(
+                    fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+                logger.debug(
+                    'Watching %s failed: %s', self.directory,
+                    os.strerror(ctypes.get_errno()))
+                os.close(fd)
+            else:
+                self._fd = fd
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def event_driven(self) -> bool:
+        """True if the watcher is notified by the operating system."""
+        return self._fd is not None
+
+    def wait(self, timeout: float) -> None:
+        """
+        Wait until the content of the directory changes or timeout is
+        reached. Without inotify the method returns after at most
+        POLL_INTERVAL seconds.
+
+        Args:
+            timeout: Maximal waiting time in seconds.
+
+        """
+        if self._fd is None:
+            time.sleep(max(min(timeout, POLL_INTERVAL), 0))
+            return
+
+        readable, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if readable:
+            # Discard the events since the caller rescans the directory
+            try:
+                while os.read(self._fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module for extracting values from the HTML pages of the P2P platforms.
+
+The functions are used by P2PSession and AsyncP2PSession. They all raise a
+RuntimeError with the provided error message if the value cannot be found.
+
+The extraction is done by one of the backends in HTML_BACKENDS. The lxml
+backend feeds the page in chunks to a pull parser and stops as soon as the
+requested elements are found, thus the rest of the page is never parsed.
+The beautifulsoup backend parses the whole page with BeautifulSoup's
+html.parser. Both backends return the same values.
+
+TagProbe finds a tag in a page which is still being received, thus the rest
+of the page does not need to be downloaded.
+
+"""
+
+import logging
+from typing import Dict, Iterator, Mapping, Optional, Sequence, Union
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+logger = logging.getLogger('easyp2p.p2p_html')
+
+# Number of characters which are fed to the lxml parser at once
+FEED_SIZE = 1 << 14
+# Attributes which BeautifulSoup treats as lists of whitespace separated tokens
+MULTI_VALUED_ATTRIBUTES = ('class', 'accesskey', 'dropzone')
+
+
+class BeautifulSoupBackend:
+
+    """Extract values by parsing the whole page with BeautifulSoup."""
+
+    @staticmethod
+    def get_values_from_tag_by_name(
+            html: str, tag: str, names: Sequence[str],
+            field: str) -> Dict[str, Optional[str]]:
+        """See p2p_html.get_values_from_tag_by_name."""
+        soup = BeautifulSoup(html, 'html.parser')
+        data = dict()
+        for name in names:
+            elem = soup.find(tag, {'name': name})
+            data[name] = None if elem is None else elem.get(field, None)
+        return data
+
+    @staticmethod
+    def get_value_from_tag(html: str, tag: str, field: str) -> Optional[str]:
+        """See p2p_html.get_value_from_tag."""
+        elem = BeautifulSoup(html, 'html.parser').find(tag)
+        return None if elem is None else elem.get(field, None)
+
+    @staticmethod
+    def get_url_from_partial_link(
+            html: str, partial_link: str) -> Optional[str]:
+        """See p2p_html.get_url_from_partial_link."""
+        soup = BeautifulSoup(html, 'html.parser')
+        target = None
+        for link in soup.find_all('a', href=True):
+            if partial_link in link['href']:
+                target = link['href']
+        return target
+
+    @staticmethod
+    def get_value_from_script(
+            html: str, script_id: Mapping[str, str], tag: str,
+            name: str) -> Optional[str]:
+        """See p2p_html.get_value_from_script."""
+        script = BeautifulSoup(html, 'html.parser').find('script', script_id)
+        if script is None or script.string is None:
+            return None
+        elem = BeautifulSoup(script.string, 'html.parser').find(
+            tag, {'name': name})
+        return None if elem is None else elem.get('value', None)
+
+
+def _matches(elem: etree._Element, attrs: Mapping[str, str]) -> bool:
+    """
+    Check if the attributes of an element match like in BeautifulSoup's find.
+    The value of a multi-valued attribute, e.g. class, matches if it equals
+    one of its whitespace separated tokens or all of them.
+
+    Args:
+        elem: HTML element.
+        attrs: Dictionary with the required attribute values.
+
+    Returns:
+        True if all attributes match, False if not.
+
+    """
+    for key, value in attrs.items():
+        actual = elem.get(key)
+        if actual is None:
+            return False
+        if key in MULTI_VALUED_ATTRIBUTES:
+            tokens = actual.split()
+            if value not in tokens and value != ' '.join(tokens):
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+def _iter_elements(
+        html: str, tag: str, event: str = 'start') -> Iterator[etree._Element]:
+    """
+    Parse html in chunks and yield the elements with the given tag in
+    document order. The parsing stops if the caller stops the iteration.
+
+    Args:
+        html: HTML source code of the page.
+        tag: Tag of the HTML elements.
+        event: 'start' if only the attributes of the elements are needed,
+            'end' if their content is needed too.
+
+    Yields:
+        HTML elements with the given tag.
+
+    """
+    parser = etree.HTMLPullParser(events=(event,), tag=tag)
+    for pos in range(0, len(html), FEED_SIZE):
+        parser.feed(html[pos:pos + FEED_SIZE])
+        for _, elem in parser.read_events():
+            yield elem
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        # Raised by lxml for empty documents
+        return
+    for _, elem in parser.read_events():
+        yield elem
+
+
+class LxmlBackend:
+
+    """Extract values with lxml and stop parsing at the last needed tag."""
+
+    @staticmethod
+    def get_values_from_tag_by_name(
+            html: str, tag: str, names: Sequence[str],
+            field: str) -> Dict[str, Optional[str]]:
+        """See p2p_html.get_values_from_tag_by_name."""
+        data: Dict[str, Optional[str]] = dict.fromkeys(names)
+        missing = set(names)
+        for elem in _iter_elements(html, tag):
+            name = elem.get('name')
+            if name in missing:
+                missing.remove(name)
+                data[name] = elem.get(field)
+                if not missing:
+                    break
+        return data
+
+    @staticmethod
+    def get_value_from_tag(html: str, tag: str, field: str) -> Optional[str]:
+        """See p2p_html.get_value_from_tag."""
+        for elem in _iter_elements(html, tag):
+            return elem.get(field)
+        return None
+
+    @staticmethod
+    def get_url_from_partial_link(
+            html: str, partial_link: str) -> Optional[str]:
+        """See p2p_html.get_url_from_partial_link."""
+        target = None
+        for elem in _iter_elements(html, 'a'):
+            href = elem.get('href')
+            if href is not None and partial_link in href:
+                target = href
+        return target
+
+    @staticmethod
+    def get_value_from_script(
+            html: str, script_id: Mapping[str, str], tag: str,
+            name: str) -> Optional[str]:
+        """See p2p_html.get_value_from_script."""
+        for script in _iter_elements(html, 'script', event='end'):
+            if _matches(script, script_id):
+                if not script.text:
+                    return None
+                values = LxmlBackend.get_values_from_tag_by_name(
+                    script.text, tag, [name], 'value')
+                return values[name]
+        return None
+
+
+class TagProbe:
+
+    """Find the first tag in an HTML page which is received in chunks."""
+
+    def __init__(self, tag: str, field: str) -> None:
+        """
+        Constructor of TagProbe class.
+
+        Args:
+            tag: Tag of the HTML element.
+            field: Name of the tag field for which to return the value.
+
+        """
+        self.field = field
+        self.found = False
+        self.value: Optional[str] = None
+        self._parser = etree.HTMLPullParser(events=('start',), tag=tag)
+
+    def feed(self, chunk: Union[str, bytes]) -> bool:
+        """
+        Parse the next chunk of the page.
+
+        Args:
+            chunk: Next chunk of the page.
+
+        Returns:
+            True if the tag was found and no more chunks are needed.
+
+        """
+        self._parser.feed(chunk)
+        return self._read_events()
+
+    def close(self) -> bool:
+        """
+        Finish parsing after the last chunk.
+
+        Returns:
+            True if the tag was found.
+
+        """
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            # Raised by lxml for empty documents
+            return self.found
+        return self._read_events()
+
+    def _read_events(self) -> bool:
+        """Take the value of the first found tag."""
+        if not self.found:
+            for _, elem in self._parser.read_events():
+                self.found = True
+                self.value = elem.get(self.field)
+                break
+        return self.found
+
+
+HTML_BACKENDS = {
+    'beautifulsoup': BeautifulSoupBackend,
+    'lxml': LxmlBackend,
+}
+DEFAULT_HTML_BACKEND = 'lxml'
+
+
+def _get_backend(backend: Optional[str]):
+    """
+    Get an HTML backend by name.
+
+    Args:
+        backend: Name of the backend in HTML_BACKENDS. If None,
+            DEFAULT_HTML_BACKEND will be used.
+
+    Returns:
+        Backend class.
+
+    Raises:
+        RuntimeError: If backend is unknown.
+
+    """
+    try:
+        return HTML_BACKENDS[backend or DEFAULT_HTML_BACKEND]
+    except KeyError as err:
+        raise RuntimeError(f'Unknown HTML backend: {backend}!') from err
+
+
+def get_values_from_tag_by_name(
+        html: str, tag: str, names: Sequence[str], error_msg: str,
+        field: str = 'value', backend: Optional[str] = None) -> Dict[str, str]:
+    """
+    Get the values of HTML tags given in names. Return them as a dict with
+    key=name and value=value.
+
+    Args:
+        html: HTML source code of the page.
+        tag: Tag of the HTML element.
+        names: List of tag names for which to get the values.
+        error_msg: Error message if extraction of value fails.
+        field: Name of the field for which to return the value.
+        backend: Name of the backend in HTML_BACKENDS. If None,
+            DEFAULT_HTML_BACKEND will be used.
+
+    Returns:
+        Dictionary with tag names as key and tag values as value.
+
+    Raises:
+        RuntimeError: If at least one HTML element cannot be found.
+
+    """
+    data = _get_backend(backend).get_values_from_tag_by_name(
+        html, tag, names, field)
+
+    if None in data.values():
+        # At least one HTML element has not been found
+        logger.debug('Elements not found in get_values_from_tag_by_name!')
+        logger.debug('Names: %s', str(names))
+        logger.debug('Keys: %s', str(data.keys()))
+        raise RuntimeError(error_msg)
+
+    return data
+
+
+def get_value_from_tag(
+        html: str, tag: str, field: str, error_msg: str,
+        backend: Optional[str] = None) -> str:
+    """
+    Get the string value of a single HTML tag.
+
+    Args:
+        html: HTML source code of the page.
+        tag: Tag of the HTML element.
+        field: Name of the tag field for which to return the value.
+        error_msg: Error message if extraction of value fails.
+        backend: Name of the backend in HTML_BACKENDS. If None,
+            DEFAULT_HTML_BACKEND will be used.
+
+    Returns:
+        Field value of the tag.
+
+    Raises:
+        RuntimeError: If the HTML element cannot be found.
+
+    """
+    value = _get_backend(backend).get_value_from_tag(html, tag, field)
+
+    if value is None:
+        logger.debug('Element not found in get_value_from_tag!')
+        raise RuntimeError(error_msg)
+
+    return value
+
+
+def get_url_from_partial_link(
+        html: str, partial_link: str, error_msg: str,
+        backend: Optional[str] = None) -> str:
+    """
+    Find and return the last href link which contains text partial_link.
+
+    Args:
+        html: HTML source code of the page.
+        partial_link: Partial text for identifying the link.
+        error_msg: Error message if the link is not found.
+        backend: Name of the backend in HTML_BACKENDS. If None,
+            DEFAULT_HTML_BACKEND will be used.
+
+    Returns:
+        URL of the link.
+
+    Raises:
+        RuntimeError: If the link cannot be found on the page.
+
+    """
+    target = _get_backend(backend).get_url_from_partial_link(
+        html, partial_link)
+    if target is None:
+        raise RuntimeError(error_msg)
+
+    return target
+
+
+def get_value_from_script(
+        html: str, script_id: Mapping[str, str], tag: str, name: str,
+        error_msg: str, backend: Optional[str] = None) -> str:
+    """
+    Get a value from a tag contained in a script.
+
+    Args:
+        html: HTML source code of the page.
+        script_id: Dictionary with identifiers for the script.
+        tag: Tag type of the HTML element contained in the script.
+        name: Tag name.
+        error_msg: Error message if extraction of value fails.
+        backend: Name of the backend in HTML_BACKENDS. If None,
+            DEFAULT_HTML_BACKEND will be used.
+
+    Returns:
+        Tag value in 'value' field.
+
+    Raises:
+        RuntimeError: If value cannot be found.
+
+    """
+    value = _get_backend(backend).get_value_from_script(
+        html, script_id, tag, name)
+    if value is None:
+        raise RuntimeError(error_msg)
+
+    return value
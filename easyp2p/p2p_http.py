@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module for creating requests sessions which share their connection pools.
+
+All sessions created by create_session use the same HTTPAdapter. Thus
+connections to a platform are kept alive and reused between the login, token,
+statement generation and download requests and also between several sessions
+for the same platform, e.g. when a statement is downloaded in chunks. Cookies
+and headers are not shared since every session has its own cookie jar.
+
+The adapter counts the sent requests and the opened connections per host.
+
+StatementWriter writes downloaded statements in chunks to a temporary file,
+thus the memory usage does not depend on the size of the statement.
+
+The asyncio engine uses httpx, which is an optional dependency. All clients
+created by create_async_client inside a shared_async_transport context share
+its connection pool.
+
+"""
+
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import os
+import socket
+import threading
+from typing import AsyncIterator, Callable, Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Maximal number of hosts whose connection pools are kept
+POOL_CONNECTIONS = 20
+# Maximal number of idle connections per host. Must be at least as large as
+# the number of concurrent requests to one host, see Settings.max_workers.
+POOL_MAXSIZE = 10
+# Only retry failed connection attempts since the platform requests are
+# not idempotent in general
+MAX_RETRIES = Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.5)
+# Detect connections which were silently dropped by the server
+SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+# Size of the chunks in which statements are downloaded
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+# Size of the chunks in which pages are read by status probes
+PROBE_CHUNK_SIZE = 1 << 12
+
+
+class ConnectionStats:
+
+    """Thread safe counters for requests and opened connections per host."""
+
+    def __init__(self) -> None:
+        """Constructor of ConnectionStats class."""
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.connections: Counter = Counter()
+
+    def add_request(self, host: str) -> None:
+        """
+        Count a request to host.
+
+        Args:
+            host: Host name of the request URL.
+
+        """
+        with self._lock:
+            self.requests[host] += 1
+
+    def add_connection(self, host: str) -> None:
+        """
+        Count a new connection to host.
+
+        Args:
+            host: Host name of the connection.
+
+        """
+        with self._lock:
+            self.connections[host] += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Get the total numbers of requests, opened and reused connections.
+
+        Returns:
+            Dictionary with the keys requests, opened and reused.
+
+        """
+        with self._lock:
+            requests_ = sum(self.requests.values())
+            opened = sum(self.connections.values())
+        return {
+            'requests': requests_,
+            'opened': opened,
+            'reused': max(requests_ - opened, 0),
+        }
+
+    def reset(self) -> None:
+        """Reset all counters."""
+        with self._lock:
+            self.requests.clear()
+            self.connections.clear()
+
+    def __str__(self) -> str:
+        stats = self.as_dict()
+        return (
+            f'{stats["requests"]} requests, {stats["opened"]} connections '
+            f'opened, {stats["reused"]} reused')
+
+
+class StatementWriter:
+
+    """
+    Context manager for writing a downloaded statement in chunks. The chunks
+    are written to a temporary file which replaces the statement only after
+    the download is complete. If the download fails, the temporary file is
+    removed and an existing statement is kept.
+    """
+
+    def __init__(
+            self, location: str, total: Optional[int] = None,
+            progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """
+        Constructor of StatementWriter class.
+
+        Args:
+            location: Absolute file path where to save the statement.
+            total: Expected size of the statement in bytes, usually the
+                Content-Length header. If None, progress is not reported.
+            progress: Function which is called with the number of received
+                bytes and total whenever the percentage of received bytes
+                changes. Default is None.
+
+        """
+        self.location = location
+        self.tmp_file = location + '.part'
+        self.total = total
+        self.progress = progress
+        self.received = 0
+        self._percent = -1
+        self._file = None
+
+    def __enter__(self) -> 'StatementWriter':
+        self._file = open(self.tmp_file, 'wb')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_file, self.location)
+        else:
+            os.remove(self.tmp_file)
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Write a chunk of the statement and report the progress.
+
+        Args:
+            chunk: Next chunk of the downloaded statement.
+
+        """
+        self._file.write(chunk)
+        self.received += len(chunk)
+        if self.progress and self.total:
+            percent = min(self.received * 100 // self.total, 100)
+            if percent != self._percent:
+                self._percent = percent
+                self.progress(self.received, self.total)
+
+
+def get_content_length(headers: Mapping[str, str]) -> Optional[int]:
+    """
+    Get the size of the response body from the response headers.
+
+    Args:
+        headers: Response headers.
+
+    Returns:
+        Value of the Content-Length header or None if it is missing or
+        invalid.
+
+    """
+    try:
+        return int(headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_validators(headers: Mapping[str, str]) -> Dict[str, str]:
+    """
+    Get the headers for a conditional request from the validators of a
+    response.
+
+    Args:
+        headers: Response headers.
+
+    Returns:
+        Dictionary with If-None-Match and If-Modified-Since headers if the
+        response contained an ETag or Last-Modified header, respectively.
+
+    """
+    validators = dict()
+    if headers.get('ETag'):
+        validators['If-None-Match'] = headers['ETag']
+    if headers.get('Last-Modified'):
+        validators['If-Modified-Since'] = headers['Last-Modified']
+    return validators
+
+
+def _counting_pool(
+        pool_class: type, stats: ConnectionStats) -> type:
+    """
+    Create a connection pool class which counts its new connections.
+
+    Args:
+        pool_class: urllib3 connection pool class.
+        stats: ConnectionStats instance for counting the connections.
+
+    Returns:
+        Subclass of pool_class.
+
+    """
+    class CountingPool(pool_class):  # pylint: disable=too-few-public-methods
+
+        """Connection pool which counts new connections."""
+
+        def _new_conn(self):
+            stats.add_connection(self.host)
+            return super()._new_conn()
+
+    return CountingPool
+
+
+class P2PHTTPAdapter(HTTPAdapter):
+
+    """
+    HTTPAdapter with tuned connection pools which can be shared by several
+    sessions and threads.
+    """
+
+    def __init__(self) -> None:
+        """Constructor of P2PHTTPAdapter class."""
+        self.stats = ConnectionStats()
+        super().__init__(
+            pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+            max_retries=MAX_RETRIES)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        """Create the pool manager with keep-alive socket options and
+        connection counting pools."""
+        kwargs['socket_options'] = SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.stats),
+            'https': _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+    def send(self, request, *args, **kwargs) -> requests.Response:
+        """Count and send the request."""
+        self.stats.add_request(urlparse(request.url).hostname)
+        return super().send(request, *args, **kwargs)
+
+    def close(self) -> None:
+        """
+        Do nothing since the pools are shared with other sessions. Use
+        close_pools for closing all pooled connections.
+        """
+
+    def close_pools(self) -> None:
+        """Close all pooled connections."""
+        super().close()
+
+
+_ADAPTER: Optional[P2PHTTPAdapter] = None
+_ADAPTER_LOCK = threading.Lock()
+
+
+def get_shared_adapter() -> P2PHTTPAdapter:
+    """
+    Get the HTTPAdapter which is shared by all sessions.
+
+    Returns:
+        Shared P2PHTTPAdapter instance.
+
+    """
+    global _ADAPTER  # pylint: disable=global-statement
+    with _ADAPTER_LOCK:
+        if _ADAPTER is None:
+            _ADAPTER = P2PHTTPAdapter()
+        return _ADAPTER
+
+
+def create_session(
+        adapter: Optional[P2PHTTPAdapter] = None) -> requests.Session:
+    """
+    Create a requests session which uses the shared connection pools.
+
+    Args:
+        adapter: Adapter which should be used for all requests. If None, the
+            shared adapter will be used. Default is None.
+
+    Returns:
+        New requests session with its own cookies and headers.
+
+    """
+    if adapter is None:
+        adapter = get_shared_adapter()
+    sess = requests.Session()
+    sess.mount('https://', adapter)
+    sess.mount('http://', adapter)
+    return sess
+
+
+def get_connection_stats() -> ConnectionStats:
+    """
+    Get the connection statistics of the shared adapter.
+
+    Returns:
+        ConnectionStats of all sessions created by create_session.
+
+    """
+    return get_shared_adapter().stats
+
+
+def reset_connection_stats() -> None:
+    """Reset the connection statistics of the shared adapter."""
+    get_connection_stats().reset()
+
+
+# True if the asyncio engine can be used
+ASYNC_AVAILABLE = httpx is not None
+
+# Exceptions of the HTTP libraries if a request fails, e.g. because the
+# connection is reset
+NETWORK_ERRORS = (requests.exceptions.RequestException,) + (
+    (httpx.HTTPError,) if httpx is not None else ())
+
+_ASYNC_TRANSPORT: ContextVar = ContextVar('async_transport', default=None)
+
+
+class _SharedAsyncTransport:
+
+    """
+    Transport which delegates all requests to a shared transport. Closing
+    a client does not close the shared transport.
+    """
+
+    def __init__(self, transport: 'httpx.AsyncHTTPTransport') -> None:
+        self.transport = transport
+
+    async def handle_async_request(
+            self, request: 'httpx.Request') -> 'httpx.Response':
+        """
+        Send the request over the shared transport.
+
+        Args:
+            request: Request of the client.
+
+        Returns:
+            Response of the shared transport.
+
+        """
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        """The shared transport is closed by shared_async_transport."""
+
+
+@asynccontextmanager
+async def shared_async_transport() -> AsyncIterator[
+        'httpx.AsyncHTTPTransport']:
+    """
+    Async context manager which shares one connection pool between all
+    clients created by create_async_client in this context, including the
+    tasks started in it.
+
+    Yields:
+        Shared httpx transport.
+
+    """
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=None, max_keepalive_connections=POOL_MAXSIZE),
+        retries=MAX_RETRIES.connect)
+    token = _ASYNC_TRANSPORT.set(transport)
+    try:
+        async with transport:
+            yield transport
+    finally:
+        _ASYNC_TRANSPORT.reset(token)
+
+
+def create_async_client() -> 'httpx.AsyncClient':
+    """
+    Create an httpx client which behaves like a session of create_session.
+    Inside a shared_async_transport context the shared connection pool is
+    used.
+
+    Returns:
+        New httpx client with its own cookies and headers.
+
+    Raises:
+        RuntimeError: If httpx is not installed.
+
+    """
+    if httpx is None:
+        raise RuntimeError('httpx is required for the asyncio engine!')
+    transport = _ASYNC_TRANSPORT.get()
+    if transport is not None:
+        transport = _SharedAsyncTransport(transport)
+    return httpx.AsyncClient(
+        transport=transport, follow_redirects=True, timeout=None,
+        limits=httpx.Limits(
+            max_connections=None, max_keepalive_connections=POOL_MAXSIZE))
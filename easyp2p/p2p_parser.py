@@ -9,22 +9,47 @@ purpose of this module is to provide parser methods to transform them into a
 single output format.
 
 """
+from dataclasses import dataclass
 from datetime import date
+import io
 import logging
+import mmap
+import os
 from pathlib import Path
-from typing import Mapping, Optional, Tuple
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from pandas.errors import ParserError
-from PyQt5.QtCore import QCoreApplication
 
+from easyp2p import p2p_qt
+from easyp2p.excel_reader import read_xlsx, XLSX_ENGINES
 from easyp2p.p2p_signals import Signals
 
-_translate = QCoreApplication.translate
+_translate = p2p_qt.translate
 logger = logging.getLogger('easyp2p.p2p_parser')
 
 
+@dataclass(frozen=True)
+class ReadOptions:
+    """Options for reading an account statement from a file."""
+    # Row number to use as column names and start of data
+    header: int = 0
+    # Rows to skip at the end of the statement
+    skipfooter: int = 0
+    # Columns which will be read. Columns which are not in the file are
+    # ignored. If None, all columns will be read.
+    usecols: Optional[Iterable[str]] = None
+    # Dictionary with data types of the columns
+    dtype: Optional[Mapping[str, str]] = None
+    # Columns which will be converted to datetime while reading the file
+    date_columns: Optional[Sequence[str]] = None
+    # Date format of date_columns
+    date_format: Optional[str] = None
+    # Engine for reading xlsx files, see excel_reader.XLSX_ENGINES. If None,
+    # the default engine will be used.
+    xlsx_engine: Optional[str] = None
+
+
 class P2PParser:
     """
     Parser class to transform P2P account statements into easyp2p format.
@@ -79,8 +104,9 @@ class P2PParser:
     @signals.watch_errors
     def __init__(
             self, name: str, date_range: Tuple[date, date],
-            statement_file_name: str, header: int = 0,
-            skipfooter: int = 0, signals: Optional[Signals] = None) -> None:
+            statement_file_name: str,
+            options: Optional[ReadOptions] = None,
+            signals: Optional[Signals] = None) -> None:
         """
         Constructor of P2PParser class.
 
@@ -90,9 +116,8 @@ class P2PParser:
                 statement was generated
             statement_file_name: File name including absolute path of the
                 downloaded account statement for this platform
-            header: Row number to use as column names and start of data in the
-                statement.
-            skipfooter: Rows to skip at the end of the statement.
+            options: Options for reading the statement. If None, the
+                default options will be used.
             signals: Signals instance for communicating with the calling class.
 
         Raises:
@@ -102,12 +127,15 @@ class P2PParser:
         """
         self.name = name
         self.date_range = date_range
+        # Dates on which the known and unknown cash flow types occur, they
+        # are set while mapping the cash flow types
+        self.cf_type_dates: Dict[str, List[date]] = {}
+        self.unknown_cf_type_dates: Dict[str, List[date]] = {}
 
         if signals:
             self.signals.connect_signals(signals)
 
-        self.df = get_df_from_file(
-            statement_file_name, header=header, skipfooter=skipfooter)
+        self.df = get_df_from_file(statement_file_name, options)
         self.logger = logging.getLogger('easyp2p.p2p_parser.P2PParser')
 
         # Check if account statement exists
@@ -137,6 +165,9 @@ class P2PParser:
         """
         Aggregate results in value_column by date and currency.
 
+        The sums per cash flow type and the start and end balances are
+        computed together in a single groupby pass over the DataFrame.
+
         Args:
             value_column: Name of the DataFrame column which contains the
                 data to be aggregated
@@ -146,28 +177,51 @@ class P2PParser:
         self.logger.debug(
             '%s: start aggregating results in column %s.',
             self.name, value_column)
-        orig_df = self.df
-        if value_column:
-            self.df = self.df.pivot_table(
-                values=value_column, index=[self.DATE, self.CURRENCY],
-                columns=[self.CF_TYPE], aggfunc=np.sum)
-            self.df.reset_index(inplace=True)
-        self.df.fillna(0, inplace=True)
+        if not value_column:
+            self.df.fillna(0, inplace=True)
+            self.logger.debug('%s: finished aggregating results.', self.name)
+            return
+
+        # Spread the values into one column per cash flow type. Cash flows
+        # with unknown type are not counted in any column.
+        cf_column = self.df[self.CF_TYPE].astype('category')
+        cf_column = cf_column.cat.remove_unused_categories()
+        codes = cf_column.cat.codes.to_numpy()
+        cf_types = cf_column.cat.categories
+        rows = np.flatnonzero(codes >= 0)
+        cf_values = np.zeros((len(self.df), len(cf_types)))
+        cf_values[rows, codes[rows]] = self.df[value_column].to_numpy(
+            dtype='float64', na_value=np.nan)[rows]
+        df = pd.DataFrame(cf_values, columns=cf_types, index=self.df.index)
+        aggregations = {cf_type: (cf_type, 'sum') for cf_type in cf_types}
+
+        group_keys = [self.DATE, self.CURRENCY]
+        df[group_keys] = self.df[group_keys]
+        df[self.CF_TYPE] = codes >= 0
+        aggregations[self.CF_TYPE] = (self.CF_TYPE, 'any')
+        if balance_column:
+            df[self.START_BALANCE_NAME] = self.df[balance_column]
+            df[self.END_BALANCE_NAME] = self.df[balance_column]
+            df[value_column] = self.df[value_column]
+            aggregations[self.START_BALANCE_NAME] = (
+                self.START_BALANCE_NAME, 'first')
+            aggregations[self.END_BALANCE_NAME] = (
+                self.END_BALANCE_NAME, 'last')
+            aggregations[value_column] = (value_column, 'first')
+
+        df = df.groupby(group_keys, sort=True).agg(**aggregations)
+
+        # Only keep days on which at least one known cash flow occurred
+        df = df[df.pop(self.CF_TYPE)]
 
-        # Start and end balance columns were summed up as well if they were
-        # present. That's obviously not correct, so we will look up the correct
-        # values in the original DataFrame and overwrite the sums.
         if balance_column:
             # The start balance value of each day already includes the first
             # daily cash flow which needs to be subtracted again
-            self.df[self.START_BALANCE_NAME] = (
-                orig_df.groupby([self.DATE, self.CURRENCY]).first()[
-                    balance_column]
-                - orig_df.groupby(self.DATE).first()[
-                    value_column]).reset_index()[0]
-            self.df[self.END_BALANCE_NAME] = \
-                orig_df.groupby([self.DATE, self.CURRENCY]).last()[
-                    balance_column].reset_index()[balance_column]
+            df[self.START_BALANCE_NAME] -= df[value_column]
+            df.drop(columns=value_column, inplace=True)
+
+        self.df = df.reset_index()
+        self.df.fillna(0, inplace=True)
         self.logger.debug('%s: finished aggregating results.', self.name)
 
     def _filter_date_range(self, date_format: str) -> None:
@@ -182,8 +236,11 @@ class P2PParser:
         start_date = pd.Timestamp(self.date_range[0])
         end_date = pd.Timestamp(self.date_range[1]).replace(
             hour=23, minute=59, second=59)
-        self.df[self.DATE] = pd.to_datetime(
-            self.df[self.DATE], format=date_format)
+        # Dates are usually converted while reading the statement. Only dates
+        # which are nested in the statement (e.g. Viventor) need conversion.
+        if not pd.api.types.is_datetime64_any_dtype(self.df[self.DATE]):
+            self.df[self.DATE] = pd.to_datetime(
+                self.df[self.DATE], format=date_format)
         self.df = self.df[
             (self.df[self.DATE] >= start_date)
             & (self.df[self.DATE] <= end_date)]
@@ -216,30 +273,39 @@ class P2PParser:
             '%s: mapping cash flow types %s contained in column %s.',
             self.name, str(cashflow_types.keys()), orig_cf_column)
 
-        self.df[orig_cf_column] = self.df[orig_cf_column].str.strip()
-        self.df[self.CF_TYPE] = self.df[orig_cf_column].map(cashflow_types)
-
-        # All unknown cash flow types will be NaN
-        unknown_cf_types = self.df[orig_cf_column].where(
-            self.df[self.CF_TYPE].isna()).dropna().tolist()
-
-        # Remove duplicates, sort the entries and make them immutable
-        unknown_cf_types = tuple(sorted(set(unknown_cf_types)))
+        # Convert the cash flow types to categoricals. Stripping and mapping
+        # is then done only once per distinct cash flow type instead of once
+        # per row.
+        orig_cf = self.df[orig_cf_column].astype('category')
+        orig_codes = orig_cf.cat.codes.to_numpy()
+        stripped_codes, stripped_types = pd.factorize(
+            orig_cf.cat.categories.str.strip())
+        orig_codes = _recode(orig_codes, stripped_codes)
+        self.df[orig_cf_column] = pd.Categorical.from_codes(
+            orig_codes, stripped_types)
+
+        mapped_types = stripped_types.map(cashflow_types)
+        mapped_codes, cf_types = pd.factorize(mapped_types)
+        self.df[self.CF_TYPE] = pd.Categorical.from_codes(
+            _recode(orig_codes, mapped_codes), cf_types)
+
+        # All unknown cash flow types are mapped to NaN. Sort them and make
+        # them immutable.
+        unknown_cf_types = tuple(sorted(stripped_types[mapped_types.isna()]))
+        unknown = self.df[self.CF_TYPE].isna()
+        self.cf_type_dates = _get_type_dates(
+            self.df.loc[~unknown, self.DATE],
+            self.df.loc[~unknown, self.CF_TYPE])
+        self.unknown_cf_type_dates = _get_type_dates(
+            self.df.loc[unknown, self.DATE],
+            self.df.loc[unknown, orig_cf_column])
         self.logger.debug('%s: mapping successful.', self.name)
         return unknown_cf_types
 
     def _add_zero_line(self):
         """Add a single zero cash flow for start date to the DataFrame."""
         self.logger.debug('%s: adding zero cash flow.', self.name)
-        data = [
-            (self.name, 'EUR', self.date_range[0],
-             *[0.] * len(self.TARGET_COLUMNS))]
-        columns = [
-            self.PLATFORM, self.CURRENCY, self.DATE,
-            *self.TARGET_COLUMNS]
-        self.df = pd.DataFrame(data=data, columns=columns)
-        self.df.set_index(
-            [self.PLATFORM, self.CURRENCY, self.DATE], inplace=True)
+        self.df = get_zero_line(self.name, self.date_range[0])
         self.logger.debug('%s: added zero cash flow.', self.name)
 
     @signals.watch_errors
@@ -373,51 +439,300 @@ class P2PParser:
         return unknown_cf_types
 
 
+def _recode(codes: np.ndarray, mapping: np.ndarray) -> np.ndarray:
+    """
+    Translate categorical codes by a mapping from old to new codes.
+
+    Args:
+        codes: Categorical codes, -1 means NaN.
+        mapping: Array which contains the new code at the position of each old
+            code. -1 means NaN.
+
+    Returns:
+        New categorical codes.
+
+    """
+    # Appending -1 makes sure that NaN codes stay NaN
+    return np.append(mapping, -1)[codes]
+
+
+def _get_type_dates(
+        dates: pd.Series, types: pd.Series) -> Dict[str, List[date]]:
+    """
+    Get the dates on which each cash flow type occurs.
+
+    Args:
+        dates: Dates of the cash flows.
+        types: Cash flow types of the cash flows.
+
+    Returns:
+        Dictionary with the sorted dates for each cash flow type.
+
+    """
+    pairs = pd.DataFrame({'date': dates.to_numpy(), 'type': types.to_numpy()})
+    pairs = pairs.drop_duplicates().sort_values('date')
+    return {
+        str(cf_type): list(group['date'])
+        for cf_type, group in pairs.groupby('type', sort=True)}
+
+
+def types_in_range(
+        type_dates: Mapping[str, Sequence[date]],
+        date_range: Tuple[date, date]) -> Tuple[str, ...]:
+    """
+    Get all cash flow types which occur in date_range.
+
+    Args:
+        type_dates: Dates on which each cash flow type occurs.
+        date_range: Date range (start_date, end_date).
+
+    Returns:
+        Sorted tuple of the cash flow types which occur in date_range.
+
+    """
+    start_date, end_date = date_range
+    return tuple(sorted(
+        cf_type for cf_type, dates in type_dates.items()
+        if any(start_date <= day <= end_date for day in dates)))
+
+
+def concat_results(dfs: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate parsed account statements into a single DataFrame.
+
+    All statements are concatenated at once instead of appending them one by
+    one, which would copy the accumulated results for every statement. The
+    columns are aligned to P2PParser.TARGET_COLUMNS: target columns come first
+    in their target order, followed by all other columns in order of
+    appearance. Empty DataFrames are ignored.
+
+    Args:
+        dfs: Iterable of parsed account statements. It is consumed only once,
+            thus it can also be a generator.
+
+    Returns:
+        DataFrame containing all parsed account statements.
+
+    """
+    dfs = [df for df in dfs if not df.empty]
+    if not dfs:
+        return pd.DataFrame()
+
+    all_columns = dict.fromkeys(col for df in dfs for col in df.columns)
+    columns = [col for col in P2PParser.TARGET_COLUMNS if col in all_columns]
+    columns += [col for col in all_columns if col not in columns]
+
+    return pd.concat(dfs, sort=False).reindex(columns=columns)
+
+
+def get_zero_line(name: str, day: date) -> pd.DataFrame:
+    """
+    Get the parse result of a platform without cash flows.
+
+    Args:
+        name: Name of the P2P platform.
+        day: Date of the zero cash flow, usually the start of the date range.
+
+    Returns:
+        DataFrame with a single zero cash flow in EUR.
+
+    """
+    data = [(name, 'EUR', day, *[0.] * len(P2PParser.TARGET_COLUMNS))]
+    columns = [
+        P2PParser.PLATFORM, P2PParser.CURRENCY, P2PParser.DATE,
+        *P2PParser.TARGET_COLUMNS]
+    return pd.DataFrame(data=data, columns=columns).set_index(
+        [P2PParser.PLATFORM, P2PParser.CURRENCY, P2PParser.DATE])
+
+
+def filter_date_range(
+        df: pd.DataFrame, name: str, date_range: Tuple[date, date],
+        cf_type_dates: Optional[Mapping[str, Sequence[date]]] = None) \
+        -> pd.DataFrame:
+    """
+    Only keep the parse results of a platform in date_range.
+
+    Args:
+        df: Parse result of P2PParser.
+        name: Name of the P2P platform.
+        date_range: Date range (start_date, end_date) of the results.
+        cf_type_dates: Dates on which the cash flow types of df occur. If
+            provided, the columns of cash flow types which do not occur in
+            date_range are dropped, like P2PParser does. Default is None.
+
+    Returns:
+        Results in date_range or a zero line for the start date if there are
+        no results in date_range.
+
+    """
+    start_date, end_date = date_range
+    in_range = np.fromiter((
+        start_date <= day <= end_date
+        for day in df.index.get_level_values(P2PParser.DATE)),
+        dtype=bool, count=len(df))
+    if not in_range.any():
+        return get_zero_line(name, start_date)
+    df = df[in_range]
+    if cf_type_dates:
+        in_range_types = types_in_range(cf_type_dates, date_range)
+        df = df.drop(columns=[
+            col for col in cf_type_dates
+            if col in df.columns and col not in in_range_types])
+    return df
+
+
 def get_df_from_file(
-        input_file: str, header: int = 0, skipfooter: int = 0) -> pd.DataFrame:
+        input_file: str,
+        options: Optional[ReadOptions] = None) -> pd.DataFrame:
     """
     Read a pandas.DataFrame from input_file.
 
     Args:
         input_file: File name including path.
-        header: Row number to use as column names and start of data.
-        skipfooter: Rows to skip at the end of the statement.
+        options: Options for reading the file. If None, the default options
+            will be used.
 
     Returns:
         pandas.DataFrame: DataFrame which was read from the file.
 
     Raises:
-        RuntimeError: If input_file does not exist, cannot be read or if the \
-            file format is neither csv or xlsx.
+        RuntimeError: If input_file does not exist, cannot be read, if the \
+            file format is neither csv, xlsx or json or if the xlsx engine \
+            is unknown.
 
     """
 
     file_format = Path(input_file).suffix
+    options = options or ReadOptions()
+    header, skipfooter, dtype = \
+        options.header, options.skipfooter, options.dtype
+
+    if options.xlsx_engine and options.xlsx_engine not in XLSX_ENGINES:
+        raise RuntimeError(_translate(
+            'P2PParser', f'Unknown engine for reading xlsx files: '
+            f'{options.xlsx_engine}'))
+
+    # A callable ignores missing columns instead of raising an error. This
+    # allows P2PParser.check_columns to report them.
+    usecols = None
+    if options.usecols is not None:
+        usecols = frozenset(options.usecols).__contains__
 
     try:
         if file_format == '.csv':
             if skipfooter:
-                # The default 'c' engine does not support skipfooter
-                df = pd.read_csv(
-                    input_file, header=header, skipfooter=skipfooter,
-                    engine='python')
+                df = _read_csv_without_footer(
+                    input_file, skipfooter, header=header, usecols=usecols,
+                    dtype=dtype)
             else:
-                df = pd.read_csv(input_file, header=header)
-        elif file_format in ('.xlsx', '.xls'):
-            df = pd.read_excel(input_file, header=header, skipfooter=skipfooter)
+                df = pd.read_csv(
+                    input_file, header=header, usecols=usecols, dtype=dtype)
+        elif file_format == '.xlsx':
+            df = read_xlsx(
+                input_file, engine=options.xlsx_engine, header=header,
+                skipfooter=skipfooter, usecols=usecols, dtype=dtype)
+        elif file_format == '.xls':
+            df = pd.read_excel(
+                input_file, header=header, skipfooter=skipfooter,
+                usecols=usecols, dtype=dtype)
         elif file_format == '.json':
-            df = pd.read_json(input_file)
+            # Do not let pandas guess the format of date_columns
+            df = pd.read_json(
+                input_file, dtype=dtype or True,
+                keep_default_dates=not options.date_columns)
+            if usecols is not None:
+                df = df[[column for column in df.columns if usecols(column)]]
         else:
             raise RuntimeError(_translate(
                 'P2PParser',
                 f'Unknown file format during import: {input_file}'))
+        _convert_date_columns(df, options.date_columns, options.date_format)
     except FileNotFoundError:
         logger.exception('File not found.')
         raise RuntimeError(_translate(
             'P2PParser', f'{input_file} could not be found!'))
-    except ParserError:
+    except ValueError:
+        # Includes ParserError and values which do not match dtype or
+        # date_format
         msg = f'{input_file} could not be parsed!'
         logger.exception(msg)
         raise RuntimeError(_translate('P2PParser', msg))
 
     return df
+
+
+def _read_csv_without_footer(
+        input_file: str, skipfooter: int, header: int = 0,
+        **kwargs) -> pd.DataFrame:
+    """
+    Read a csv file without its last skipfooter lines.
+
+    The python engine of pandas.read_csv, which is required for skipfooter,
+    is much slower than the default C engine. Thus the footer is cut off at
+    byte level by searching backwards from the end of the memory-mapped file
+    and only the remaining bytes are parsed by the C engine. Like the python
+    engine, blank lines count as footer lines. Footers with quoted line
+    breaks are not supported. Files with CR line ends only are read by the
+    python engine.
+
+    Args:
+        input_file: File name including path.
+        skipfooter: Number of lines to skip at the end of the file.
+        header: Row number to use as column names and start of data.
+        **kwargs: Additional keyword arguments for pandas.read_csv.
+
+    Returns:
+        DataFrame which was read from the file.
+
+    """
+    with open(input_file, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return pd.read_csv(file, header=header, **kwargs)
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if b'\n' not in data and b'\r' in data:
+                file.seek(0)
+                return pd.read_csv(
+                    file, header=header, skipfooter=skipfooter,
+                    engine='python', **kwargs)
+
+            # The footer must never include the header lines
+            header_end = -1
+            for _ in range(header + 1):
+                header_end = data.find(b'\n', header_end + 1)
+                if header_end < 0:
+                    header_end = len(data)
+                    break
+
+            end = len(data)
+            if data[end - 1:end] == b'\n':
+                end -= 1
+            for _ in range(skipfooter):
+                end = data.rfind(b'\n', 0, end)
+                if end < 0:
+                    break
+
+            return pd.read_csv(
+                io.BytesIO(data[:max(end, header_end)]), header=header,
+                **kwargs)
+
+
+def _convert_date_columns(
+        df: pd.DataFrame, date_columns: Optional[Sequence[str]],
+        date_format: Optional[str]) -> None:
+    """
+    Convert the date columns of df to datetime.
+
+    Args:
+        df: DataFrame whose columns will be converted in place.
+        date_columns: Columns which contain dates. Columns which are not
+            present in df are ignored.
+        date_format: Date format of date_columns.
+
+    """
+    if not date_columns or not date_format:
+        return
+
+    for column in date_columns:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], format=date_format)
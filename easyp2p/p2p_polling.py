@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module containing the polling schedule for waiting on statement generation.
+
+P2PSession.wait and AsyncP2PSession.wait poll with exponentially increasing,
+jittered delays until a deadline and honor Retry-After headers. The time each
+platform needed for generating its statement is recorded in
+generation_times, so the deadlines can be tuned from real data.
+
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import json
+import logging
+import os
+import random
+import statistics
+import threading
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+logger = logging.getLogger('easyp2p.p2p_polling')
+
+
+@dataclass
+class Backoff:
+    """Exponential backoff with jitter for polling."""
+    initial_delay: float = 1.
+    factor: float = 2.
+    max_delay: float = 15.
+    # Each delay is reduced by a random fraction of up to jitter
+    jitter: float = 0.5
+
+    def delays(self) -> Iterator[float]:
+        """
+        Generate the delays between two polls.
+
+        Yields:
+            Delay in seconds before the next poll.
+
+        """
+        delay = self.initial_delay
+        while True:
+            yield delay * random.uniform(1 - self.jitter, 1)
+            delay = min(delay * self.factor, self.max_delay)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    Get the delay requested by the Retry-After header of a response.
+
+    Args:
+        headers: Response headers. Can be None if there is no response.
+
+    Returns:
+        Delay in seconds or None if the header is missing or invalid.
+
+    """
+    if not headers or 'Retry-After' not in headers:
+        return None
+    value = headers['Retry-After'].strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.)
+
+
+class GenerationTimes:
+
+    """Thread safe record of the statement generation times per platform."""
+
+    # Maximal number of recorded generation times per platform
+    MAX_RECORDS = 50
+
+    def __init__(self) -> None:
+        """Constructor of GenerationTimes class."""
+        self._lock = threading.Lock()
+        self._records: Dict[str, List[Dict[str, object]]] = dict()
+
+    def record(self, name: str, seconds: float, success: bool) -> None:
+        """
+        Record how long a platform needed for generating its statement.
+
+        Args:
+            name: Name of the P2P platform.
+            seconds: Waiting time in seconds.
+            success: False if the deadline was reached before the statement
+                was ready.
+
+        """
+        logger.info(
+            '%s: statement generation %s after %.1f s.', name,
+            'finished' if success else 'timed out', seconds)
+        with self._lock:
+            self._records.setdefault(name, []).append({
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'seconds': round(seconds, 1),
+                'success': success})
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize the recorded generation times of successful generations.
+
+        Returns:
+            Dictionary with platform names as keys and dictionaries with
+            count, median and max of the generation times as values.
+
+        """
+        with self._lock:
+            records = {
+                name: [r['seconds'] for r in recs if r['success']]
+                for name, recs in self._records.items()}
+        return {
+            name: {
+                'count': len(times), 'median': statistics.median(times),
+                'max': max(times)}
+            for name, times in records.items() if times}
+
+    def save(
+            self, file_name: str,
+            names: Optional[Iterable[str]] = None) -> None:
+        """
+        Append the recorded generation times to a JSON file and remove them
+        from the record. Only the last MAX_RECORDS times per platform are kept.
+        Errors are only logged since the statistics are not essential.
+
+        Args:
+            file_name: File name including path of the JSON file.
+            names: Names of the platforms whose generation times should be
+                saved. If None, all platforms will be saved. Default is None.
+
+        """
+        with self._lock:
+            records = {
+                name: list(recs) for name, recs in self._records.items()
+                if recs and (names is None or name in names)}
+        if not records:
+            return
+
+        try:
+            with open(file_name, encoding='utf-8') as file:
+                existing = json.load(file)
+        except (OSError, ValueError):
+            existing = dict()
+        # Valid JSON of other types is replaced like invalid JSON
+        if not isinstance(existing, dict):
+            existing = dict()
+
+        for name, recs in records.items():
+            saved = existing.get(name)
+            if not isinstance(saved, list):
+                saved = []
+            existing[name] = (saved + recs)[-self.MAX_RECORDS:]
+
+        tmp_file = file_name + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as file:
+                json.dump(existing, file, indent=2)
+            os.replace(tmp_file, file_name)
+        except OSError:
+            logger.warning(
+                'Generation times could not be saved.', exc_info=True)
+            return
+
+        with self._lock:
+            for name, recs in records.items():
+                del self._records[name][:len(recs)]
+
+
+# Generation times of all platforms evaluated by this process
+generation_times = GenerationTimes()
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Module providing the Qt classes which are used outside of the GUI.
+
+The worker, sessions, parser and writers only need QCoreApplication.translate,
+QObject, QThread and signals from PyQt5. By default this module provides the
+PyQt5 versions, thus the GUI works as before. The command line interface,
+easyp2p.p2p_cli.main, calls use_headless before importing any other easyp2p
+module. Afterwards the pure Python replacements below are provided and PyQt5
+is never imported.
+
+The classes are looked up on first access, e.g.
+from easyp2p.p2p_qt import QObject, Signal.
+
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Names of the classes which are provided by this module
+_BINDING_NAMES = ('QObject', 'QThread', 'Signal', 'Slot')
+
+_HEADLESS = False
+_BINDINGS: Optional[Dict[str, Any]] = None
+
+# The classes are only declared here. They are looked up on first access by
+# __getattr__, see _get_bindings.
+QObject: Any
+QThread: Any
+Signal: Any
+Slot: Any
+
+
+def use_headless() -> None:
+    """
+    Use the pure Python replacements instead of PyQt5.
+
+    Raises:
+        RuntimeError: If the PyQt5 classes were already provided.
+
+    """
+    global _HEADLESS  # pylint: disable=global-statement
+    if _BINDINGS is not None and not _HEADLESS:
+        raise RuntimeError(
+            'use_headless must be called before importing the easyp2p '
+            'modules!')
+    _HEADLESS = True
+
+
+def is_headless() -> bool:
+    """
+    Check if the pure Python replacements are used.
+
+    Returns:
+        True if PyQt5 is not used.
+
+    """
+    return _HEADLESS
+
+
+def translate(
+        context: str, text: str, disambiguation: Optional[str] = None,
+        n: int = -1) -> str:
+    """
+    Translate text with QCoreApplication.translate. In headless mode the
+    text is returned untranslated.
+
+    Args:
+        context: Translation context, usually the class or module name.
+        text: Text which should be translated.
+        disambiguation: Comment for the translators. Default is None.
+        n: Number for plural forms. Default is -1.
+
+    Returns:
+        Translated text.
+
+    """
+    if _HEADLESS:
+        return text
+    # pylint: disable=import-outside-toplevel
+    from PyQt5.QtCore import QCoreApplication
+    return QCoreApplication.translate(context, text, disambiguation, n)
+
+
+class BoundSignal:
+
+    """Signal of a HeadlessSignal instance, see pyqtBoundSignal."""
+
+    def __init__(self) -> None:
+        """Constructor of BoundSignal class."""
+        self._lock = threading.Lock()
+        self._slots: List[Callable] = []
+
+    def connect(self, slot: Callable) -> None:
+        """
+        Connect a slot or another signal to the signal.
+
+        Args:
+            slot: Function or signal which is called when the signal is
+                emitted.
+
+        """
+        if isinstance(slot, BoundSignal):
+            slot = slot.emit
+        with self._lock:
+            self._slots.append(slot)
+
+    def disconnect(self) -> None:
+        """
+        Disconnect all slots.
+
+        Raises:
+            TypeError: If no slot is connected, like in PyQt5.
+
+        """
+        with self._lock:
+            if not self._slots:
+                raise TypeError('disconnect() failed between signal and all '
+                                'its connections')
+            self._slots.clear()
+
+    def emit(self, *args) -> None:
+        """
+        Call all connected slots in the emitting thread.
+
+        Args:
+            args: Arguments which are passed to the slots.
+
+        """
+        with self._lock:
+            slots = list(self._slots)
+        for slot in slots:
+            slot(*args)
+
+
+class HeadlessSignal:  # pylint: disable=too-few-public-methods
+
+    """
+    Replacement for pyqtSignal. Every instance of the owning class gets its
+    own BoundSignal.
+    """
+
+    def __init__(self, *types) -> None:
+        """
+        Constructor of HeadlessSignal class.
+
+        Args:
+            types: Types of the signal arguments. They are not checked.
+
+        """
+        self.types = types
+        self.name = ''
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        signal = instance.__dict__.get(self.name)
+        if signal is None:
+            signal = instance.__dict__.setdefault(self.name, BoundSignal())
+        return signal
+
+
+def headless_slot(*_types, **_kwargs) -> Callable:
+    """Replacement for pyqtSlot which leaves the function unchanged."""
+    return lambda func: func
+
+
+class HeadlessObject:  # pylint: disable=too-few-public-methods
+
+    """Replacement for QObject."""
+
+    def __init__(self, *_args, **_kwargs) -> None:
+        """Constructor of HeadlessObject class."""
+
+
+class HeadlessThread(HeadlessObject):
+
+    """Replacement for QThread which runs run in a Python thread."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Constructor of HeadlessThread class."""
+        super().__init__(*args, **kwargs)
+        self._thread: Optional[threading.Thread] = None
+
+    def run(self) -> None:
+        """Work of the thread, must be implemented by subclasses."""
+
+    def start(self) -> None:
+        """Call run in a new thread."""
+        self._thread = threading.Thread(target=self.run)
+        self._thread.start()
+
+    def isRunning(self) -> bool:  # pylint: disable=invalid-name
+        """
+        Check if the thread is running.
+
+        Returns:
+            True if run has not finished yet.
+
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self) -> bool:
+        """
+        Wait until run has finished.
+
+        Returns:
+            Always True.
+
+        """
+        if self._thread is not None:
+            self._thread.join()
+        return True
+
+
+def _get_bindings() -> Dict[str, Any]:
+    """
+    Get the classes for the current mode. They cannot change afterwards.
+
+    Returns:
+        Dictionary with the names in _BINDING_NAMES as keys and the classes as
+        values.
+
+    """
+    global _BINDINGS  # pylint: disable=global-statement
+    if _BINDINGS is None:
+        if _HEADLESS:
+            _BINDINGS = {
+                'QObject': HeadlessObject, 'QThread': HeadlessThread,
+                'Signal': HeadlessSignal, 'Slot': headless_slot}
+        else:
+            # pylint: disable=import-outside-toplevel
+            from PyQt5 import QtCore
+            _BINDINGS = {
+                'QObject': QtCore.QObject, 'QThread': QtCore.QThread,
+                'Signal': QtCore.pyqtSignal, 'Slot': QtCore.pyqtSlot}
+    return _BINDINGS
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _BINDING_NAMES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return _get_bindings()[name]
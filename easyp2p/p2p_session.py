@@ -5,23 +5,58 @@ Module implementing P2PSession, a class representing a P2P platform.
 
 This module defines the P2PSession class. It contains code for performing log
 in, log out, generating and downloading the account statement. It relies mainly
-on functionality provided by the requests Session object.
+on functionality provided by the requests Session object. All sessions share
+their connection pools, see p2p_http.
+
+The helper methods are written as flows, i.e. generators which yield every
+network operation and receive its result. P2PSession runs the flows
+synchronously. AsyncP2PSession overrides only the network operations and runs
+the same flows in an asyncio event loop, see p2p_async_session. The download
+flows of the platforms use the same pattern, thus they run on both sessions:
+
+    data = yield sess.get_values_from_tag_by_name(...)
+    yield sess.log_into_page(url, 'email', 'password', data)
 
 """
 
+from functools import wraps
+import inspect
 import logging
 import time
-from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+from typing import (
+    Any, Dict, Generator, Iterator, Mapping, Optional, Sequence, Tuple,
+    Union)
 
-from bs4 import BeautifulSoup
 import requests
 
+from easyp2p import p2p_html
 from easyp2p.p2p_credentials import get_credentials
+from easyp2p.p2p_http import (
+    create_session, DOWNLOAD_CHUNK_SIZE, get_connection_stats,
+    get_content_length, get_validators, NETWORK_ERRORS, PROBE_CHUNK_SIZE,
+    StatementWriter)
+from easyp2p.p2p_polling import Backoff, generation_times, parse_retry_after
 from easyp2p.p2p_signals import Signals
 from easyp2p.errors import PlatformErrors
 
+# Generator which yields network operations of a session and receives their
+# results
+Flow = Generator[Any, Any, Any]
+
+
+def session_method(flow):
+    """
+    Decorator for the helper methods of P2PSession which are written as flows.
+    Calling the method runs the flow with P2PSession.run, thus it returns the
+    result in P2PSession and an awaitable in AsyncP2PSession.
+    """
+    @wraps(flow)
+    def method(self, *args, **kwargs):
+        return self.run(flow(self, *args, **kwargs))
+    return method
+
 
-class P2PSession:
+class P2PSession:  # pylint: disable=too-many-instance-attributes
     """
     Representation of P2P session including required methods for interaction.
 
@@ -35,7 +70,8 @@ class P2PSession:
 
     def __init__(
             self, name: str, logout_url: str,
-            signals: Optional[Signals], json: bool = False) -> None:
+            signals: Optional[Signals], json: bool = False,
+            html_backend: Optional[str] = None) -> None:
         """
         Constructor of P2PSession class.
 
@@ -44,12 +80,20 @@ class P2PSession:
             logout_url: URL of the logout page.
             signals: Signals instance for communicating with the calling class.
             json: If True post data in requests in JSON format.
+            html_backend: Backend for extracting values from HTML pages, see
+                p2p_html.HTML_BACKENDS. If None, the default backend will be
+                used.
 
         """
         self.name = name
         self.logout_url = logout_url
         self.json = json
+        self.html_backend = html_backend
         self.sess = None
+        self.last_response = None
+        # Validators and value of the last probe per URL, see
+        # probe_value_from_tag
+        self.probes: Dict[str, Tuple[Dict[str, str], str]] = dict()
         self.logged_in = False
         self.errors = PlatformErrors(name)
         if signals:
@@ -66,11 +110,10 @@ class P2PSession:
             Instance of P2PSession class.
 
         """
-        self.sess = requests.Session()
+        self.sess = create_session()
         self.logger.debug('%s: created context manager.', self.name)
         return self
 
-    @signals.watch_errors
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         """
         End of context management protocol.
@@ -79,15 +122,139 @@ class P2PSession:
         P2P platform. This ensures that easyp2p cleanly logs out of the website
         even in case of errors.
 
+        """
+        self._logout()
+        self.logger.debug(
+            '%s: HTTP connections: %s.', self.name, get_connection_stats())
+
+    def run(self, flow: Any) -> Any:
+        """
+        Run a flow of the session or of a platform. The network operations
+        yielded by the flow already returned their results, which are sent
+        back into the flow.
+
+        Args:
+            flow: Flow to run. Other values are returned unchanged.
+
+        Returns:
+            Return value of the flow.
+
+        """
+        if not inspect.isgenerator(flow):
+            return flow
+        result = None
+        while True:
+            try:
+                result = flow.send(result)
+            except StopIteration as stop:
+                return stop.value
+
+    def _send(
+            self, method: str, url: str, stream: bool = False,
+            headers: Optional[Mapping[str, str]] = None,
+            **body) -> requests.Response:
+        """
+        Send a request. This is the network operation of request.
+
+        Args:
+            method: HTTP method, either 'get' or 'post'.
+            url: URL to which to send the request.
+            stream: If True, the response body is not downloaded immediately.
+            headers: Additional headers for the request.
+            body: Payload of the request, either data or json.
+
+        Returns:
+            Response returned by the URL.
+
+        """
+        return self.sess.request(
+            method, url, stream=stream, headers=headers, **body)
+
+    @staticmethod
+    def _chunks(
+            resp: requests.Response, size: int,
+            text: bool = False) -> Iterator[Union[bytes, str]]:
+        """
+        Iterate over the body of a streamed response in chunks.
+
+        Args:
+            resp: Response of a request with stream=True.
+            size: Chunk size in bytes.
+            text: If True, the chunks are decoded to strings.
+
+        Returns:
+            Iterator over the chunks.
+
+        """
+        return resp.iter_content(size, decode_unicode=text)
+
+    @staticmethod
+    def _next_chunk(
+            chunks: Iterator[Union[bytes, str]]) -> Optional[Union[bytes, str]]:
+        """
+        Get the next chunk of a response body.
+
+        Args:
+            chunks: Chunks returned by _chunks.
+
+        Returns:
+            Next chunk or None if the body is complete.
+
+        """
+        return next(chunks, None)
+
+    @staticmethod
+    def _sleep(delay: float) -> None:
+        """
+        Sleep between two polls of wait.
+
+        Args:
+            delay: Delay in seconds.
+
+        """
+        time.sleep(delay)
+
+    @staticmethod
+    def close_response(resp: requests.Response) -> None:
+        """
+        Close a streamed response which is not consumed.
+
+        Args:
+            resp: Response of a request with stream=True.
+
+        """
+        resp.close()
+
+    def get_credentials(self) -> Optional[Tuple[str, str]]:
+        """
+        Get the credentials of the platform from the keyring or the user.
+
+        Returns:
+            Tuple (username, password) or None if the user did not provide
+            them.
+
+        """
+        return get_credentials(self.name, self.signals)
+
+    @session_method
+    @signals.watch_errors
+    def _logout(self) -> Flow:
+        """
+        Log out of the P2P platform if the user is logged in.
+
         Raises:
             RuntimeWarning: If logout is not successful.
 
         """
         if self.logged_in:
-            resp = self.sess.get(self.logout_url)
+            try:
+                resp = yield self._send('get', self.logout_url)
+            except NETWORK_ERRORS as err:
+                raise RuntimeWarning(self.errors.logout_failed) from err
             if resp.status_code != 200:
                 raise RuntimeWarning(self.errors.logout_failed)
 
+    @session_method
     @signals.update_progress
     def log_into_page(
             self, url: str, name_field: str, password_field: str,
@@ -111,20 +278,21 @@ class P2PSession:
         """
         self.logger.debug('%s: logging into website.', self.name)
 
-        credentials = get_credentials(self.name, self.signals)
+        credentials = yield self.get_credentials()
 
         if data is None:
             data = dict()
         data[name_field] = credentials[0]
         data[password_field] = credentials[1]
 
-        resp = self.request(url, 'post', self.errors.login_failed, data)
+        resp = yield self.request(url, 'post', self.errors.login_failed, data)
 
         self.logged_in = True
         self.logger.debug('%s: successfully logged in.', self.name)
 
         return resp
 
+    @session_method
     @signals.update_progress
     def download_statement(
             self, url: str, location: str, method: str,
@@ -133,7 +301,7 @@ class P2PSession:
         Download account statement file.
 
         Downloads the generated account statement from the provided url. The
-        downloaded file will be saved at location.
+        downloaded file will be saved at location, see save_statement.
 
         Args:
             url: URL for downloading the statement.
@@ -143,22 +311,65 @@ class P2PSession:
             data: Dictionary with data for posting request to the URL.
 
         Raises:
-            RuntimeError: If the download page returns an error status code.
+            RuntimeError: If the download page returns an error status code
+                or the connection fails during the download.
+
+        """
+        resp = yield self.request(
+            url, method, self.errors.statement_download_failed, data,
+            stream=True)
+        try:
+            yield self.save_statement(resp, location)
+        except NETWORK_ERRORS as err:
+            self.logger.debug(
+                '%s: statement download failed.', self.name, exc_info=True)
+            raise RuntimeError(self.errors.statement_download_failed) from err
+
+    @session_method
+    def save_statement(
+            self, resp: requests.Response, location: str) -> None:
+        """
+        Save the body of a streamed response in chunks at location. The
+        statement is replaced only after the download is complete. If the
+        size of the statement is known, the download progress is reported.
+
+        Args:
+            resp: Response of a request with stream=True.
+            location: Absolute file path where to save the statement.
 
         """
-        resp = self.request(
-            url, method, self.errors.statement_download_failed, data)
+        try:
+            with StatementWriter(
+                    location, get_content_length(resp.headers),
+                    self._report_progress) as writer:
+                chunks = self._chunks(resp, DOWNLOAD_CHUNK_SIZE)
+                chunk = yield self._next_chunk(chunks)
+                while chunk is not None:
+                    writer.write(chunk)
+                    chunk = yield self._next_chunk(chunks)
+        finally:
+            yield self.close_response(resp)
+
+    def _report_progress(self, received: int, total: int) -> None:
+        """
+        Report the progress of a statement download.
+
+        Args:
+            received: Number of received bytes.
+            total: Size of the statement in bytes.
 
-        with open(location, 'bw') as file:
-            file.write(resp.content)
+        """
+        self.signals.download_progress.emit(self.name, received, total)
 
+    @session_method
     @signals.watch_errors
     def request(
             self, url: str, method: str, error_msg: str,
             data: Optional[
                 Mapping[str, Union[str, Sequence[int]]]] = None,
-            success_codes: Optional[Tuple[int, ...]] = None) \
-            -> requests.Response:
+            success_codes: Optional[Tuple[int, ...]] = None,
+            stream: bool = False,
+            headers: Optional[Mapping[str, str]] = None) -> requests.Response:
         """
         Helper method to send post or get request to an URL.
 
@@ -172,59 +383,93 @@ class P2PSession:
                 If none is provided, we assume 200 to be the success status
                 code.
             data: Dictionary with data for posting request to the URL.
+            stream: If True, the response body is not downloaded immediately.
+                The caller must consume or close the response. Default is
+                False.
+            headers: Additional headers for the request. Default is None.
 
         Returns:
             Response returned by the URL.
 
+        Raises:
+            RuntimeError: If the request fails or returns a status code which
+                is not in success_codes.
+
         """
         if success_codes is None:
             success_codes = (200,)
 
         if method == 'get':
-            resp = self.sess.get(url)
+            body = dict()
         elif method == 'post':
-            if self.json:
-                resp = self.sess.post(url, json=data)
-            else:
-                resp = self.sess.post(url, data=data)
+            body = {'json': data} if self.json else {'data': data}
         else:
             # This should never happen
             raise RuntimeError(self.errors.unknown_request_method(method))
 
+        try:
+            resp = yield self._send(method, url, stream, headers, **body)
+        except NETWORK_ERRORS as err:
+            self.logger.debug(
+                '%s: request to %s failed.', self.name, url, exc_info=True)
+            raise RuntimeError(error_msg) from err
+
+        self.last_response = resp
         if resp.status_code in success_codes:
             return resp
 
         self.logger.debug(
             '%s: returned status code %s', self.name, resp.status_code)
-        self.logger.debug(resp.text)
+        if stream:
+            yield self.close_response(resp)
+        else:
+            self.logger.debug(resp.text)
         raise RuntimeError(error_msg)
 
+    @session_method
     @signals.update_progress
     def wait(
-            self, func, time_delta: int = 2, max_wait_time: int = 30) -> None:
+            self, func, max_wait_time: float = 30,
+            backoff: Optional[Backoff] = None) -> None:
         """
         Wait until func returns True and raise an error if that does not happen
-        after at most max_wait_time seconds.
+        within max_wait_time seconds. The delays between two calls of func
+        grow exponentially. If the last response contained a Retry-After
+        header, the requested delay is used instead. The waiting time is
+        recorded in p2p_polling.generation_times.
 
         Args:
-            func: Function or method which returns True if the condition to
-                wait for is fulfilled.
-            time_delta: Time in seconds to wait before trying func again.
-            max_wait_time: Maximal waiting time before giving up.
+            func: Function, method or flow function which returns True if the
+                condition to wait for is fulfilled.
+            max_wait_time: Maximal waiting time in seconds before giving up.
+            backoff: Backoff for the delays between two calls of func. If
+                None, the default Backoff will be used. Default is None.
 
         Raises:
             RuntimeError: If max_waiting_time is reached and func did not
                 return True.
         """
-        wait_time = 0
-        while wait_time <= max_wait_time:
-            if func():
+        start = time.monotonic()
+        deadline = start + max_wait_time
+        for delay in (backoff or Backoff()).delays():
+            ready = yield self.run(func())
+            if ready:
+                generation_times.record(
+                    self.name, time.monotonic() - start, True)
                 return
-            time.sleep(time_delta)
-            wait_time += time_delta
-
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            retry_after = parse_retry_after(
+                getattr(self.last_response, 'headers', None))
+            if retry_after is not None:
+                delay = retry_after
+            yield self._sleep(min(delay, remaining))
+
+        generation_times.record(self.name, time.monotonic() - start, False)
         raise RuntimeError(self.errors.statement_generation_timeout)
 
+    @session_method
     @signals.watch_errors
     def get_values_from_tag_by_name(
             self, url: str, tag: str, names: Sequence[str],
@@ -246,22 +491,11 @@ class P2PSession:
         Raises:
             RuntimeError: If at least one HTML element cannot be found.
         """
-        resp = self.request(url, 'get', error_msg)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        data = dict()
-        for name in names:
-            data[name] = soup.find(tag, {'name': name}).get(field, None)
-
-        if None in data.values():
-            # At least one HTML element has not been found
-            self.logger.debug(
-                'Elements not found in get_values_from_tag_by_name!')
-            self.logger.debug('Names: %s', str(names))
-            self.logger.debug('Keys: %s', str(data.keys()))
-            raise RuntimeError(error_msg)
-
-        return data
+        resp = yield self.request(url, 'get', error_msg)
+        return p2p_html.get_values_from_tag_by_name(
+            resp.text, tag, names, error_msg, field, self.html_backend)
 
+    @session_method
     @signals.watch_errors
     def get_value_from_tag(
             self, url: str, tag: str, field: str, error_msg: str) -> str:
@@ -281,16 +515,65 @@ class P2PSession:
             RuntimeError: If the HTML element cannot be found.
 
         """
-        resp = self.request(url, 'get', error_msg)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        value = soup.find(tag).get(field, None)
+        resp = yield self.request(url, 'get', error_msg)
+        return p2p_html.get_value_from_tag(
+            resp.text, tag, field, error_msg, self.html_backend)
 
-        if value is None:
-            self.logger.debug('Element not found in get_value_from_tag!')
-            raise RuntimeError(error_msg)
+    @session_method
+    @signals.watch_errors
+    def probe_value_from_tag(
+            self, url: str, tag: str, field: str, error_msg: str) -> str:
+        """
+        Lightweight version of get_value_from_tag for polling a page. The page
+        is requested conditionally if the server sent an ETag or Last-Modified
+        header before. If it did not change, the previous value is returned.
+        Otherwise the page is read in small chunks only until the tag is
+        found.
 
-        return value
+        Args:
+            url: URL of the website.
+            tag: Tag of the HTML element.
+            field: Name of the tag field for which to return the value.
+            error_msg: Error message if extraction of value fails.
 
+        Returns:
+            Field value of the first tag.
+
+        Raises:
+            RuntimeError: If the HTML element cannot be found.
+
+        """
+        validators, value = self.probes.get(url, (dict(), None))
+        resp = yield self.request(
+            url, 'get', error_msg, success_codes=(200, 304), stream=True,
+            headers=validators)
+        try:
+            if resp.status_code == 304 and value is not None:
+                self.logger.debug('%s: %s not modified.', self.name, url)
+                return value
+            probe = p2p_html.TagProbe(tag, field)
+            chunks = self._chunks(resp, PROBE_CHUNK_SIZE, text=True)
+            chunk = yield self._next_chunk(chunks)
+            while chunk is not None and not probe.feed(chunk):
+                chunk = yield self._next_chunk(chunks)
+            if chunk is None:
+                probe.close()
+        except NETWORK_ERRORS as err:
+            self.logger.debug(
+                '%s: probing %s failed.', self.name, url, exc_info=True)
+            raise RuntimeError(error_msg) from err
+        finally:
+            yield self.close_response(resp)
+
+        if probe.value is None:
+            self.logger.debug('Element not found in probe_value_from_tag!')
+            raise RuntimeError(error_msg)
+        validators = get_validators(resp.headers)
+        if validators:
+            self.probes[url] = (validators, probe.value)
+        return probe.value
+
+    @session_method
     @signals.watch_errors
     def get_url_from_partial_link(
             self, url: str, partial_link: str, error_msg: str) -> str:
@@ -311,17 +594,11 @@ class P2PSession:
             RuntimeError: If the link cannot be found on the page.
 
         """
-        resp = self.request(url, 'get', error_msg)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        target = None
-        for link in soup.find_all('a', href=True):
-            if partial_link in link['href']:
-                target = link['href']
-        if target is None:
-            raise RuntimeError(error_msg)
-
-        return target
+        resp = yield self.request(url, 'get', error_msg)
+        return p2p_html.get_url_from_partial_link(
+            resp.text, partial_link, error_msg, self.html_backend)
 
+    @session_method
     @signals.watch_errors
     def get_value_from_script(
             self, url: str, script_id: Mapping[str, str], tag: str, name: str,
@@ -343,12 +620,6 @@ class P2PSession:
             RuntimeError: If value cannot be found.
 
         """
-        resp = self.request(url, 'get', error_msg)
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        script = BeautifulSoup(
-            soup.find('script', script_id).string, 'html.parser')
-        value = script.find(tag, {'name': name}).get('value', None)
-        if value is None:
-            raise RuntimeError(error_msg)
-
-        return value
+        resp = yield self.request(url, 'get', error_msg)
+        return p2p_html.get_value_from_script(
+            resp.text, script_id, tag, name, error_msg, self.html_backend)
@@ -4,17 +4,63 @@
 """Module containing all configurable settings for easyp2p."""
 
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, timedelta
 import os
 from pathlib import Path
-from typing import Optional, Set, Tuple
+from typing import Dict, Optional, Set, Tuple
 
+# Directory for easyp2p's own files, e.g. the log file and caches. It is also
+# the default download directory.
+CONFIG_DIRECTORY = os.path.join(str(Path.home()), 'easyp2p')
 
+
+# Settings is a plain container which the GUI and the command line interface
+# fill attribute by attribute, thus it has one attribute per option.
 @dataclass
-class Settings:
+class Settings:  # pylint: disable=too-many-instance-attributes
     """A class to store all settings of easyp2p."""
     date_range: Tuple[date, date]
     output_file: str
-    directory: str = os.path.join(str(Path.home()), 'easyp2p')
+    directory: str = CONFIG_DIRECTORY
     headless: bool = True
     platforms: Optional[Set[str]] = None
+    # Maximal number of session based platforms which are evaluated
+    # concurrently
+    max_workers: int = 4
+    # Maximal number of headless browsers which evaluate webdriver platforms
+    # side by side. Recaptcha platforms always use a single visible browser.
+    max_browsers: int = 1
+    # Number of CPU cores and memory in MB which may be used by the headless
+    # browsers. If None, all cores and the available memory can be used.
+    browser_cpu_limit: Optional[int] = None
+    browser_memory_limit: Optional[int] = None
+    # Engine for reading xlsx statements, see excel_reader.XLSX_ENGINES.
+    # If None, the default engine will be used.
+    xlsx_engine: Optional[str] = None
+    # Backend for extracting values from HTML pages, see
+    # p2p_html.HTML_BACKENDS. If None, the default backend will be used.
+    html_backend: Optional[str] = None
+    # Cache parse results next to the downloaded statements
+    cache_parsed_statements: bool = True
+    # Use existing account statements instead of downloading them again.
+    # Statements older than statement_max_age are downloaded again. If
+    # statement_max_age is None, statements do not expire.
+    reuse_statements: bool = False
+    statement_max_age: Optional[timedelta] = None
+    # Only download the parts of date_range which are not covered by valid
+    # existing statements and merge the results
+    incremental_download: bool = False
+    # Download long date ranges in chunks of one 'month', 'quarter' or 'year'.
+    # If None, the default chunk size of the platform is used. Chunking only
+    # splits the download, existing statements and chunks are only reused if
+    # reuse_statements or incremental_download is enabled.
+    chunk_size: Optional[str] = None
+    # Download all session based platforms concurrently in a single thread
+    # with the asyncio engine. Requires httpx.
+    async_sessions: bool = False
+    # Get the credentials of all platforms from the keyring or the user before
+    # the downloads start
+    preflight_credentials: bool = True
+    # Maximal waiting time in seconds for the statement generation per
+    # platform name. Overrides the MAX_WAIT_TIME of the platforms.
+    max_wait_times: Optional[Dict[str, float]] = None
@@ -1,86 +1,143 @@
 # -*- coding: utf-8 -*-
 #  Copyright (c) 2018-2020 Niko Sandschneider
 
-"""Module implementing Signals for communicating with the GUI."""
+"""
+Module implementing Signals for communicating with the GUI.
 
+Without the GUI, i.e. in headless mode, the signals are pure Python signals
+which call their slots in the emitting thread, see p2p_qt.
+
+"""
+
+from contextlib import contextmanager
 from functools import wraps
+import inspect
 import logging
 
-from PyQt5.QtCore import QObject, pyqtSignal
+from easyp2p.p2p_qt import QObject, Signal
 
 
 class Signals(QObject):
 
     """Class for signal communication between worker classes and GUI."""
 
-    update_progress_bar = pyqtSignal()
-    add_progress_text = pyqtSignal(str, bool)
-    abort_signal = pyqtSignal()
-    get_credentials = pyqtSignal(str)
-    send_credentials = pyqtSignal(str, str)
+    update_progress_bar = Signal()
+    add_progress_text = Signal(str, bool)
+    abort_signal = Signal()
+    get_credentials = Signal(str)
+    send_credentials = Signal(str, str)
+    # Platform name, received bytes and total bytes of a statement download
+    download_progress = Signal(str, int, int)
+    # Number of additional progress bar steps, e.g. for statement parts
+    add_progress_steps = Signal(int)
 
     def __init__(self):
         super().__init__()
         self.abort = False
         self.abort_signal.connect(self.abort_evaluation)
         self.connected = False
+        self.connected_to = None
         self.logger = logging.getLogger('easyp2p.p2p_signals.Signals')
         self.logger.debug('Created Signals instance.')
 
     def update_progress(self, func):
-        """Decorator for updating progress text and progress bar."""
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            try:
-                if self.abort:
-                    raise RuntimeError('Abort by user')
+        """
+        Decorator for updating progress text and progress bar. Supports
+        functions and generator functions, see p2p_session.
+        """
+        return self._wrap(func, 'update_progress', True)
 
-                result = func(*args, **kwargs)
-            except RuntimeError as err:
-                self.logger.exception('RuntimeError in update_progress')
-                self.add_progress_text.emit(str(err), True)
-                raise PlatformFailedError from err
-            except RuntimeWarning as err:
-                self.logger.warning(
-                    'RuntimeWarning in update_progress', exc_info=True)
-                self.add_progress_text.emit(str(err), True)
+    def watch_errors(self, func):
+        """
+        Decorator for emitting error messages to the progress window.
+        Supports functions and generator functions, see p2p_session.
+        """
+        return self._wrap(func, 'watch_errors', False)
+
+    def _wrap(self, func, decorator: str, progress: bool):
+        """
+        Wrap func so that errors are handled by _handle_errors.
+
+        Args:
+            func: Function or generator function to wrap.
+            decorator: Name of the decorator for logging.
+            progress: If True, check the abort flag and update the progress
+                bar.
+
+        Returns:
+            Wrapped function or generator function.
+
+        """
+        if inspect.isgeneratorfunction(func):
+            @wraps(func)
+            def flow_wrapper(*args, **kwargs):
                 result = None
-            finally:
-                self.update_progress_bar.emit()
-            return result
-        return wrapper
+                with self._handle_errors(decorator, progress):
+                    result = yield from func(*args, **kwargs)
+                return result
+            return flow_wrapper
 
-    def watch_errors(self, func):
-        """Decorator for emitting error messages to the progress window."""
         @wraps(func)
         def wrapper(*args, **kwargs):
-            try:
+            result = None
+            with self._handle_errors(decorator, progress):
                 result = func(*args, **kwargs)
-            except RuntimeError as err:
-                self.logger.exception('RuntimeError in watch_errors.')
-                self.add_progress_text.emit(str(err), True)
-                raise PlatformFailedError from err
-            except RuntimeWarning as err:
-                self.logger.warning(str(err))
-                self.add_progress_text.emit(str(err), True)
-                result = None
             return result
         return wrapper
 
+    @contextmanager
+    def _handle_errors(self, decorator: str, progress: bool):
+        """
+        Context manager for emitting errors and warnings to the progress
+        window. RuntimeErrors are converted to PlatformFailedError,
+        RuntimeWarnings are only shown to the user.
+
+        Args:
+            decorator: Name of the decorator for logging.
+            progress: If True, check the abort flag before entering the
+                context and update the progress bar after leaving it.
+
+        """
+        try:
+            if progress and self.abort:
+                raise RuntimeError('Abort by user')
+            yield
+        except RuntimeError as err:
+            self.logger.error('RuntimeError in %s: %s', decorator, err)
+            self.logger.debug('Traceback:', exc_info=True)
+            self.add_progress_text.emit(str(err), True)
+            raise PlatformFailedError from err
+        except RuntimeWarning as err:
+            self.logger.warning('RuntimeWarning in %s: %s', decorator, err)
+            self.logger.debug('Traceback:', exc_info=True)
+            self.add_progress_text.emit(str(err), True)
+        finally:
+            if progress:
+                self.update_progress_bar.emit()
+
     def connect_signals(self, other: 'Signals') -> None:
         """
-        Helper method for connecting signals of different classes.
+        Helper method for connecting signals of different classes. If the
+        signals are already connected to other, nothing will be done. This
+        prevents duplicate connections if several platforms share the same
+        Signals instance.
 
         Args:
             other: Signals instance of another class.
 
         """
+        if self.connected and self.connected_to is other:
+            self.logger.debug('Signals are already connected.')
+            return
+
         self.logger.debug('Connecting signals.')
         self.update_progress_bar.connect(other.update_progress_bar)
         self.add_progress_text.connect(other.add_progress_text)
         self.get_credentials.connect(other.get_credentials)
+        self.download_progress.connect(other.download_progress)
         other.send_credentials.connect(self.send_credentials)
         self.connected = True
+        self.connected_to = other
         self.logger.debug('Connecting signals successful.')
 
     def disconnect_signals(self) -> None:
@@ -94,15 +151,17 @@ class Signals(QObject):
         self.logger.debug('Disconnecting signals.')
         for signal in [
                 self.add_progress_text, self.get_credentials,
-                self.update_progress_bar]:
+                self.update_progress_bar, self.download_progress]:
             try:
                 signal.disconnect()
             except TypeError:
-                self.logger.exception(
-                    'Disconnecting signal %s failed.', str(signal))
+                self.logger.debug(
+                    'Disconnecting signal %s failed.', str(signal),
+                    exc_info=True)
             else:
                 self.logger.debug('Signal %s disconnected.', str(signal))
         self.connected = False
+        self.connected_to = None
 
     def abort_evaluation(self):
         """Set the abort flag to True."""
@@ -17,8 +17,9 @@ import logging
 import os
 import shutil
 import tempfile
+import threading
 import time
-from typing import Mapping, Optional, Tuple
+from typing import Mapping, Optional, Sequence, Tuple
 
 import arrow
 from selenium.common.exceptions import (
@@ -28,8 +29,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 
 from easyp2p.p2p_credentials import get_credentials
-from easyp2p.p2p_signals import Signals, PlatformFailedError
-from easyp2p.p2p_chrome import P2PChrome
+from easyp2p.p2p_download_watcher import DownloadWatcher
+from easyp2p.p2p_signals import Signals
+from easyp2p.p2p_chrome import chrome_pool
 from easyp2p.errors import PlatformErrors
 
 logger = logging.getLogger('easyp2p.p2p_webdriver')
@@ -47,6 +49,10 @@ class P2PWebDriver:  # pylint: disable=too-many-instance-attributes
 
     # Signals for communicating with the GUI
     signals = Signals()
+    # Number of entered instances. The signals are shared by all instances
+    # and are only disconnected when the last one exits.
+    _active = 0
+    _active_lock = threading.Lock()
 
     def __init__(  # pylint: disable=too-many-arguments
             self, name: str, headless: bool,
@@ -105,12 +111,15 @@ class P2PWebDriver:  # pylint: disable=too-many-instance-attributes
         """
         self.download_dir = tempfile.TemporaryDirectory()
         try:
-            self.driver = P2PChrome(
+            self.driver = chrome_pool.acquire(
                 self.download_dir.name, self.headless, self.signals)
-        except PlatformFailedError as err:
+        except BaseException:
+            # The instance was not counted as active yet
             self.download_dir.cleanup()
-            self.signals.disconnect_signals()
-            raise PlatformFailedError(err)
+            self._release_signals(active=False)
+            raise
+        with self._active_lock:
+            P2PWebDriver._active += 1
         self.logger.debug('%s: created context manager.', self.name)
         return self
 
@@ -143,15 +152,30 @@ class P2PWebDriver:  # pylint: disable=too-many-instance-attributes
 
                 self.logged_in = False
         finally:
-            self.driver.close()
+            chrome_pool.release(self.driver)
             self.download_dir.cleanup()
-            self.signals.disconnect_signals()
+            self._release_signals()
 
         if exc_type:
             raise exc_type(exc_value)
 
         self.logger.debug('%s: context manager done.', self.name)
 
+    def _release_signals(self, active: bool = True) -> None:
+        """
+        Disconnect the signals if no other instance is active.
+
+        Args:
+            active: True if this instance is counted in _active, i.e. it was
+                entered successfully. Default is True.
+
+        """
+        with self._active_lock:
+            if active:
+                P2PWebDriver._active -= 1
+            if P2PWebDriver._active == 0:
+                self.signals.disconnect_signals()
+
     @signals.update_progress
     def log_into_page(  # pylint: disable=too-many-arguments
             self, login_url: str, name_field: str, password_field: str,
@@ -688,15 +712,21 @@ class P2PWebDriver:  # pylint: disable=too-many-instance-attributes
         self.logger.debug('%s: account statement download finished.', self.name)
 
     def download_finished(
-            self, location: str, max_wait_time: float = 4.0) -> bool:
+            self, location: str, start_timeout: float = 5.0,
+            stall_timeout: float = 10.0) -> bool:
         """
         Wait until statement download is done and rename the file to the value
-        in location.
+        in location. The download directory is watched for changes, thus the
+        file is moved as soon as Chrome finishes the download. There is no
+        limit for the total download time as long as the download makes
+        progress.
 
         Args:
             location: Absolute file path where the statement should be saved.
-            max_wait_time: Maximum time in seconds to wait for download to
-                start/finish.
+            start_timeout: Maximum time in seconds to wait for the download
+                to start.
+            stall_timeout: Maximum time in seconds in which the size of an
+                ongoing download does not change.
 
         Returns:
             True if download finished successfully, False if not.
@@ -706,44 +736,68 @@ class P2PWebDriver:  # pylint: disable=too-many-instance-attributes
             directory.
 
         """
-        done = False
-        waiting_time = 0
-        download_time = 0
-
-        while not done:
-            ongoing_downloads = glob.glob(
-                os.path.join(self.driver.download_directory, '*.crdownload'))
-            if ongoing_downloads:
-                if download_time > max_wait_time:
-                    logger.error('Download time exceeded max_wait_time.')
-                    return False
-                time.sleep(1)
-                download_time += 1
-            else:
-                filelist = glob.glob(
-                    os.path.join(self.driver.download_directory, '*'))
-                if len(filelist) == 1 and not filelist[0].endswith(
-                        'crdownload'):
+        directory = self.driver.download_directory
+        start = time.monotonic()
+        last_progress = start
+        last_size = None
+
+        with DownloadWatcher(directory) as watcher:
+            while True:
+                filelist = glob.glob(os.path.join(directory, '*'))
+                ongoing_downloads = [
+                    file for file in filelist if file.endswith('.crdownload')]
+                now = time.monotonic()
+                if ongoing_downloads:
+                    size = _get_total_size(ongoing_downloads)
+                    if size != last_size:
+                        last_size = size
+                        last_progress = now
+                    elif now - last_progress > stall_timeout:
+                        logger.error(
+                            'Download made no progress within %.1f s.',
+                            stall_timeout)
+                        return False
+                    timeout = last_progress + stall_timeout - now
+                elif len(filelist) == 1:
                     shutil.move(filelist[0], location)
+                    logger.debug(
+                        'Download finished after %.1f s.', now - start)
                     return True
-
-                if len(filelist) > 1:
+                elif len(filelist) > 1:
                     # This should never happen since the download directory is a
                     # newly created temporary directory
                     logger.error(
                         'More than one active download found: %s',
                         str(filelist))
                     raise RuntimeError(
-                        self.errors.download_directory_not_empty(
-                            self.driver.download_directory))
-
-                if waiting_time > max_wait_time:
-                    # If the download didn't start after more than max_wait_time
-                    # something has gone wrong.
-                    logger.error('Download did not start within max_wait_time.')
+                        self.errors.download_directory_not_empty(directory))
+                elif now - start > start_timeout:
+                    # If the download didn't start after more than
+                    # start_timeout something has gone wrong.
+                    logger.error('Download did not start within start_timeout.')
                     return False
+                else:
+                    timeout = start + start_timeout - now
+
+                # Wake up at least once per second to check the progress
+                watcher.wait(min(timeout, 1.0) + 0.01)
 
-                time.sleep(1)
-                waiting_time += 1
 
-        return False
+def _get_total_size(files: Sequence[str]) -> int:
+    """
+    Get the total size of files which may be removed in the meantime.
+
+    Args:
+        files: List of file names including path.
+
+    Returns:
+        Sum of the file sizes in bytes.
+
+    """
+    size = 0
+    for file in files:
+        try:
+            size += os.path.getsize(file)
+        except OSError:
+            pass
+    return size
@@ -3,20 +3,46 @@
 
 """Module implementing WorkerThread."""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import logging
 import os
-from typing import Optional
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
-from PyQt5.QtCore import QCoreApplication, QThread
 
+from easyp2p import p2p_qt
 from easyp2p.excel_writer import write_results
-from easyp2p.p2p_credentials import get_credentials_from_user
+from easyp2p.p2p_chrome import chrome_pool, get_browser_slots
+from easyp2p.p2p_credentials import (
+    ask_user_for_credentials, clear_preloaded_credentials, credential_cache,
+    get_all_credentials_from_keyring, get_credentials_from_user,
+    preload_credentials)
+from easyp2p.p2p_http import (
+    ASYNC_AVAILABLE, get_connection_stats, NETWORK_ERRORS,
+    reset_connection_stats, shared_async_transport)
+from easyp2p.p2p_parser import concat_results
+from easyp2p.p2p_polling import generation_times
+from easyp2p.p2p_qt import QThread
 from easyp2p.p2p_settings import Settings
 from easyp2p.p2p_signals import Signals, PlatformFailedError
 import easyp2p.platforms as p2p_platforms
+from easyp2p.platforms.base_platform import PlatformOptions
 
-_translate = QCoreApplication.translate
+_translate = p2p_qt.translate
+
+# Name of the file in the download directory which contains the recorded
+# statement generation times
+GENERATION_TIMES_FILE = 'generation_times.json'
+
+# Progress bar steps of a platform: six download stages (init ChromeDriver,
+# log in, open statement page, generate + download statement, log out) and
+# parsing the statement
+DOWNLOAD_STEPS = 6
+PLATFORM_STEPS = DOWNLOAD_STEPS + 1
 
 
 class WorkerThread(QThread):
@@ -47,6 +73,11 @@ class WorkerThread(QThread):
         self.signals.get_credentials.connect(self.get_credentials)
         self.done = False
         self.df_result = pd.DataFrame()
+        # True if run wrote the results to the output file
+        self.results_written = False
+        # Download plans of preflight_credentials, see prepare_download
+        self._plans: Dict[str, Tuple[p2p_platforms, List[p2p_platforms]]] = \
+            dict()
 
     def get_platform_instance(self, name: str) -> p2p_platforms:
         """
@@ -66,16 +97,20 @@ class WorkerThread(QThread):
         try:
             platform = getattr(p2p_platforms, name)
             statement_without_suffix = self.get_statement_location(name)
+            options = PlatformOptions(
+                xlsx_engine=self.settings.xlsx_engine,
+                html_backend=self.settings.html_backend,
+                max_wait_time=(self.settings.max_wait_times or {}).get(name))
             instance = platform(
                 self.settings.date_range, statement_without_suffix,
-                signals=self.signals)
+                signals=self.signals, options=options)
         except AttributeError:
-            self.logger.exception('Platform not found')
+            self.logger.debug('Platform not found', exc_info=True)
             raise PlatformFailedError(_translate(
                 'WorkerThread',
                 f'{name.lower()}.py could not be found!'))
         except OSError as err:
-            self.logger.exception('Could not create directory!')
+            self.logger.debug('Could not create directory!', exc_info=True)
             raise PlatformFailedError(str(err).strip(), True)
         else:
             return instance
@@ -92,17 +127,209 @@ class WorkerThread(QThread):
             Parsed account statement as a data frame.
 
         """
-        platform = self.get_platform_instance(name)
+        return self.parse_statement(name, self.download_statement(name))
+
+    def download_statement(self, name: str) -> p2p_platforms:
+        """
+        Download the account statement for given platform. If reuse of
+        statements is enabled and a valid statement already exists, the
+        download is skipped. In incremental mode or if the statement is
+        downloaded in chunks, only the parts of the date range which are not
+        covered by valid existing statements are downloaded.
+
+        Args:
+            name: Name of the P2P platform.
+
+        Returns:
+            Platform class instance whose statement was downloaded.
+
+        """
+        platform, downloads = self.prepare_download(name)
+        if downloads:
+            self.download_parts(platform, downloads)
+        return platform
+
+    async def async_download_statement(self, name: str) -> p2p_platforms:
+        """
+        Download the account statement for given platform with the asyncio
+        engine. See download_statement.
+
+        Args:
+            name: Name of the P2P platform.
+
+        Returns:
+            Platform class instance whose statement was downloaded.
+
+        """
+        platform, downloads = self.prepare_download(name)
+        if downloads:
+            await self.async_download_parts(platform, downloads)
+        return platform
+
+    def prepare_download(
+            self, name: str) -> Tuple[p2p_platforms, List[p2p_platforms]]:
+        """
+        Create the platform instance and determine which statements need to be
+        downloaded. If preflight_credentials already planned the download of
+        the platform, its plan is used.
+
+        Args:
+            name: Name of the P2P platform.
+
+        Returns:
+            Tuple (platform, downloads). downloads contains the platform
+            instances whose statements need to be downloaded. It is empty if
+            all statements can be reused.
+
+        Raises:
+            PlatformFailedError: If the platform cannot be created or the chunk
+                size is invalid.
+
+        """
+        platform, downloads = self._plans.pop(name, (None, None))
+        if platform is None:
+            platform = self.get_platform_instance(name)
         self.signals.add_progress_text.emit(_translate(
             'WorkerThread', f'Starting evaluation of {name}...'), False)
 
-        if platform.DOWNLOAD_METHOD == 'recaptcha':
+        if downloads is None:
+            downloads = self.get_downloads(platform)
+        if len(downloads) > 1:
+            # Every additional part goes through all download stages
+            self.signals.add_progress_steps.emit(
+                (len(downloads) - 1) * DOWNLOAD_STEPS)
+
+        if not downloads:
+            self.signals.add_progress_text.emit(_translate(
+                'WorkerThread',
+                f'{name}: using previously downloaded account statement.'),
+                False)
+        elif platform.DOWNLOAD_METHOD == 'recaptcha':
             self.signals.add_progress_text.emit(_translate(
                 'WorkerThread',
                 'Please manually solve the captcha on the website!'), True)
 
-        platform.download_statement(self.settings.headless)
-        (df, unknown_cf_types) = platform.parse_statement()
+        return platform, downloads
+
+    def get_downloads(
+            self, platform: p2p_platforms) -> List[p2p_platforms]:
+        """
+        Determine which statements of platform need to be downloaded.
+        Existing statements are only reused if reuse_statements or
+        incremental_download is enabled. A chunk size only splits the
+        download.
+
+        Args:
+            platform: Platform class instance.
+
+        Returns:
+            Platform instances whose statements need to be downloaded. Empty
+            if all statements can be reused.
+
+        Raises:
+            PlatformFailedError: If the chunk size is invalid.
+
+        """
+        chunk_size = self.settings.chunk_size or platform.CHUNK_SIZE
+        reuse = (
+            self.settings.reuse_statements
+            or self.settings.incremental_download)
+        parts = None
+        if self.settings.incremental_download or chunk_size:
+            try:
+                parts = platform.get_statement_parts(
+                    self.settings.statement_max_age, chunk_size, reuse)
+            except ValueError as err:
+                raise PlatformFailedError(f'{platform.NAME}: {err}') from err
+        # Statements whose names do not contain their date range cannot be
+        # split into parts and are downloaded as a whole
+        if parts is not None:
+            platform.parts = parts
+            if reuse:
+                downloads = [
+                    part for part in platform.parts if not
+                    part.has_valid_statement(self.settings.statement_max_age)]
+            else:
+                downloads = list(platform.parts)
+        elif reuse and platform.has_valid_statement(
+                self.settings.statement_max_age):
+            downloads = []
+        else:
+            downloads = [platform]
+        return downloads
+
+    def download_parts(
+            self, platform: p2p_platforms, parts: List[p2p_platforms]) -> None:
+        """
+        Download the statements of all parts of the date range. If the
+        platform allows it, the parts are downloaded concurrently.
+
+        If the download of a part fails, the remaining parts which were not
+        started yet are not downloaded anymore. Already downloaded parts are
+        kept and will be reused by the next evaluation.
+
+        Args:
+            platform: Platform class instance.
+            parts: Platform class instances of the parts which need to be
+                downloaded.
+
+        """
+        max_workers = min(self.settings.max_workers, len(parts))
+        if not platform.PARALLEL_CHUNKS or max_workers <= 1:
+            for part in parts:
+                part.download_statement(self.settings.headless)
+            return
+
+        self.logger.debug(
+            '%s: downloading %d parts concurrently.', platform.NAME,
+            len(parts))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(part.download_statement, self.settings.headless)
+                for part in parts]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    async def async_download_parts(
+            self, platform: p2p_platforms, parts: List[p2p_platforms]) -> None:
+        """
+        Download the statements of all parts of the date range with the
+        asyncio engine. If the platform allows it, the parts are downloaded
+        concurrently. See download_parts.
+
+        Args:
+            platform: Platform class instance.
+            parts: Platform class instances of the parts which need to be
+                downloaded.
+
+        """
+        if platform.PARALLEL_CHUNKS:
+            await asyncio.gather(
+                *(part.async_download_statement() for part in parts))
+        else:
+            for part in parts:
+                await part.async_download_statement()
+
+    def parse_statement(
+            self, name: str, platform: p2p_platforms) -> pd.DataFrame:
+        """
+        Parse the downloaded account statement of platform. Warn the user if
+        there were unknown cash flow types.
+
+        Args:
+            name: Name of the P2P platform.
+            platform: Platform class instance whose statement was downloaded.
+
+        Returns:
+            Parsed account statement as a data frame.
+
+        """
+        (df, unknown_cf_types) = platform.parse_statement(
+            use_cache=self.settings.cache_parsed_statements)
 
         if unknown_cf_types:
             warning_msg = _translate(
@@ -153,31 +380,362 @@ class WorkerThread(QThread):
         username, password = get_credentials_from_user(platform)
         self.signals.send_credentials.emit(username, password)
 
+    def preflight_credentials(self, names: Iterable[str]) -> None:
+        """
+        Resolve the credentials of all platforms which need to download a
+        statement before the downloads start. The keyring is queried in one
+        batch, afterwards the user is asked for all missing credentials one
+        after another. The credentials are preloaded for get_credentials,
+        thus the downloads do not need to wait for user input.
+
+        If existing statements are never reused, every platform needs a
+        download. Otherwise the downloads are planned here and the plans are
+        handed over to prepare_download, thus every platform is only planned
+        once.
+
+        Args:
+            names: Names of the P2P platforms.
+
+        """
+        if not (self.settings.reuse_statements
+                or self.settings.incremental_download):
+            needed = [
+                name for name in sorted(names)
+                if isinstance(getattr(p2p_platforms, name, None), type)]
+        else:
+            needed = []
+            for name in sorted(names):
+                try:
+                    platform = self.get_platform_instance(name)
+                    downloads = self.get_downloads(platform)
+                except PlatformFailedError:
+                    # The error will be reported by the download stage
+                    self.logger.debug(
+                        '%s: skipping credential preflight.', name)
+                    continue
+                self._plans[name] = (platform, downloads)
+                if downloads:
+                    needed.append(name)
+
+        credentials = get_all_credentials_from_keyring(needed)
+        for name in needed:
+            if name in credentials or self.signals.abort:
+                continue
+            username, password = ask_user_for_credentials(name, self.signals)
+            # Cancelled dialogs are stored as empty credentials, thus the
+            # platform fails without asking the user again
+            credentials[name] = (username or '', password or '')
+        preload_credentials(credentials)
+        self.logger.debug(
+            'Preloaded credentials for %d platforms.', len(credentials))
+
+    def split_platforms(
+            self, names: Optional[Iterable[str]] = None) \
+            -> Tuple[List[str], List[str]]:
+        """
+        Split the selected platforms into platforms which can be evaluated
+        concurrently and platforms which must be evaluated one after another.
+
+        Only platforms using P2PSession are evaluated concurrently. Webdriver
+        and recaptcha platforms need a Chrome instance, see
+        split_browser_platforms.
+
+        Args:
+            names: Names of the platforms to split. If None, all selected
+                platforms will be split. Default is None.
+
+        Returns:
+            Tuple (concurrent_platforms, serial_platforms), both sorted by
+            platform name.
+
+        """
+        if names is None:
+            names = self.settings.platforms
+        concurrent_platforms, serial_platforms = [], []
+        for name in sorted(names):
+            platform = getattr(p2p_platforms, name, None)
+            if self.settings.max_workers > 1 \
+                    and getattr(platform, 'DOWNLOAD_METHOD', None) == 'session':
+                concurrent_platforms.append(name)
+            else:
+                serial_platforms.append(name)
+        return concurrent_platforms, serial_platforms
+
+    def browser_slots(self) -> int:
+        """
+        Get the number of headless browsers which can run side by side within
+        the configured CPU and memory limits.
+
+        Returns:
+            Number of headless browsers, at least 1.
+
+        """
+        if not self.settings.headless:
+            return 1
+        return get_browser_slots(
+            self.settings.max_browsers, self.settings.browser_cpu_limit,
+            self.settings.browser_memory_limit)
+
+    def split_browser_platforms(
+            self, names: Iterable[str], slots: int) \
+            -> Tuple[List[str], List[str]]:
+        """
+        Split platforms into headless webdriver platforms which can be
+        evaluated in parallel browsers and platforms which must be evaluated
+        one after another. Recaptcha platforms need a visible browser and
+        always stay serialized.
+
+        Args:
+            names: Names of the platforms to split.
+            slots: Number of headless browsers which can run side by side.
+
+        Returns:
+            Tuple (browser_platforms, serial_platforms), both sorted by
+            platform name. browser_platforms is empty if slots is 1.
+
+        """
+        browser_platforms, serial_platforms = [], []
+        for name in sorted(names):
+            platform = getattr(p2p_platforms, name, None)
+            if slots > 1 and getattr(
+                    platform, 'DOWNLOAD_METHOD', None) == 'webdriver':
+                browser_platforms.append(name)
+            else:
+                serial_platforms.append(name)
+        return browser_platforms, serial_platforms
+
+    def split_async_platforms(self) -> Tuple[List[str], List[str]]:
+        """
+        Split the selected platforms into platforms which are downloaded with
+        the asyncio engine and all other platforms.
+
+        Returns:
+            Tuple (async_platforms, other_platforms), both sorted by platform
+            name. async_platforms is empty if the asyncio engine is disabled
+            or httpx is not installed.
+
+        """
+        names = sorted(self.settings.platforms)
+        if not self.settings.async_sessions:
+            return [], names
+        if not ASYNC_AVAILABLE:
+            self.logger.warning(
+                'httpx is not installed, the asyncio engine is not used.')
+            return [], names
+
+        async_platforms, other_platforms = [], []
+        for name in names:
+            platform = getattr(p2p_platforms, name, None)
+            if platform is not None and platform.supports_async():
+                async_platforms.append(name)
+            else:
+                other_platforms.append(name)
+        return async_platforms, other_platforms
+
+    def _run_stage(self, name: str, stage: Callable[[], Any]) -> Any:
+        """
+        Run a download or parser stage for a platform. If the stage fails,
+        inform the user that the platform will be ignored. Network errors
+        are converted to PlatformFailedError, thus they do not abort the
+        evaluation of the other platforms.
+
+        Args:
+            name: Name of the P2P platform.
+            stage: Callable which runs the stage for the platform.
+
+        Returns:
+            Return value of stage or None if the stage failed.
+
+        """
+        try:
+            try:
+                return stage()
+            except NETWORK_ERRORS as err:
+                raise PlatformFailedError(f'{name}: {err}') from err
+        except PlatformFailedError as err:
+            self._platform_failed(name, err)
+        return None
+
+    def _platform_failed(self, name: str, err: PlatformFailedError) -> None:
+        """
+        Inform the user that the evaluation of a platform failed and that the
+        platform will be ignored.
+
+        Args:
+            name: Name of the P2P platform.
+            err: Error which caused the failure.
+
+        """
+        self.logger.error('Evaluation of %s failed: %s', name, err)
+        self.logger.debug('Traceback:', exc_info=err)
+        self.signals.add_progress_text.emit(str(err).strip(), True)
+        self.signals.add_progress_text.emit(
+            _translate('WorkerThread', f'{name} will be ignored!'), True)
+
+    def _download_stage(self, name: str, statements: queue.Queue) -> None:
+        """
+        Download the statement of a platform and put the platform on the
+        statements queue for the parser stage.
+
+        Args:
+            name: Name of the P2P platform.
+            statements: Queue of (name, platform) tuples with downloaded
+                statements.
+
+        """
+        platform = self._run_stage(
+            name, partial(self.download_statement, name))
+        if platform is not None:
+            statements.put((name, platform))
+
+    def _async_download_stage(
+            self, names: List[str], statements: queue.Queue) -> None:
+        """
+        Download the statements of all platforms in names concurrently in an
+        asyncio event loop in the calling thread. All sessions share one
+        connection pool. Each downloaded platform is put on the statements
+        queue as soon as its download is finished.
+
+        Args:
+            names: Names of the P2P platforms which support the asyncio engine.
+            statements: Queue of (name, platform) tuples with downloaded
+                statements.
+
+        """
+        async def download(name: str) -> None:
+            try:
+                try:
+                    platform = await self.async_download_statement(name)
+                except NETWORK_ERRORS as err:
+                    raise PlatformFailedError(f'{name}: {err}') from err
+            except PlatformFailedError as err:
+                self._platform_failed(name, err)
+            else:
+                statements.put((name, platform))
+
+        async def download_all() -> None:
+            async with shared_async_transport():
+                await asyncio.gather(*(download(name) for name in names))
+
+        asyncio.run(download_all())
+
+    def _parser_stage(
+            self, statements: queue.Queue, results: List[pd.DataFrame]) -> None:
+        """
+        Parse downloaded statements as soon as they arrive in the statements
+        queue and collect the parsed results. The parser stage finishes when
+        it receives None.
+
+        Args:
+            statements: Queue of (name, platform) tuples with downloaded
+                statements.
+            results: List to which the parsed statements will be added.
+
+        """
+        while True:
+            item = statements.get()
+            if item is None:
+                return
+            name, platform = item
+            df = self._run_stage(
+                name, partial(self.parse_statement, name, platform))
+            if df is not None:
+                results.append(df)
+
+    def _download_all(self, statements: queue.Queue) -> None:
+        """
+        Download the statements of all selected platforms, see run.
+
+        Args:
+            statements: Queue for handing over the downloaded platforms to
+                the parser stage.
+
+        """
+        async_platforms, other_platforms = self.split_async_platforms()
+        concurrent_platforms, serial_platforms = self.split_platforms(
+            other_platforms)
+        slots = self.browser_slots()
+        browser_platforms, serial_platforms = \
+            self.split_browser_platforms(serial_platforms, slots)
+        chrome_pool.max_idle = max(slots, chrome_pool.MAX_IDLE)
+        max_workers = max(self.settings.max_workers, 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                ThreadPoolExecutor(max_workers=slots) as browsers:
+            futures = [
+                executor.submit(self._download_stage, name, statements)
+                for name in concurrent_platforms]
+            futures.extend(
+                browsers.submit(self._download_stage, name, statements)
+                for name in browser_platforms)
+            if async_platforms:
+                futures.append(executor.submit(
+                    self._async_download_stage, async_platforms, statements))
+
+            for name in serial_platforms:
+                self._download_stage(name, statements)
+
+            for future in futures:
+                future.result()
+
     def run(self) -> None:
         """
         Get and output results from all selected P2P platforms.
 
-        Iterates over all selected P2P platforms, downloads the account
-        statements, parses them and writes the results to an Excel file.
+        Downloads and parses the account statements of all selected P2P
+        platforms and writes the results to an Excel file. Session based
+        platforms are downloaded concurrently in a thread pool. Headless
+        webdriver platforms are downloaded in a second pool with one thread
+        per browser slot, see browser_slots. All other platforms, in
+        particular the recaptcha platforms, are downloaded one after another
+        in this thread.
+        If the asyncio engine is enabled, all session based platforms which
+        support it are downloaded in a single thread of the pool instead.
+        If enabled, the credentials of all platforms are resolved before the
+        downloads start, see preflight_credentials. Each downloaded statement
+        is handed over to a separate parser thread, so parsing overlaps with
+        the remaining downloads. P2PParser shares its Signals between all
+        instances, thus only one statement is parsed at a time.
 
         """
         self.logger.info('%s: starting worker.', self.settings.platforms)
+        # The connection statistics are logged per run
+        reset_connection_stats()
 
-        for name in self.settings.platforms:
-            try:
-                df = self.evaluate_platform(name)
-                self.df_result = self.df_result.append(df, sort=True)
-            except PlatformFailedError as err:
-                self.logger.exception('Evaluation of platform failed.')
-                self.signals.add_progress_text.emit(str(err).strip(), True)
-                self.signals.add_progress_text.emit(
-                    _translate('WorkerThread', f'{name} will be ignored!'),
-                    True)
-                continue
+        statements: queue.Queue = queue.Queue()
+        results: List[pd.DataFrame] = []
+        parser = threading.Thread(
+            target=self._parser_stage, args=(statements, results))
+        parser.start()
 
-        if not write_results(
-                self.df_result, self.settings.output_file,
-                self.settings.date_range):
+        try:
+            if self.settings.preflight_credentials:
+                self.preflight_credentials(self.settings.platforms)
+            self._download_all(statements)
+        finally:
+            # The browsers and credentials are not needed anymore after the
+            # downloads. Clearing the credential cache zeroes the passwords.
+            chrome_pool.close()
+            clear_preloaded_credentials()
+            credential_cache.clear()
+            self._plans.clear()
+            # Wait until all downloaded statements are parsed
+            statements.put(None)
+            parser.join()
+
+        # Concatenate all results at once to avoid copying df_result for
+        # every platform
+        self.df_result = concat_results([self.df_result, *results])
+        self.logger.info('HTTP connections: %s.', get_connection_stats())
+        self.logger.info(
+            'Statement generation times: %s.', generation_times.summary())
+        generation_times.save(
+            os.path.join(self.settings.directory, GENERATION_TIMES_FILE),
+            self.settings.platforms)
+
+        self.results_written = write_results(
+            self.df_result, self.settings.output_file,
+            self.settings.date_range)
+        if not self.results_written:
             self.signals.add_progress_text.emit(
                 _translate('WorkerThread', 'No results available!'), True)
 
@@ -12,17 +12,92 @@ two public methods:
 
 """
 
-from datetime import date
-from typing import Optional, Tuple
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+import inspect
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
 
-from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_async_session import AsyncP2PSession
+from easyp2p.p2p_cache import ParserCache
+from easyp2p.p2p_parser import (
+    concat_results, filter_date_range, P2PParser, ReadOptions,
+    types_in_range)
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.p2p_signals import Signals, PlatformFailedError
 from easyp2p.p2p_webdriver import P2PWebDriver
 from easyp2p.errors import PlatformErrors
 
+logger = logging.getLogger('easyp2p.platforms.base_platform')
+
+# Statement file names without suffix end with the date range, e.g.
+# mintos_statement_20200101-20201231
+_STATEMENT_RE = re.compile(r'^(?P<prefix>.+)_(?P<start>\d{8})-(?P<end>\d{8})$')
+
+# Number of months per download chunk
+CHUNK_SIZES = {'month': 1, 'quarter': 3, 'year': 12}
+
+# Date range for parsing statements which are cached. It contains all dates of
+# the statements, the cached results are filtered by the date range of the
+# platform.
+CACHE_DATE_RANGE = (date(1900, 1, 1), date(2199, 12, 31))
+
+
+def split_date_range(
+        date_range: Tuple[date, date], chunk_size: Optional[str]) \
+        -> List[Tuple[date, date]]:
+    """
+    Split a date range into chunks which end at month, quarter or year ends.
+    The first and last chunk may be shorter than chunk_size.
+
+    Args:
+        date_range: Date range (start_date, end_date) which should be split.
+        chunk_size: Size of the chunks, one of the keys of CHUNK_SIZES. If
+            None, the date range will not be split.
+
+    Returns:
+        Chronologically sorted list of date ranges.
+
+    Raises:
+        ValueError: If chunk_size is unknown.
+
+    """
+    if chunk_size is None:
+        return [date_range]
+    if chunk_size not in CHUNK_SIZES:
+        raise ValueError(f'Unknown chunk size: {chunk_size}')
+
+    months = CHUNK_SIZES[chunk_size]
+    chunks = []
+    start, end = date_range
+    while start <= end:
+        # Index of the first month after the chunk, counted from year 0
+        next_month = (start.year * 12 + start.month - 1) // months \
+            * months + months
+        chunk_end = date(next_month // 12, next_month % 12 + 1, 1) \
+            - timedelta(days=1)
+        chunks.append((start, min(chunk_end, end)))
+        start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+@dataclass
+class PlatformOptions:
+    """Options of a platform which can be changed in the settings."""
+    # Engine for reading xlsx statements if the platform does not set
+    # XLSX_ENGINE. If None, the default engine will be used.
+    xlsx_engine: Optional[str] = None
+    # Backend for extracting values from HTML pages, see
+    # p2p_html.HTML_BACKENDS. If None, the default backend will be used.
+    html_backend: Optional[str] = None
+    # Maximal time in seconds to wait for the statement generation. If None,
+    # MAX_WAIT_TIME of the platform will be used.
+    max_wait_time: Optional[float] = None
+
 
 class BasePlatform:
 
@@ -41,6 +116,8 @@ class BasePlatform:
     LOGOUT_WAIT_UNTIL_LOC = None
     LOGOUT_LOCATOR = None
     HOVER_LOCATOR = None
+    # Maximal time in seconds to wait for the statement generation
+    MAX_WAIT_TIME = 30
 
     # Parser settings
     DATE_FORMAT = None
@@ -51,11 +128,25 @@ class BasePlatform:
     BALANCE_COLUMN = None
     HEADER = 0
     SKIP_FOOTER = 0
+    # Statement columns which are needed by the parser. None reads all.
+    USE_COLUMNS = None
+    # Data types of statement columns, e.g. {'Amount': 'float64'}
+    DTYPES = None
+    # Engine for reading xlsx statements. Overrides the engine in the settings.
+    XLSX_ENGINE = None
+
+    # Chunk settings
+    # Default chunk size for downloading long date ranges, see CHUNK_SIZES.
+    # None downloads the whole date range at once.
+    CHUNK_SIZE = None
+    # True if chunks of the date range can be downloaded concurrently
+    PARALLEL_CHUNKS = False
 
     def __init__(
             self, date_range: Tuple[date, date],
             statement_without_suffix: str,
-            signals: Optional[Signals] = None) -> None:
+            signals: Optional[Signals] = None,
+            options: Optional[PlatformOptions] = None) -> None:
         """
         Constructor of BasePlatform class.
 
@@ -66,13 +157,26 @@ class BasePlatform:
                 suffix where the account statement should be saved.
             signals: Signals instance for communicating with the calling class.
                 Default is None.
+            options: Options of the platform. If None, the default options
+                will be used.
 
         """
         self.date_range = date_range
         self.statement = '.'.join([statement_without_suffix, self.SUFFIX])
         self.signals = signals
+        self.options = options or PlatformOptions()
+        # Platform instances for sub ranges of date_range whose statements
+        # are parsed instead of self.statement, see get_statement_parts
+        self.parts: Optional[List['BasePlatform']] = None
         self.errors = PlatformErrors(self.NAME)
 
+    @property
+    def max_wait_time(self) -> float:
+        """Maximal time in seconds to wait for the statement generation."""
+        if self.options.max_wait_time is None:
+            return self.MAX_WAIT_TIME
+        return self.options.max_wait_time
+
     def download_statement(self, headless: bool = True) -> None:
         """
         Common download method for all platforms. Depending on the chosen
@@ -96,14 +200,219 @@ class BasePlatform:
                 self._webdriver_download(webdriver)
         elif self.DOWNLOAD_METHOD == 'session':
             with P2PSession(
-                    self.NAME, self.LOGOUT_URL, self.signals,
-                    json=self.JSON) as sess:
-                self._session_download(sess)
+                    self.NAME, self.LOGOUT_URL, self.signals, json=self.JSON,
+                    html_backend=self.options.html_backend) as sess:
+                sess.run(self._session_download(sess))
         else:
             raise PlatformFailedError(
                 f'{self.NAME}: invalid download method provided: '
                 f'{self.DOWNLOAD_METHOD}!')
 
+    async def async_download_statement(self) -> None:
+        """
+        Download the account statement with AsyncP2PSession. Only platforms
+        which support the asyncio engine can be downloaded this way, see
+        supports_async.
+
+        """
+        async with AsyncP2PSession(
+                self.NAME, self.LOGOUT_URL, self.signals, json=self.JSON,
+                html_backend=self.options.html_backend) as sess:
+            await sess.run(self._session_download(sess))
+
+    @classmethod
+    def supports_async(cls) -> bool:
+        """
+        Check if the platform can be downloaded with the asyncio engine.
+
+        Returns:
+            True if the platform uses P2PSession and its _session_download is
+            a flow, False otherwise.
+
+        """
+        return cls.DOWNLOAD_METHOD == 'session' and \
+            inspect.isgeneratorfunction(cls._session_download)
+
+    def has_valid_statement(
+            self, max_age: Optional[timedelta] = None) -> bool:
+        """
+        Check if a previously downloaded statement for the date range exists
+        and can be used instead of downloading it again.
+
+        A statement is only valid if it was downloaded after the end of the
+        date range since it may be incomplete otherwise.
+
+        Args:
+            max_age: Maximal age of the statement. If None, the age is not
+                checked. Default is None.
+
+        Returns:
+            True if the statement can be reused, False otherwise.
+
+        """
+        try:
+            stat = os.stat(self.statement)
+        except OSError:
+            return False
+
+        modified = datetime.fromtimestamp(stat.st_mtime)
+        valid = (
+            stat.st_size > 0 and os.access(self.statement, os.R_OK)
+            and modified.date() > self.date_range[1]
+            and (max_age is None or datetime.now() - modified <= max_age))
+        logger.debug(
+            '%s: existing statement %s is %s.', self.NAME, self.statement,
+            'valid' if valid else 'invalid')
+        return valid
+
+    def get_statement_parts(
+            self, max_age: Optional[timedelta] = None,
+            chunk_size: Optional[str] = None,
+            reuse: bool = True) -> Optional[List['BasePlatform']]:
+        """
+        Split the date range into parts which are covered by previously
+        downloaded statements and parts which still need to be downloaded.
+
+        Existing statements are found by their file names, which must end with
+        their date range like the name of self.statement. Only statements
+        accepted by has_valid_statement are used. Statements with the longest
+        coverage are preferred. Parts which need to be downloaded are split
+        into chunks of chunk_size, thus every downloaded chunk can be reused
+        even if the download of another chunk fails.
+
+        Args:
+            max_age: Maximal age of existing statements. If None, the age is
+                not checked. Default is None.
+            chunk_size: Size of the chunks which need to be downloaded, see
+                CHUNK_SIZES. If None, every gap is downloaded at once.
+                Default is None.
+            reuse: If False, existing statements are ignored and the whole
+                date range is split into chunks. Default is True.
+
+        Returns:
+            Chronologically sorted platform instances which together cover
+            the date range. Parts without a valid statement still need to
+            be downloaded. None if the name of self.statement does not end
+            with its date range, then the statement cannot be split.
+
+        """
+        directory = os.path.dirname(self.statement)
+        match = _STATEMENT_RE.match(
+            os.path.splitext(os.path.basename(self.statement))[0])
+        if not match:
+            return None
+        prefix = match.group('prefix')
+        candidates = self._find_statements(
+            directory, prefix, max_age) if reuse else []
+
+        parts = []
+        start, end = self.date_range
+        while start <= end:
+            covering = [
+                candidate for candidate in candidates
+                if candidate.date_range[0] <= start
+                <= candidate.date_range[1]]
+            if covering:
+                best = max(covering, key=lambda c: c.date_range[1])
+                part_range = (start, min(best.date_range[1], end))
+                parts.append(self._create_part(
+                    part_range, os.path.splitext(best.statement)[0]))
+            else:
+                # The gap ends before the next existing statement starts
+                gap_end = min((
+                    candidate.date_range[0] - timedelta(days=1)
+                    for candidate in candidates
+                    if candidate.date_range[0] > start), default=end)
+                part_range = (start, min(gap_end, end))
+                parts.extend(self._create_chunks(
+                    part_range, chunk_size, os.path.join(directory, prefix)))
+            start = part_range[1] + timedelta(days=1)
+
+        logger.debug(
+            '%s: statement parts %s.', self.NAME,
+            [part.statement for part in parts])
+        return parts
+
+    def _find_statements(
+            self, directory: str, prefix: str,
+            max_age: Optional[timedelta]) -> List['BasePlatform']:
+        """
+        Find the previously downloaded statements which can be reused.
+
+        Args:
+            directory: Directory of the statements.
+            prefix: File name prefix of the statements before the date range.
+            max_age: Maximal age of the statements. If None, the age is not
+                checked.
+
+        Returns:
+            Platform instances of all statements accepted by
+            has_valid_statement.
+
+        """
+        candidates = []
+        suffix = '.' + self.SUFFIX
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(suffix):
+                continue
+            stem = entry.name[:-len(suffix)]
+            match = _STATEMENT_RE.match(stem)
+            if not match or match.group('prefix') != prefix:
+                continue
+            try:
+                date_range = (
+                    datetime.strptime(match.group('start'), '%Y%m%d').date(),
+                    datetime.strptime(match.group('end'), '%Y%m%d').date())
+            except ValueError:
+                continue
+            candidate = self._create_part(
+                date_range, os.path.join(directory, stem))
+            if candidate.has_valid_statement(max_age):
+                candidates.append(candidate)
+        return candidates
+
+    def _create_chunks(
+            self, date_range: Tuple[date, date], chunk_size: Optional[str],
+            statement_prefix: str) -> List['BasePlatform']:
+        """
+        Create the platform instances for the chunks of a date range which
+        needs to be downloaded.
+
+        Args:
+            date_range: Date range which should be split into chunks.
+            chunk_size: Size of the chunks, see split_date_range.
+            statement_prefix: File name including path of the statements
+                without the date range and suffix.
+
+        Returns:
+            Chronologically sorted platform instances of the chunks.
+
+        """
+        return [
+            self._create_part(
+                chunk,
+                f'{statement_prefix}_{chunk[0]:%Y%m%d}-{chunk[1]:%Y%m%d}')
+            for chunk in split_date_range(date_range, chunk_size)]
+
+    def _create_part(
+            self, date_range: Tuple[date, date],
+            statement_without_suffix: str) -> 'BasePlatform':
+        """
+        Create an instance of the platform for a part of the date range.
+
+        Args:
+            date_range: Date range of the part.
+            statement_without_suffix: File name including path but without
+                suffix of the statement for this part.
+
+        Returns:
+            Platform instance with the same settings as this instance.
+
+        """
+        return type(self)(
+            date_range, statement_without_suffix, signals=self.signals,
+            options=self.options)
+
     def _webdriver_download(self, webdriver: P2PWebDriver) -> None:
         """
         Every child class using P2PWebdriver needs to override this method for
@@ -116,19 +425,21 @@ class BasePlatform:
         raise PlatformFailedError(
             f'{self.NAME}: no override of _webdriver_download!')
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Every child class using P2PSession needs to override this method for
-        downloading the account statement.
+        downloading the account statement. The download is written as a flow,
+        thus it runs on P2PSession and AsyncP2PSession, see p2p_session.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
         raise PlatformFailedError(
             f'{self.NAME}: no override of _session_download!')
 
-    def parse_statement(self, statement: Optional[str] = None) \
+    def parse_statement(
+            self, statement: Optional[str] = None, use_cache: bool = False) \
             -> Tuple[pd.DataFrame, Tuple[str, ...]]:
         """
         Parses the account statement.
@@ -137,6 +448,13 @@ class BasePlatform:
             statement: File name including path of the account
                 statement which should be parsed. If None, the file at
                 self.statement will be parsed. Default is None.
+            use_cache: If True, the parse results will be loaded from/saved
+                to a cache file next to the statement. The cache contains the
+                results for all dates of the statement, they are filtered by
+                the date range after loading. Default is False.
+
+        If self.parts is set and no statement is provided, the statements of
+        all parts are parsed and merged.
 
         Returns:
             Tuple with two elements. The first element is the data frame
@@ -146,18 +464,132 @@ class BasePlatform:
         """
         if statement:
             self.statement = statement
+        elif self.parts:
+            return self._merge_parts([
+                part.parse_statement(use_cache=use_cache)
+                for part in self.parts])
+
+        if not use_cache or not os.path.isfile(self.statement):
+            parser, unknown_cf_types = self._parse(self.date_range)
+            return parser.df, unknown_cf_types
+
+        cache = ParserCache(
+            self.statement, self._get_read_options(),
+            self._get_parser_settings())
+        result = cache.load()
+        if result is None:
+            parser, _ = self._parse(CACHE_DATE_RANGE)
+            result = (
+                parser.df, parser.unknown_cf_type_dates, parser.cf_type_dates)
+            cache.save(*result)
+        df, unknown_cf_type_dates, cf_type_dates = result
+        return \
+            filter_date_range(df, self.NAME, self.date_range, cf_type_dates), \
+            types_in_range(unknown_cf_type_dates, self.date_range)
+
+    def _parse(
+            self, date_range: Tuple[date, date]) \
+            -> Tuple[P2PParser, Tuple[str, ...]]:
+        """
+        Parse self.statement with P2PParser.
+
+        Args:
+            date_range: Date range (start_date, end_date) of the results.
 
+        Returns:
+            Tuple (parser containing the parsed data frame, unknown cash flow
+            types).
+
+        """
         parser = P2PParser(
-            self.NAME, self.date_range, self.statement, header=self.HEADER,
-            skipfooter=self.SKIP_FOOTER, signals=self.signals)
+            self.NAME, date_range, self.statement,
+            self._get_read_options(), signals=self.signals)
 
         self._transform_df(parser)
 
         unknown_cf_types = parser.parse(
             self.DATE_FORMAT, self.RENAME_COLUMNS, self.CASH_FLOW_TYPES,
             self.ORIG_CF_COLUMN, self.VALUE_COLUMN, self.BALANCE_COLUMN)
+        return parser, unknown_cf_types
+
+    def _merge_parts(
+            self, results: Sequence[Tuple[pd.DataFrame, Tuple[str, ...]]]) \
+            -> Tuple[pd.DataFrame, Tuple[str, ...]]:
+        """
+        Merge the parse results of all parts of the date range.
+
+        Args:
+            results: Parse results of the parts in chronological order.
 
-        return parser.df, unknown_cf_types
+        Returns:
+            Tuple with the merged data frame and all unknown cash flow types.
+
+        """
+        unknown_cf_types = tuple(sorted(set().union(
+            *(unknown for _, unknown in results))))
+
+        # Parts without cash flows only contain a zero line
+        dfs = [
+            df for df, _ in results
+            if len(df) != 1 or df.to_numpy(dtype=float).any()]
+        if dfs:
+            return concat_results(dfs), unknown_cf_types
+
+        df = results[0][0].reset_index()
+        df[P2PParser.DATE] = self.date_range[0]
+        return df.set_index(
+            [P2PParser.PLATFORM, P2PParser.CURRENCY, P2PParser.DATE]), \
+            unknown_cf_types
+
+    def _get_parser_settings(self) -> Dict[str, Any]:
+        """
+        Get the parser settings of the platform class which influence the
+        parse result of the statement.
+
+        Returns:
+            Dictionary with the parser settings of the platform.
+
+        """
+        platform = type(self)
+        return {
+            'name': platform.NAME,
+            'date_format': platform.DATE_FORMAT,
+            'rename_columns': platform.RENAME_COLUMNS,
+            'cash_flow_types': platform.CASH_FLOW_TYPES,
+            'orig_cf_column': platform.ORIG_CF_COLUMN,
+            'value_column': platform.VALUE_COLUMN,
+            'balance_column': platform.BALANCE_COLUMN,
+        }
+
+    def _get_read_options(self) -> ReadOptions:
+        """
+        Get the options for reading the statement of the platform.
+
+        Returns:
+            Options for reading the statement.
+
+        """
+        return ReadOptions(
+            header=self.HEADER, skipfooter=self.SKIP_FOOTER,
+            usecols=self.USE_COLUMNS, dtype=self.DTYPES,
+            date_columns=self._get_date_columns(),
+            date_format=self.DATE_FORMAT,
+            xlsx_engine=self.XLSX_ENGINE or self.options.xlsx_engine)
+
+    def _get_date_columns(self) -> Tuple[str, ...]:
+        """
+        Get the names of the statement columns which contain the dates.
+
+        Returns:
+            Tuple with the original names of all columns which will be renamed
+            to P2PParser.DATE.
+
+        """
+        if not self.RENAME_COLUMNS:
+            return ()
+        return tuple(
+            column for column, target in self.RENAME_COLUMNS.items()
+            if target == P2PParser.DATE)
 
     def _transform_df(self, parser: P2PParser) -> None:
         """
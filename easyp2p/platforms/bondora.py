@@ -7,7 +7,7 @@ Download and parse Bondora statement.
 """
 
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.platforms.base_platform import BasePlatform
 
 
@@ -23,6 +23,10 @@ class Bondora(BasePlatform):
     LOGIN_URL = 'https://www.bondora.com/en/login/'
     LOGOUT_URL = 'https://www.bondora.com/en/authorize/logout/'
 
+    # Chunk settings
+    # Statements are downloaded with stateless requests
+    PARALLEL_CHUNKS = True
+
     # Parser settings
     DATE_FORMAT = '%d.%m.%Y'
     RENAME_COLUMNS = {
@@ -34,22 +38,27 @@ class Bondora(BasePlatform):
         'Principal received - total': P2PParser.REDEMPTION_PAYMENT,
         'Opening balance': P2PParser.START_BALANCE_NAME,
     }
+    USE_COLUMNS = (
+        'Period', 'Opening balance', 'Net capital deployed',
+        'Net loan investments', 'Principal received - total',
+        'Interest received - total', 'Closing balance',
+        'Principal planned - total')
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the Bondora account statement for given date
         range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
         token_field = '__RequestVerificationToken'
-        data = sess.get_values_from_tag_by_name(
+        data = yield sess.get_values_from_tag_by_name(
             self.LOGIN_URL, 'input', [token_field],
             self.errors.load_login_failed)
 
-        sess.log_into_page(self.LOGIN_URL, 'Email', 'Password', data)
+        yield sess.log_into_page(self.LOGIN_URL, 'Email', 'Password', data)
 
         dates = {
             'StartYear': self.date_range[0].strftime('%Y'),
@@ -61,7 +70,7 @@ class Bondora(BasePlatform):
         for key, value in dates.items():
             url += str(key) + '=' + str(value) + '&'
         url += 'downloadExcel=true'
-        sess.download_statement(url, self.statement, 'get')
+        yield sess.download_statement(url, self.statement, 'get')
 
     def _transform_df(self, parser: P2PParser) -> None:
         """
@@ -7,7 +7,7 @@ Download and parse DoFinance statement.
 """
 
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.platforms.base_platform import BasePlatform
 
 
@@ -32,23 +32,25 @@ class DoFinance(BasePlatform):
     ORIG_CF_COLUMN = 'Transaction Type'
     VALUE_COLUMN = 'Amount, €'
     SKIP_FOOTER = 2
+    USE_COLUMNS = ('Processing Date', 'Transaction Type', 'Amount, €')
+    DTYPES = {'Transaction Type': 'category', 'Amount, €': 'float64'}
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the DoFinance account statement for given date
         range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
         token_names = ['_Token[fields]', '_Token[unlocked]']
-        data = sess.get_values_from_tag_by_name(
+        data = yield sess.get_values_from_tag_by_name(
             self.LOGIN_URL, 'input', token_names, self.errors.load_login_failed)
         data['_method'] = 'POST'
-        sess.log_into_page(self.LOGIN_URL, 'email', 'password', data)
+        yield sess.log_into_page(self.LOGIN_URL, 'email', 'password', data)
 
-        data = sess.get_values_from_tag_by_name(
+        data = yield sess.get_values_from_tag_by_name(
             self.STATEMENT_URL, 'input', token_names,
             self.errors.load_statement_page_failed)
         data['_method'] = 'PUT'
@@ -56,7 +58,7 @@ class DoFinance(BasePlatform):
         data['date_to'] = self.date_range[1].strftime('%d.%m.%Y')
         data['trans_type'] = ''
         data['xls'] = 'Download+XLS'
-        sess.download_statement(
+        yield sess.download_statement(
             self.STATEMENT_URL, self.statement, 'post', data)
 
     def _transform_df(self, parser: P2PParser) -> None:
@@ -6,7 +6,7 @@ Download and parse Estateguru statement.
 """
 
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.platforms.base_platform import BasePlatform
 
 
@@ -46,19 +46,23 @@ class Estateguru(BasePlatform):
     VALUE_COLUMN = 'Amount'
     BALANCE_COLUMN = 'Available to invest'
     SKIP_FOOTER = 1
+    USE_COLUMNS = (
+        'Confirmation Date', 'Cash Flow Type', 'Cash Flow Status',
+        'Currency', 'Amount', 'Available to invest')
+    DTYPES = {'Amount': 'float64', 'Available to invest': 'float64'}
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the Estateguru account statement for given date
         range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
-        sess.log_into_page(self.LOGIN_URL, 'username', 'password')
+        yield sess.log_into_page(self.LOGIN_URL, 'username', 'password')
 
-        download_url = sess.get_url_from_partial_link(
+        download_url = yield sess.get_url_from_partial_link(
             self.STATEMENT_URL, 'downloadOrderReport.csv',
             self.errors.load_statement_page_failed)
         user_id = download_url.split('&')[1].split('=')[1]
@@ -75,11 +79,11 @@ class Estateguru(BasePlatform):
             'controller': "portfolio",
             'action': "ajaxFilterTransactions",
         }
-        sess.request(
+        yield sess.request(
             self.GEN_STATEMENT_URL, 'post',
             self.errors.statement_generation_failed, data)
 
-        sess.download_statement(
+        yield sess.download_statement(
             f'https://estateguru.co{download_url}', self.statement, 'get')
 
     def _transform_df(self, parser: P2PParser) -> None:
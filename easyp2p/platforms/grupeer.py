@@ -49,6 +49,8 @@ class Grupeer(BasePlatform):
     ORIG_CF_COLUMN = 'Type'
     VALUE_COLUMN = 'Amount'
     BALANCE_COLUMN = 'Balance'
+    USE_COLUMNS = ('Date', 'Type', 'Amount', 'Balance', 'Currency')
+    DTYPES = {'Type': 'category'}
 
     def _webdriver_download(self, webdriver: P2PWebDriver) -> None:
         """
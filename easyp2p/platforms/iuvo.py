@@ -47,6 +47,10 @@ class Iuvo(BasePlatform):
     BALANCE_COLUMN = 'Balance'
     HEADER = 3
     SKIP_FOOTER = 3
+    USE_COLUMNS = ('Date', 'Transaction Type', 'Turnover', 'Balance')
+    DTYPES = {
+        'Transaction Type': 'category', 'Turnover': 'float64',
+        'Balance': 'float64'}
 
     def _webdriver_download(self, webdriver: P2PWebDriver) -> None:
         """
@@ -79,6 +79,8 @@ class Mintos(BasePlatform):
     ORIG_CF_COLUMN = 'Cash Flow Type'
     VALUE_COLUMN = 'Turnover'
     BALANCE_COLUMN = 'Balance'
+    USE_COLUMNS = ('Date', 'Details', 'Turnover', 'Balance', 'Currency')
+    DTYPES = {'Turnover': 'float64', 'Balance': 'float64'}
 
     signals = Signals()
 
@@ -8,7 +8,7 @@ Download and parse PeerBerry statement.
 import json
 
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.platforms.base_platform import BasePlatform
 
 
@@ -26,6 +26,10 @@ class PeerBerry(BasePlatform):
     LOGIN_URL = 'https://api.peerberry.com/v1/investor/login'
     LOGOUT_URL = 'https://api.peerberry.com/v1/investor/logout'
 
+    # Chunk settings
+    # Statements are downloaded with stateless requests
+    PARALLEL_CHUNKS = True
+
     # Parser settings
     DATE_FORMAT = '%Y-%m-%d'
     RENAME_COLUMNS = {
@@ -41,17 +45,19 @@ class PeerBerry(BasePlatform):
     }
     ORIG_CF_COLUMN = 'Type'
     VALUE_COLUMN = 'Amount'
+    USE_COLUMNS = ('Date', 'Type', 'Amount', 'Currency')
+    DTYPES = {'Type': 'category', 'Amount': 'float64'}
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the PeerBerry account statement for given date
         range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
-        resp = sess.log_into_page(self.LOGIN_URL, 'email', 'password')
+        resp = yield sess.log_into_page(self.LOGIN_URL, 'email', 'password')
         access_token = json.loads(resp.text)['access_token']
         sess.sess.headers.update(
             {'Authorization': f'Bearer {access_token}'})
@@ -60,4 +66,4 @@ class PeerBerry(BasePlatform):
             f'startDate={self.date_range[0].strftime("%Y-%m-%d")}&'
             f'endDate={self.date_range[1].strftime("%Y-%m-%d")}&'
             f'transactionType=0&lang=en')
-        sess.download_statement(statement_url, self.statement, 'get')
+        yield sess.download_statement(statement_url, self.statement, 'get')
@@ -9,7 +9,7 @@ Download and parse Robocash statement.
 import json
 
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.platforms.base_platform import BasePlatform
 
 
@@ -46,21 +46,27 @@ class Robocash(BasePlatform):
     ORIG_CF_COLUMN = 'Operation'
     VALUE_COLUMN = 'Amount'
     BALANCE_COLUMN = "Portfolio's balance"
+    USE_COLUMNS = (
+        'Date and time', 'Operation', 'Amount', "Portfolio's balance")
+    DTYPES = {
+        'Operation': 'category', 'Amount': 'float64',
+        "Portfolio's balance": 'float64'}
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the Robocash account statement for given date
         range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
-        data = sess.get_values_from_tag_by_name(
+        data = yield sess.get_values_from_tag_by_name(
             self.LOGIN_URL, 'input', ['_token'], self.errors.load_login_failed)
-        sess.log_into_page(self.LOGIN_URL, 'email', 'password', data=data)
+        yield sess.log_into_page(
+            self.LOGIN_URL, 'email', 'password', data=data)
 
-        token = sess.get_value_from_script(
+        token = yield sess.get_value_from_script(
             self.STATEMENT_URL, {'id': 'report-template'}, 'input',
             '_token', self.errors.load_statement_page_failed)
 
@@ -71,19 +77,20 @@ class Robocash(BasePlatform):
             'end_date': self.date_range[1].strftime("%Y-%m-%d"),
             'statement_type': '1'
         }
-        sess.request(
+        yield sess.request(
             self.GEN_STATEMENT_URL, 'post',
             self.errors.statement_generation_failed, data)
 
         def download_ready():
-            report = json.loads(sess.get_value_from_tag(
+            report = yield sess.probe_value_from_tag(
                 self.STATEMENT_URL, 'report-component', ':initial_report',
-                self.errors.load_statement_page_failed))
+                self.errors.load_statement_page_failed)
+            report = json.loads(report)
             if report['filename'] is not None:
-                sess.download_statement(
+                yield sess.download_statement(
                     f'https://robo.cash/cabinet/statement/{report["id"]}'
                     f'/download', self.statement, 'get')
                 return True
             return False
 
-        sess.wait(download_ready)
+        yield sess.wait(download_ready, self.max_wait_time)
@@ -44,6 +44,8 @@ class Swaper(BasePlatform):
     }
     ORIG_CF_COLUMN = 'Transaction type'
     VALUE_COLUMN = 'Amount'
+    USE_COLUMNS = ('Booking date', 'Transaction type', 'Amount')
+    DTYPES = {'Transaction type': 'category', 'Amount': 'float64'}
 
     def _webdriver_download(self, webdriver: P2PWebDriver) -> None:
         """
@@ -6,9 +6,8 @@ Download and parse Twino statement.
 
 """
 
-from easyp2p.p2p_credentials import get_credentials
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.p2p_signals import PlatformFailedError
 from easyp2p.platforms.base_platform import BasePlatform
 
@@ -30,6 +29,8 @@ class Twino(BasePlatform):
     GEN_STATEMENT_URL = \
         'https://www.twino.eu/ws/web/investor/account-entries/' \
         'init-export-to-excel'
+    # Generating the statement can take longer than the default on slow days
+    MAX_WAIT_TIME = 120
 
     # Parser settings
     DATE_FORMAT = '%d.%m.%Y %H:%M'
@@ -50,27 +51,30 @@ class Twino(BasePlatform):
     ORIG_CF_COLUMN = 'Cash Flow Type'
     VALUE_COLUMN = 'Amount, EUR'
     HEADER = 2
+    USE_COLUMNS = ('Processing Date', 'Type', 'Description', 'Amount, EUR')
+    DTYPES = {'Amount, EUR': 'float64'}
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the Twino account statement for given date range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         Raises:
             PlatformFailedError: If two factor authorization is enabled.
 
         """
-        credentials = get_credentials(self.NAME, self.signals)
+        credentials = yield sess.get_credentials()
         check2fa_url = (
             f'https://www.twino.eu/ws/public/check2fa?email={credentials[0]}')
-        resp = sess.request(check2fa_url, 'get', self.errors.load_login_failed)
+        resp = yield sess.request(
+            check2fa_url, 'get', self.errors.load_login_failed)
 
         if resp.json():
             raise PlatformFailedError(self.errors.tfa_not_supported)
 
-        sess.log_into_page(self.LOGIN_URL, 'name', 'password')
+        yield sess.log_into_page(self.LOGIN_URL, 'name', 'password')
 
         start_date = [
             self.date_range[0].year, self.date_range[0].month,
@@ -82,7 +86,7 @@ class Twino(BasePlatform):
             'processingDateFrom': start_date,
             'processingDateTo': end_date,
         }
-        sess.request(
+        yield sess.request(
             self.GEN_STATEMENT_URL, 'post',
             self.errors.statement_generation_failed, data)
 
@@ -90,20 +94,17 @@ class Twino(BasePlatform):
             download_url = (
                 f'https://www.twino.eu/ws/web/export-to-excel/{credentials[0]}/'
                 f'download')
-            res = sess.request(
+            res = yield sess.request(
                 download_url, 'get', self.errors.statement_download_failed,
-                success_codes=(200, 500))
-            if res.status_code == 200:
-                with open(self.statement, 'wb') as file:
-                    file.write(res.content)
-                return True
-
+                success_codes=(200, 500), stream=True)
+            # Status code 500 means that the statement is not ready yet
             if res.status_code == 500:
+                yield sess.close_response(res)
                 return False
+            yield sess.save_statement(res, self.statement)
+            return True
 
-            raise RuntimeError(self.errors.statement_download_failed)
-
-        sess.wait(download_ready)
+        yield sess.wait(download_ready, self.max_wait_time)
 
     def _transform_df(self, parser: P2PParser) -> None:
         """
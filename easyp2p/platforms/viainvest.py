@@ -8,7 +8,7 @@ Download and parse Viventor statement.
 import pandas as pd
 
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.platforms.base_platform import BasePlatform
 
 
@@ -25,6 +25,10 @@ class Viainvest(BasePlatform):
     LOGIN_URL = 'https://viainvest.com/users/login'
     LOGOUT_URL = 'https://viainvest.com/en/users/logout'
 
+    # Chunk settings
+    # Statements are downloaded with stateless requests
+    PARALLEL_CHUNKS = True
+
     # Parser settings
     DATE_FORMAT = '%m/%d/%Y'
     RENAME_COLUMNS = {'Value date': P2PParser.DATE}
@@ -42,31 +46,36 @@ class Viainvest(BasePlatform):
     }
     ORIG_CF_COLUMN = 'Transaction type'
     VALUE_COLUMN = 'Amount'
+    USE_COLUMNS = (
+        'Value date', 'Transaction type', 'Credit (€)', 'Debit (€)')
+    DTYPES = {
+        'Transaction type': 'category', 'Credit (€)': 'float64',
+        'Debit (€)': 'float64'}
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the Viainvest account statement for given date
         range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
         token_names = [
             'data[_Token][key]', 'data[_Token][fields]',
             'data[_Token][unlocked]']
-        data = sess.get_values_from_tag_by_name(
+        data = yield sess.get_values_from_tag_by_name(
             self.LOGIN_URL, 'input', token_names, self.errors.load_login_failed)
         data['_method'] = 'POST'
         data['data[User][is_remember]'] = '0'
-        sess.log_into_page(
+        yield sess.log_into_page(
             self.LOGIN_URL, 'data[User][email]', 'data[User][passwd]', data)
 
         download_url = (
             f'https://viainvest.com/en/transactions/index/do_report/'
             f'from_date:{self.date_range[0].strftime("%Y-%m-%d")}/'
             f'to_date:{self.date_range[1].strftime("%Y-%m-%d")}')
-        resp = sess.request(
+        resp = yield sess.request(
             download_url, 'get', self.errors.statement_download_failed)
 
         # If there no cash flows in date range the website returns a HTML
@@ -10,7 +10,7 @@ import json
 import pandas as pd
 
 from easyp2p.p2p_parser import P2PParser
-from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_session import Flow, P2PSession
 from easyp2p.platforms.base_platform import BasePlatform
 
 
@@ -30,6 +30,10 @@ class Viventor(BasePlatform):
     LOGOUT_URL = 'https://www.viventor.com/logout'
     STATEMENT_URL = 'https://api.viventor.com/api/app/v1/myaccounts.json'
 
+    # Chunk settings
+    # Statements are downloaded with stateless requests
+    PARALLEL_CHUNKS = True
+
     # Parser settings
     DATE_FORMAT = '%Y-%m-%d'
     RENAME_COLUMNS = {'date': P2PParser.DATE}
@@ -46,18 +50,21 @@ class Viventor(BasePlatform):
     ORIG_CF_COLUMN = 'type'
     VALUE_COLUMN = 'amount'
     BALANCE_COLUMN = 'residual'
+    # The cash flows are nested in the results column
+    USE_COLUMNS = ('results',)
 
-    def _session_download(self, sess: P2PSession) -> None:
+    def _session_download(self, sess: P2PSession) -> Flow:
         """
         Generate and download the Viventor account statement for given date
         range.
 
         Args:
-            sess: P2PSession instance.
+            sess: P2PSession or AsyncP2PSession instance.
 
         """
         data = {'web': 'true'}
-        resp = sess.log_into_page(self.LOGIN_URL, 'email', 'password', data)
+        resp = yield sess.log_into_page(
+            self.LOGIN_URL, 'email', 'password', data)
         access_token = json.loads(resp.text)['token']
         sess.sess.headers.update(
             {'Authorization': f'Bearer {access_token}'})
@@ -67,7 +74,7 @@ class Viventor(BasePlatform):
             'end_date': self.date_range[1].strftime(self.DATE_FORMAT),
             'payment_type': 0
         }
-        sess.download_statement(
+        yield sess.download_statement(
             self.STATEMENT_URL, self.statement, 'post', data)
 
     def _transform_df(self, parser: P2PParser) -> None:
@@ -8,7 +8,7 @@ from PyQt5.QtGui import QColor
 from PyQt5.QtWidgets import QDialog, QDialogButtonBox
 
 from easyp2p.p2p_settings import Settings
-from easyp2p.p2p_worker import WorkerThread
+from easyp2p.p2p_worker import PLATFORM_STEPS, WorkerThread
 from easyp2p.ui.Ui_progress_window import Ui_ProgressWindow
 
 
@@ -30,10 +30,11 @@ class ProgressWindow(QDialog, Ui_ProgressWindow):
         self.setupUi(self)
 
         # Initialize progress bar
-        # Each platform has 7 stages (init ChromeDriver, log in, open statement
-        # page, generate + download statement, log out, parse statement) plus
-        # one common stage for writing the results to Excel
-        self.progress_bar.setMaximum(len(settings.platforms) * 7 + 1)
+        # Each platform has PLATFORM_STEPS stages plus one common stage for
+        # writing the results to Excel. Platforms whose statements are
+        # downloaded in several parts add more stages, see add_progress_steps.
+        self.progress_bar.setMaximum(
+            len(settings.platforms) * PLATFORM_STEPS + 1)
         self.progress_bar.setValue(0)
 
         # Disable the Ok button
@@ -43,8 +44,12 @@ class ProgressWindow(QDialog, Ui_ProgressWindow):
         self.worker = WorkerThread(settings)
         self.worker.signals.update_progress_bar.connect(
             self.update_progress_bar)
+        self.worker.signals.add_progress_steps.connect(
+            self.add_progress_steps)
         self.worker.signals.add_progress_text.connect(
             self.add_progress_text)
+        self.worker.signals.download_progress.connect(
+            self.update_download_progress)
         self.abort.connect(self.worker.signals.abort_signal)
         self.worker.start()
 
@@ -63,13 +68,49 @@ class ProgressWindow(QDialog, Ui_ProgressWindow):
 
     @pyqtSlot()
     def update_progress_bar(self) -> None:
-        """Update the progress bar in ProgressWindow to new value."""
+        """
+        Update the progress bar in ProgressWindow to new value. The number of
+        stages per platform is only an estimate, thus the maximum is only
+        reached and the Ok button enabled after the worker is done.
+        """
         if self.worker.done:
             self.progress_bar.setValue(self.progress_bar.maximum())
-        else:
-            self.progress_bar.setValue(self.progress_bar.value() + 1)
-        if self.progress_bar.value() == self.progress_bar.maximum():
             self.button_box.button(QDialogButtonBox.Ok).setEnabled(True)
+        else:
+            self.progress_bar.setValue(min(
+                self.progress_bar.value() + 1,
+                self.progress_bar.maximum() - 1))
+
+    @pyqtSlot(int)
+    def add_progress_steps(self, steps: int) -> None:
+        """
+        Increase the maximum of the progress bar, e.g. if a statement is
+        downloaded in several parts.
+
+        Args:
+            steps: Number of additional steps.
+
+        """
+        self.progress_bar.setMaximum(self.progress_bar.maximum() + steps)
+
+    @pyqtSlot(str, int, int)
+    def update_download_progress(
+            self, name: str, received: int, total: int) -> None:
+        """
+        Show the progress of the current statement download in the progress
+        bar text.
+
+        Args:
+            name: Name of the P2P platform.
+            received: Number of received bytes.
+            total: Size of the statement in bytes.
+
+        """
+        if received >= total:
+            self.progress_bar.setFormat('%p%')
+        else:
+            self.progress_bar.setFormat(
+                f'%p% ({name}: {received * 100 // total}%)')
 
     @pyqtSlot(str, bool)
     def add_progress_text(self, txt: str, print_red: bool) -> None:
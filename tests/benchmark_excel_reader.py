@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""
+Benchmark the xlsx engines on the account statements in tests/input.
+
+Run from the repository root with:
+
+    python -m tests.benchmark_excel_reader [--repeat N]
+
+"""
+import argparse
+import glob
+import os
+import time
+from typing import Dict, Tuple
+
+from easyp2p.excel_reader import XLSX_ENGINES
+import easyp2p.platforms as p2p_platforms
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), 'input')
+
+
+def get_reader_settings() -> Dict[str, Tuple[int, int]]:
+    """
+    Get header and skipfooter of all platforms with xlsx statements.
+
+    Returns:
+        Dictionary with lower case platform names as keys and
+        (header, skipfooter) as values.
+
+    """
+    settings = {}
+    for name in dir(p2p_platforms):
+        platform = getattr(p2p_platforms, name)
+        if getattr(platform, 'SUFFIX', None) == 'xlsx':
+            settings[name.lower()] = (platform.HEADER, platform.SKIP_FOOTER)
+    return settings
+
+
+def benchmark(repeat: int) -> None:
+    """
+    Read every xlsx statement with all engines and print the best run times.
+
+    Args:
+        repeat: Number of runs per statement and engine.
+
+    """
+    settings = get_reader_settings()
+    totals = dict.fromkeys(XLSX_ENGINES, 0.)
+    print(f'{"Statement":50}' + ''.join(f'{e:>12}' for e in XLSX_ENGINES))
+    for input_file in sorted(glob.glob(os.path.join(INPUT_DIR, '*.xlsx'))):
+        name = os.path.basename(input_file)
+        header, skipfooter = settings[name.split('_')[2]]
+        results = {}
+        for engine, reader in XLSX_ENGINES.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                df = reader(input_file, header=header, skipfooter=skipfooter)
+                timings.append(time.perf_counter() - start)
+            totals[engine] += min(timings)
+            results[engine] = (min(timings), df)
+
+        dfs = [df for _, df in results.values()]
+        same = all(df.equals(dfs[0]) for df in dfs[1:])
+        print(f'{name:50}' + ''.join(
+            f'{timing:12.3f}' for timing, _ in results.values())
+            + ('' if same else '  DIFFERENT RESULTS'))
+
+    print(f'{"Total":50}' + ''.join(f'{t:12.3f}' for t in totals.values()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    benchmark(parser.parse_args().repeat)
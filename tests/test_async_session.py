@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_async_session."""
+
+import asyncio
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+import unittest
+from unittest.mock import patch
+
+from easyp2p.p2p_async_session import AsyncP2PSession
+from easyp2p.p2p_http import ASYNC_AVAILABLE, shared_async_transport
+from easyp2p.p2p_polling import Backoff
+from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_signals import PlatformFailedError
+from easyp2p.platforms import Viventor
+
+PAGE = b'<html><input name="token" value="abc"/><a href="/file.csv">x</a>'
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    """Request handler which serves a login page and a statement."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the page for / and return 404 for all other paths."""
+        if self.path == '/':
+            self.send(200, PAGE)
+        elif self.path == '/statement':
+            self.send(200, b'statement')
+        elif self.path == '/status':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self.send(200, PAGE, {'ETag': '"v1"'})
+        else:
+            self.send(404, b'not found')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Return a token for /login and echo the posted data and the
+        Authorization header otherwise.
+        """
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.path == '/login':
+            self.send(200, b'{"token": "secret"}')
+        else:
+            auth = self.headers.get('Authorization', '').encode()
+            self.send(200, auth + b'\n' + body)
+
+    def send(
+            self, status: int, body: bytes,
+            headers: Optional[Dict[str, str]] = None) -> None:
+        """Send a response with status, body and additional headers."""
+        self.send_response(status)
+        for key, value in (headers or dict()).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Do not log requests."""
+
+
+@unittest.skipUnless(ASYNC_AVAILABLE, 'httpx is not installed')
+class AsyncP2PSessionTests(unittest.TestCase):
+
+    """Test AsyncP2PSession against a local HTTP server."""
+
+    def setUp(self) -> None:
+        """Start a local HTTP server."""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        """Stop the HTTP server."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def run_session(self, func):
+        """Run the coroutine returned by func with a new session."""
+        async def run():
+            async with AsyncP2PSession('Test', self.url, None) as sess:
+                return await func(sess)
+        return asyncio.run(run())
+
+    def test_request(self):
+        """Test get and post requests."""
+        async def func(sess):
+            resp = await sess.request(
+                self.url, 'post', 'error', data={'a': '1'})
+            return resp.text
+        self.assertEqual(self.run_session(func), '\na=1')
+
+    def test_request_fails(self):
+        """Test that an unexpected status code fails the platform."""
+        self.assertRaises(
+            PlatformFailedError, self.run_session,
+            lambda sess: sess.request(self.url + 'missing', 'get', 'error'))
+
+    def test_html_helpers(self):
+        """Test extracting values and links from HTML pages."""
+        async def func(sess):
+            return (
+                await sess.get_values_from_tag_by_name(
+                    self.url, 'input', ['token'], 'error'),
+                await sess.get_url_from_partial_link(
+                    self.url, 'file', 'error'))
+        self.assertEqual(
+            self.run_session(func), ({'token': 'abc'}, '/file.csv'))
+
+    def test_probe_value_from_tag(self):
+        """Test that probes reuse the value of unchanged pages."""
+        async def func(sess):
+            values = [
+                await sess.probe_value_from_tag(
+                    self.url + 'status', 'input', 'value', 'error')
+                for _ in range(2)]
+            return values, sess.last_response.status_code
+        self.assertEqual(self.run_session(func), (['abc', 'abc'], 304))
+
+    def test_download_statement(self):
+        """Test downloading a statement to a file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            location = os.path.join(temp_dir, 'statement.csv')
+            self.run_session(lambda sess: sess.download_statement(
+                self.url + 'statement', location, 'get'))
+            with open(location, encoding='utf-8') as file:
+                self.assertEqual(file.read(), 'statement')
+
+    def test_wait(self):
+        """Test that wait polls a flow until the condition is fulfilled."""
+        statuses = []
+
+        def func(sess):
+            def ready():
+                path = 'statement' if len(statuses) == 2 else 'missing'
+                resp = yield sess.request(
+                    self.url + path, 'get', 'error', success_codes=(200, 404),
+                    stream=True)
+                statuses.append(resp.status_code)
+                yield sess.close_response(resp)
+                return resp.status_code == 200
+            return sess.wait(ready, backoff=Backoff(initial_delay=0))
+
+        self.run_session(func)
+        self.assertEqual(statuses, [404, 404, 200])
+
+    def test_wait_timeout(self):
+        """Test that wait fails if the condition is never fulfilled."""
+        async def ready():
+            return False
+
+        self.assertRaises(
+            PlatformFailedError, self.run_session,
+            lambda sess: sess.wait(ready, max_wait_time=0))
+
+    def test_shared_transport(self):
+        """Test that closing a session keeps the shared transport open."""
+        async def run():
+            async with shared_async_transport():
+                results = []
+                for _ in range(2):
+                    async with AsyncP2PSession(
+                            'Test', self.url, None) as sess:
+                        resp = await sess.request(
+                            self.url + 'statement', 'get', 'error')
+                        results.append(resp.text)
+                return results
+        self.assertEqual(asyncio.run(run()), ['statement'] * 2)
+
+    def test_platform_flow(self):
+        """
+        Test that the download flow of a platform gives the same statement on
+        P2PSession and AsyncP2PSession.
+        """
+        statements = []
+        urls = {
+            'LOGIN_URL': self.url + 'login', 'LOGOUT_URL': self.url,
+            'STATEMENT_URL': self.url + 'statement'}
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                patch.multiple(Viventor, **urls), \
+                patch.object(
+                    P2PSession, 'get_credentials',
+                    return_value=('user', 'password')), \
+                patch(
+                    'easyp2p.p2p_async_session.get_credentials',
+                    return_value=('user', 'password')):
+            for name in ('sync', 'async'):
+                platform = Viventor(
+                    (date(2020, 1, 1), date(2020, 1, 31)),
+                    os.path.join(temp_dir, name))
+                if name == 'sync':
+                    platform.download_statement()
+                else:
+                    asyncio.run(platform.async_download_statement())
+                with open(platform.statement, encoding='utf-8') as file:
+                    auth, body = file.read().split('\n', 1)
+                statements.append((auth, json.loads(body)))
+
+        self.assertEqual(statements[0], statements[1])
+        self.assertEqual(statements[0], ('Bearer secret', {
+            'start_date': '2020-01-01', 'end_date': '2020-01-31',
+            'payment_type': 0}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_cache."""
+
+from datetime import date
+import glob
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from easyp2p.p2p_cache import CACHE_SUFFIX, META_SUFFIX, ParserCache
+from easyp2p.p2p_parser import P2PParser, ReadOptions
+import easyp2p.platforms as p2p_platforms
+from easyp2p.platforms import Estateguru
+
+TEST_DIR = os.path.dirname(__file__)
+INPUT_FILE = os.path.join(
+    TEST_DIR, 'input', 'input_test_estateguru_parser_missing_month.csv')
+
+# Statement fixtures of all platforms which can be parsed
+STATEMENTS = sorted(
+    file_name for file_name in
+    glob.glob(os.path.join(TEST_DIR, 'input', 'input_test_*_parser_*.*'))
+    + glob.glob(os.path.join(
+        TEST_DIR, 'expected_results', 'result_test_download_*.*'))
+    if 'wrong_column_names' not in file_name)
+PLATFORMS = {
+    platform.NAME.lower(): platform for platform in (
+        p2p_platforms.Bondora, p2p_platforms.DoFinance,
+        p2p_platforms.Estateguru, p2p_platforms.Grupeer, p2p_platforms.Iuvo,
+        p2p_platforms.Mintos, p2p_platforms.PeerBerry, p2p_platforms.Robocash,
+        p2p_platforms.Swaper, p2p_platforms.Twino, p2p_platforms.Viainvest,
+        p2p_platforms.Viventor)}
+DATE_RANGES = (
+    (date(2018, 9, 1), date(2018, 12, 31)),
+    (date(2016, 9, 1), date(2016, 12, 31)),
+    (date(2018, 8, 1), date(2019, 1, 31)))
+
+
+class ParserCacheTests(unittest.TestCase):
+
+    """Test caching of parse results."""
+
+    def setUp(self) -> None:
+        """Copy a statement to a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.statement = os.path.join(
+            self.temp_dir.name, 'estateguru_statement.csv')
+        shutil.copyfile(INPUT_FILE, self.statement)
+        self.cache_file = os.path.join(
+            self.temp_dir.name, 'estateguru_statement' + CACHE_SUFFIX)
+        self.meta_file = os.path.join(
+            self.temp_dir.name, 'estateguru_statement' + META_SUFFIX)
+        self.date_range = (date(2018, 9, 1), date(2018, 12, 31))
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def get_platform(self) -> Estateguru:
+        """Create an Estateguru instance for the statement."""
+        return Estateguru(self.date_range, os.path.splitext(self.statement)[0])
+
+    def get_cache(self) -> ParserCache:
+        """Create the ParserCache which Estateguru uses for the statement."""
+        # pylint: disable=protected-access
+        platform = self.get_platform()
+        return ParserCache(
+            self.statement, platform._get_read_options(),
+            platform._get_parser_settings())
+
+    def parse(self, use_cache: bool = True):
+        """Parse the statement with a new Estateguru instance."""
+        return self.get_platform().parse_statement(use_cache=use_cache)
+
+    def test_no_cache(self):
+        """Test that no cache is written if use_cache is False."""
+        self.parse(use_cache=False)
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_cache_hit(self):
+        """Test that the cached results are equal to the parsed results."""
+        df, unknown_cf_types = self.parse()
+        self.assertTrue(os.path.isfile(self.cache_file))
+        with patch('easyp2p.p2p_parser.get_df_from_file') as reader:
+            df_cached, unknown_cached = self.parse()
+        reader.assert_not_called()
+        pd.testing.assert_frame_equal(df_cached, df)
+        self.assertEqual(unknown_cached, unknown_cf_types)
+
+    def test_statement_changed(self):
+        """Test that the cache is invalidated if the statement changes."""
+        self.parse()
+        with open(self.statement, 'a', encoding='utf-8') as file:
+            file.write('\n')
+        with patch(
+                'easyp2p.platforms.base_platform.P2PParser',
+                wraps=P2PParser) as parser:
+            self.parse()
+        parser.assert_called_once()
+
+    def test_date_range_changed(self):
+        """
+        Test that the cache is used for other date ranges and that the
+        results are filtered by the date range.
+        """
+        self.parse()
+        for date_range in (
+                (date(2018, 9, 1), date(2018, 11, 30)),
+                (date(2018, 10, 1), date(2018, 12, 31))):
+            self.date_range = date_range
+            df_uncached, _ = self.parse(use_cache=False)
+            with patch('easyp2p.p2p_parser.get_df_from_file') as reader:
+                df, _ = self.parse()
+            reader.assert_not_called()
+            with self.subTest(date_range=date_range):
+                pd.testing.assert_frame_equal(df, df_uncached)
+
+    def test_date_range_without_results(self):
+        """Test that a zero line is returned if no results are in range."""
+        self.parse()
+        self.date_range = (date(2019, 1, 1), date(2019, 1, 31))
+        df, _ = self.parse()
+        df_uncached, _ = self.parse(use_cache=False)
+        pd.testing.assert_frame_equal(df, df_uncached)
+
+    def test_read_options_changed(self):
+        """Test that the cache is invalidated if the read options change."""
+        key = ParserCache(self.statement, ReadOptions()).key
+        self.assertNotEqual(
+            ParserCache(self.statement, ReadOptions(header=1)).key, key)
+        self.assertEqual(ParserCache(self.statement, ReadOptions()).key, key)
+
+    def test_parser_settings_changed(self):
+        """Test that the cache is invalidated if the parser settings change."""
+        key = self.get_cache().key
+        cash_flow_types = dict(Estateguru.CASH_FLOW_TYPES)
+        cash_flow_types['Investment(Auto Invest)'] = P2PParser.IGNORE
+        with patch.object(Estateguru, 'CASH_FLOW_TYPES', cash_flow_types):
+            self.assertNotEqual(self.get_cache().key, key)
+        self.assertEqual(self.get_cache().key, key)
+
+    def test_version_changed(self):
+        """Test that the cache is invalidated if the version changes."""
+        key = ParserCache(self.statement, ReadOptions()).key
+        with patch('easyp2p.p2p_cache.__version__', '99.0.0'):
+            self.assertNotEqual(
+                ParserCache(self.statement, ReadOptions()).key, key)
+
+    def test_corrupt_cache(self):
+        """Test that a corrupt cache file is ignored and replaced."""
+        for file_name in (self.cache_file, self.meta_file):
+            with open(file_name, 'wb') as file:
+                file.write(b'no cache')
+        cache = ParserCache(self.statement, ReadOptions())
+        self.assertIsNone(cache.load())
+        df, _ = self.parse()
+        self.assertFalse(df.empty)
+        self.assertIsNotNone(self.get_cache().load())
+
+    def test_round_trip(self):
+        """Test that the cache restores values, types and index."""
+        df = pd.DataFrame({
+            'Platform': ['Test', 'Test', 'Test'],
+            'Currency': ['EUR', 'EUR', ''],
+            'Date': [date(2020, 1, 1), date(2020, 1, 2), date(2020, 1, 3)],
+            'Float': [0.1 + 0.2, float('nan'), -1e-10],
+            'Int': [1, 2, 3],
+            'Bool': [True, False, True],
+        }).set_index(['Platform', 'Currency', 'Date'])
+        unknown_cf_type_dates = {'Unknown': [date(2020, 1, 2)]}
+        cf_type_dates = {'Float': [date(2020, 1, 1), date(2020, 1, 3)]}
+        cache = ParserCache(self.statement, ReadOptions())
+        cache.save(df, unknown_cf_type_dates, cf_type_dates)
+        df_cached, unknown_cached, cf_types_cached = cache.load()
+        pd.testing.assert_frame_equal(df_cached, df)
+        self.assertEqual(unknown_cached, unknown_cf_type_dates)
+        self.assertEqual(cf_types_cached, cf_type_dates)
+        with open(self.meta_file, encoding='utf-8') as file:
+            self.assertEqual(json.load(file)['types']['Date'], 'date')
+
+    def test_modified_cache(self):
+        """Test that a cache file which was changed afterwards is ignored."""
+        self.parse()
+        with open(self.cache_file, 'a', encoding='utf-8') as file:
+            file.write('Estateguru,EUR,2018-09-01,1,1,1,1,1,1,1\n')
+        self.assertIsNone(self.get_cache().load())
+
+    def test_unsupported_types(self):
+        """Test that frames with unsupported objects are not cached."""
+        df = pd.DataFrame({'Mixed': [1, 'a']})
+        cache = ParserCache(self.statement, ReadOptions())
+        cache.save(df, {}, {})
+        self.assertFalse(os.path.exists(self.meta_file))
+        self.assertIsNone(cache.load())
+
+
+class CachedPlatformTests(unittest.TestCase):
+
+    """Test that cached and uncached parse results are equal."""
+
+    def setUp(self) -> None:
+        """Create a temporary directory for the statements."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def test_all_platforms(self):
+        """Test the statements of all platforms for several date ranges."""
+        self.assertTrue(STATEMENTS)
+        for statement in STATEMENTS:
+            file_name = os.path.basename(statement)
+            platform = next(
+                platform for name, platform in PLATFORMS.items()
+                if f'_{name}_' in file_name)
+            stem = os.path.join(
+                self.temp_dir.name, os.path.splitext(file_name)[0])
+            shutil.copyfile(statement, f'{stem}.{platform.SUFFIX}')
+            for date_range in DATE_RANGES:
+                with self.subTest(statement=file_name, date_range=date_range):
+                    df, unknown_cf_types = platform(
+                        date_range, stem).parse_statement()
+                    for _ in range(2):
+                        df_cached, unknown_cached = platform(
+                            date_range, stem).parse_statement(use_cache=True)
+                        pd.testing.assert_frame_equal(df_cached, df)
+                        self.assertEqual(unknown_cached, unknown_cf_types)
+
+
+if __name__ == '__main__':
+    unittest.main()
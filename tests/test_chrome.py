@@ -4,9 +4,15 @@
 Module containing all tests for the P2PChrome class.
 """
 import logging
+import os
+import tempfile
 import unittest.mock
 
-from easyp2p.p2p_chrome import P2PChrome
+from selenium.common.exceptions import WebDriverException
+
+from easyp2p.p2p_chrome import (
+    BROWSER_MEMORY, ChromePool, get_browser_slots, get_chromedriver_path,
+    P2PChrome)
 from easyp2p.p2p_signals import PlatformFailedError
 
 
@@ -15,6 +21,14 @@ class P2PChromeTests(unittest.TestCase):
 
     def setUp(self) -> None:
         logging.disable(logging.CRITICAL)
+        # Make sure that a cached ChromeDriver of the user is not used
+        self.temp_dir = tempfile.TemporaryDirectory()
+        patcher = unittest.mock.patch(
+            'easyp2p.p2p_chrome.DRIVER_CACHE_FILE',
+            os.path.join(self.temp_dir.name, 'chromedriver.json'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
 
     @unittest.mock.patch('easyp2p.p2p_chrome.ChromeDriverManager.install')
     def test_no_chromedriver(self, mock_driver_install):
@@ -42,5 +56,218 @@ class P2PChromeTests(unittest.TestCase):
         driver.close()
 
 
+@unittest.mock.patch('easyp2p.p2p_chrome.P2PChrome')
+class ChromePoolTests(unittest.TestCase):
+    """Test reusing browsers with ChromePool."""
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        self.pool = ChromePool()
+
+    @staticmethod
+    def new_driver(download_directory, headless, _signals=None):
+        """Create a mocked P2PChrome instance."""
+        driver = unittest.mock.Mock(
+            download_directory=download_directory, headless=headless,
+            context_id=None)
+
+        def open_context(directory):
+            driver.context_id = 'context'
+            driver.download_directory = directory
+
+        driver.open_context.side_effect = open_context
+        driver.reuse.side_effect = open_context
+        return driver
+
+    def test_reuse(self, mock_chrome):
+        """Test that a released browser is reused with a new context."""
+        mock_chrome.side_effect = self.new_driver
+        driver = self.pool.acquire('dir1', True)
+        driver.open_context.assert_called_once_with('dir1')
+        self.pool.release(driver)
+        driver.close_context.assert_called_once()
+        driver.quit.assert_not_called()
+
+        self.assertIs(self.pool.acquire('dir2', True), driver)
+        self.assertEqual(mock_chrome.call_count, 1)
+        driver.reuse.assert_called_once_with('dir2')
+        self.assertEqual(driver.download_directory, 'dir2')
+
+    def test_headless_modes(self, mock_chrome):
+        """Test that browsers are only reused in the same headless mode."""
+        mock_chrome.side_effect = self.new_driver
+        self.pool.release(self.pool.acquire('dir', True))
+        driver = self.pool.acquire('dir', False)
+        self.assertFalse(driver.headless)
+        self.assertEqual(mock_chrome.call_count, 2)
+
+    def test_broken_browser(self, mock_chrome):
+        """Test that a browser is replaced if it cannot be reused."""
+        mock_chrome.side_effect = self.new_driver
+        driver = self.pool.acquire('dir', True)
+        self.pool.release(driver)
+        driver.reuse.side_effect = WebDriverException
+        self.assertIsNot(self.pool.acquire('dir', True), driver)
+        driver.quit.assert_called_once()
+
+    def test_context_not_disposed(self, mock_chrome):
+        """Test that a browser is quit if its context cannot be disposed."""
+        mock_chrome.side_effect = self.new_driver
+        driver = self.pool.acquire('dir', True)
+        driver.close_context.side_effect = WebDriverException
+        self.pool.release(driver)
+        driver.quit.assert_called_once()
+        self.assertIsNot(self.pool.acquire('dir', True), driver)
+
+    def test_no_context(self, mock_chrome):
+        """Test that browsers without own context are not reused."""
+        driver = self.new_driver('dir', True)
+        driver.open_context.side_effect = WebDriverException
+        mock_chrome.return_value = driver
+        self.assertIs(self.pool.acquire('dir', True), driver)
+        self.pool.release(driver)
+        driver.quit.assert_called_once()
+
+    def test_close(self, mock_chrome):
+        """Test that close quits all idle browsers."""
+        mock_chrome.side_effect = self.new_driver
+        drivers = [
+            self.pool.acquire('dir', True)
+            for _ in range(ChromePool.MAX_IDLE + 1)]
+        for driver in drivers:
+            self.pool.release(driver)
+        # Browsers exceeding MAX_IDLE are quit immediately
+        drivers[-1].quit.assert_called_once()
+        self.pool.close()
+        for driver in drivers:
+            driver.quit.assert_called_once()
+
+
+@unittest.mock.patch('easyp2p.p2p_chrome.ChromeDriverManager')
+@unittest.mock.patch('easyp2p.p2p_chrome._find_chrome')
+class DriverCacheTests(unittest.TestCase):
+    """Test caching the ChromeDriver resolution."""
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.temp_dir.name, 'chromedriver.json')
+        self.chrome = self.create_file('chrome', b'chrome 1')
+        self.driver = self.create_file('chromedriver', b'driver')
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def create_file(self, name: str, content: bytes) -> str:
+        """Create a file in the temporary directory."""
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def setup_manager(self, mock_manager, version: str = '80.0') -> None:
+        """Let the mocked ChromeDriverManager return version and driver."""
+        manager = mock_manager.return_value
+        manager.install.return_value = self.driver
+        manager.driver.get_browser_version_from_os.return_value = version
+
+    def test_cache_hit(self, mock_find_chrome, mock_manager):
+        """Test that the driver is resolved only once."""
+        mock_find_chrome.return_value = self.chrome
+        self.setup_manager(mock_manager)
+        self.assertEqual(get_chromedriver_path(self.cache_file), self.driver)
+        self.assertEqual(get_chromedriver_path(self.cache_file), self.driver)
+        mock_manager.assert_called_once()
+        mock_manager.return_value.install.assert_called_once()
+
+    def test_chrome_update(self, mock_find_chrome, mock_manager):
+        """Test that the driver is resolved again after a Chrome update."""
+        mock_find_chrome.return_value = self.chrome
+        self.setup_manager(mock_manager)
+        get_chromedriver_path(self.cache_file)
+        self.create_file('chrome', b'chrome 2 with a new size')
+        self.setup_manager(mock_manager, '81.0')
+        get_chromedriver_path(self.cache_file)
+        self.assertEqual(mock_manager.return_value.install.call_count, 2)
+
+    def test_chrome_reinstall(self, mock_find_chrome, mock_manager):
+        """Test that the driver is kept if the Chrome version is the same."""
+        mock_find_chrome.return_value = self.chrome
+        self.setup_manager(mock_manager)
+        get_chromedriver_path(self.cache_file)
+        self.create_file('chrome', b'chrome 1 reinstalled')
+        get_chromedriver_path(self.cache_file)
+        get_chromedriver_path(self.cache_file)
+        mock_manager.return_value.install.assert_called_once()
+        # The version is only checked once after the reinstallation
+        self.assertEqual(mock_manager.call_count, 2)
+
+    def test_driver_removed(self, mock_find_chrome, mock_manager):
+        """Test that the driver is resolved again if it was removed."""
+        mock_find_chrome.return_value = self.chrome
+        self.setup_manager(mock_manager)
+        get_chromedriver_path(self.cache_file)
+        os.remove(self.driver)
+        get_chromedriver_path(self.cache_file)
+        self.assertEqual(mock_manager.return_value.install.call_count, 2)
+
+    def test_chrome_not_found(self, mock_find_chrome, mock_manager):
+        """Test that the version is checked if Chrome cannot be found."""
+        mock_find_chrome.return_value = None
+        self.setup_manager(mock_manager)
+        get_chromedriver_path(self.cache_file)
+        get_chromedriver_path(self.cache_file)
+        mock_manager.return_value.install.assert_called_once()
+        self.assertEqual(mock_manager.call_count, 2)
+
+    def test_no_browser_version(self, mock_find_chrome, mock_manager):
+        """
+        Test that the driver is resolved again after a Chrome update if
+        webdriver-manager cannot determine the Chrome version.
+        """
+        mock_find_chrome.return_value = self.chrome
+        self.setup_manager(mock_manager)
+        del mock_manager.return_value.driver.get_browser_version_from_os
+        self.assertEqual(get_chromedriver_path(self.cache_file), self.driver)
+        self.assertEqual(get_chromedriver_path(self.cache_file), self.driver)
+        mock_manager.return_value.install.assert_called_once()
+        self.create_file('chrome', b'chrome 1 reinstalled')
+        self.assertEqual(get_chromedriver_path(self.cache_file), self.driver)
+        self.assertEqual(mock_manager.return_value.install.call_count, 2)
+
+
+@unittest.mock.patch('easyp2p.p2p_chrome.os.cpu_count', return_value=4)
+@unittest.mock.patch('easyp2p.p2p_chrome.get_available_memory')
+class BrowserSlotsTests(unittest.TestCase):
+    """Test the resource limits for parallel browsers."""
+
+    def test_max_browsers(self, mock_memory, _):
+        """Test that max_browsers is used if resources are sufficient."""
+        mock_memory.return_value = 10 * BROWSER_MEMORY
+        self.assertEqual(get_browser_slots(3), 3)
+
+    def test_cpu_limit(self, mock_memory, _):
+        """Test the CPU limits."""
+        mock_memory.return_value = 10 * BROWSER_MEMORY
+        self.assertEqual(get_browser_slots(8), 4)
+        self.assertEqual(get_browser_slots(8, cpu_limit=2), 2)
+
+    def test_memory_limit(self, mock_memory, _):
+        """Test the memory limits."""
+        mock_memory.return_value = 3 * BROWSER_MEMORY
+        self.assertEqual(get_browser_slots(4), 3)
+        self.assertEqual(
+            get_browser_slots(4, memory_limit=2 * BROWSER_MEMORY), 2)
+        mock_memory.return_value = None
+        self.assertEqual(get_browser_slots(4), 4)
+        self.assertEqual(
+            get_browser_slots(4, memory_limit=BROWSER_MEMORY), 1)
+
+    def test_at_least_one_slot(self, mock_memory, _):
+        """Test that one browser is always allowed."""
+        mock_memory.return_value = 0
+        self.assertEqual(get_browser_slots(4), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
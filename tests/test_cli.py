@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_cli."""
+
+from datetime import date
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from easyp2p.p2p_cli import create_parser, get_platforms, run
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+
+
+class CliTests(unittest.TestCase):
+
+    """Test the command line interface."""
+
+    def setUp(self) -> None:
+        """Create the parser and a temporary download directory."""
+        self.parser = create_parser()
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        """Remove the temporary download directory."""
+        self.temp_dir.cleanup()
+
+    def parse(self, *args):
+        """Parse the arguments of a run command."""
+        return self.parser.parse_args([
+            'run', '--from', '2020-01-01', '--to', '2020-03-31',
+            '--directory', self.temp_dir.name, *args])
+
+    def test_parse_args(self):
+        """Test parsing the arguments of the run command."""
+        args = self.parse('--platforms', 'Bondora', 'Iuvo,Twino')
+        self.assertEqual(args.command, 'run')
+        self.assertEqual(args.platforms, ['Bondora', 'Iuvo,Twino'])
+        self.assertEqual(args.start_date, date(2020, 1, 1))
+        self.assertEqual(args.end_date, date(2020, 3, 31))
+        self.assertFalse(args.reuse_statements)
+        self.assertFalse(args.debug)
+
+    def test_parse_invalid_date(self):
+        """Test that invalid dates are rejected."""
+        with patch('sys.stderr', io.StringIO()):
+            self.assertRaises(
+                SystemExit, self.parser.parse_args,
+                ['run', '--platforms', 'Bondora', '--from', '01.01.2020',
+                 '--to', '2020-03-31'])
+
+    def test_get_platforms(self):
+        """Test that space and comma separated platforms are accepted."""
+        self.assertEqual(
+            get_platforms(self.parser, ['Iuvo,Bondora', 'Twino', 'Iuvo']),
+            ['Bondora', 'Iuvo', 'Twino'])
+
+    def test_get_platforms_invalid(self):
+        """Test that unknown and captcha platforms are rejected."""
+        for platforms in (['Unknown'], ['base_platform'], ['Mintos']):
+            with self.subTest(platforms=platforms), \
+                    patch('sys.stderr', io.StringIO()):
+                self.assertRaises(
+                    SystemExit, get_platforms, self.parser, platforms)
+
+    @patch('easyp2p.p2p_worker.WorkerThread')
+    def test_run(self, mock_worker):
+        """Test that run evaluates the platforms with WorkerThread."""
+        args = self.parse('--platforms', 'Bondora', '--reuse-statements')
+        mock_worker.return_value.results_written = True
+        with patch('sys.stdout', io.StringIO()) as stdout:
+            self.assertEqual(run(args, ['Bondora', 'Iuvo']), 0)
+        self.assertIn('Results written to', stdout.getvalue())
+        settings = mock_worker.call_args[0][0]
+        self.assertEqual(
+            settings.date_range, (date(2020, 1, 1), date(2020, 3, 31)))
+        self.assertEqual(settings.platforms, {'Bondora', 'Iuvo'})
+        self.assertEqual(settings.directory, self.temp_dir.name)
+        self.assertEqual(settings.output_file, os.path.join(
+            self.temp_dir.name, 'P2P_Results_01012020-31032020.xlsx'))
+        self.assertTrue(settings.reuse_statements)
+        mock_worker.return_value.run.assert_called_once_with()
+
+    @patch('easyp2p.p2p_worker.WorkerThread')
+    def test_run_with_errors(self, mock_worker):
+        """Test that errors of the evaluation result in exit code 1."""
+        args = self.parse('--platforms', 'Bondora')
+
+        def report_error():
+            slot = worker.signals.add_progress_text.connect.call_args[0][0]
+            slot('Bondora: login failed!', True)
+
+        worker = mock_worker.return_value
+        worker.run.side_effect = report_error
+        worker.results_written = False
+        with patch('sys.stderr', io.StringIO()) as stderr, \
+                patch('sys.stdout', io.StringIO()):
+            self.assertEqual(run(args, ['Bondora']), 1)
+        self.assertEqual(stderr.getvalue(), 'Bondora: login failed!\n')
+
+    @patch('easyp2p.p2p_worker.WorkerThread')
+    def test_run_stale_output_file(self, mock_worker):
+        """
+        Test that an output file of an earlier run is not reported as
+        result if no results were written.
+        """
+        args = self.parse('--platforms', 'Bondora')
+        output_file = os.path.join(
+            self.temp_dir.name, 'P2P_Results_01012020-31032020.xlsx')
+        with open(output_file, 'w', encoding='utf-8') as file:
+            file.write('stale')
+
+        def report_no_results():
+            slot = worker.signals.add_progress_text.connect.call_args[0][0]
+            slot('No results available!', True)
+
+        worker = mock_worker.return_value
+        worker.run.side_effect = report_no_results
+        worker.results_written = False
+        with patch('sys.stderr', io.StringIO()), \
+                patch('sys.stdout', io.StringIO()) as stdout:
+            self.assertEqual(run(args, ['Bondora']), 1)
+        self.assertNotIn('Results written to', stdout.getvalue())
+
+    def test_main_headless(self):
+        """Test that python -m easyp2p reports errors without PyQt5."""
+        result = subprocess.run(
+            [sys.executable, '-m', 'easyp2p', 'run', '--platforms',
+             'Unknown', '--from', '2020-01-01', '--to', '2020-03-31'],
+            capture_output=True, text=True, cwd=ROOT_DIR, check=False)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn('unknown platform: Unknown', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
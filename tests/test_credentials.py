@@ -3,14 +3,20 @@
 
 """Module containing all tests for p2p_credentials."""
 
+import threading
+import time
+from typing import List
 import unittest.mock
 
-from keyring.errors import PasswordDeleteError
+from keyring.errors import NoKeyringError, PasswordDeleteError
 
 from easyp2p.p2p_credentials import (
-    keyring_exists, get_credentials_from_keyring, get_credentials_from_user,
+    credential_cache, CredentialCache, keyring_exists,
+    clear_preloaded_credentials,
+    get_all_credentials_from_keyring, get_credentials,
+    get_credentials_from_keyring, get_credentials_from_user,
     get_password_from_keyring, delete_platform_from_keyring,
-    save_platform_in_keyring)
+    preload_credentials, save_platform_in_keyring)
 
 
 @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
@@ -18,6 +24,10 @@ class CredentialsTests(unittest.TestCase):
 
     """Test p2p_credentials."""
 
+    def setUp(self) -> None:
+        """Do not return credentials cached by other tests."""
+        credential_cache.clear()
+
     def test_keyring_exists_with_keyring(self, mock_keyring):
         """Test keyring_exists when a keyring is available."""
         mock_keyring.get_keyring.return_value = True
@@ -86,7 +96,7 @@ class CredentialsTests(unittest.TestCase):
             side_effect=PasswordDeleteError)
         self.assertFalse(delete_platform_from_keyring('TestPlatform'))
 
-    @unittest.mock.patch('easyp2p.p2p_credentials.CredentialsWindow')
+    @unittest.mock.patch('easyp2p.ui.credentials_window.CredentialsWindow')
     def test_get_credentials_from_user_no_save_in_keyring(
             self, mock_cred_window, _):
         """Test getting credentials from the user without saving in keyring."""
@@ -98,7 +108,7 @@ class CredentialsTests(unittest.TestCase):
         self.assertEqual(username, 'TestUser')
         self.assertEqual(password, 'TestPass')
 
-    @unittest.mock.patch('easyp2p.p2p_credentials.CredentialsWindow')
+    @unittest.mock.patch('easyp2p.ui.credentials_window.CredentialsWindow')
     @unittest.mock.patch('easyp2p.p2p_credentials.save_platform_in_keyring')
     def test_get_credentials_from_user_save_in_keyring(
             self, mock_save_in_keyring, mock_cred_window, _):
@@ -113,7 +123,7 @@ class CredentialsTests(unittest.TestCase):
         mock_save_in_keyring.assert_called_once_with(
             'TestPlatform', 'TestUser', 'TestPass')
 
-    @unittest.mock.patch('easyp2p.p2p_credentials.CredentialsWindow')
+    @unittest.mock.patch('easyp2p.ui.credentials_window.CredentialsWindow')
     @unittest.mock.patch('easyp2p.p2p_credentials.save_platform_in_keyring')
     def test_get_credentials_from_user_save_in_keyring_fails(
             self, mock_save_in_keyring, mock_cred_window, _):
@@ -155,6 +165,233 @@ class CredentialsTests(unittest.TestCase):
         credentials = get_credentials_from_keyring('TestPlatform')
         self.assertEqual(credentials, None)
 
+    def test_get_credentials_from_keyring_error(self, mock_keyring):
+        """Test that keyring errors are treated like missing credentials."""
+        mock_keyring.get_keyring.return_value = True
+        mock_keyring.get_password.side_effect = NoKeyringError
+        self.assertIsNone(get_credentials_from_keyring('TestPlatform'))
+        self.assertIsNone(credential_cache.get('TestPlatform'))
+
+    def test_get_all_credentials_from_keyring(self, mock_keyring):
+        """Get the credentials of several platforms in one batch."""
+        passwords = {
+            ('Bondora', 'username'): 'User1', ('Bondora', 'User1'): 'Pass1',
+            ('Mintos', 'username'): None,
+            ('Twino', 'username'): 'User2', ('Twino', 'User2'): None}
+
+        def get_password(platform, username):
+            if platform == 'Iuvo':
+                raise NoKeyringError
+            return passwords[(platform, username)]
+
+        backend = mock_keyring.get_keyring.return_value
+        backend.get_password.side_effect = get_password
+        self.assertEqual(
+            get_all_credentials_from_keyring(
+                ['Bondora', 'Iuvo', 'Mintos', 'Twino']),
+            {'Bondora': ('User1', 'Pass1')})
+        mock_keyring.get_keyring.assert_called_once()
+        self.assertEqual(
+            credential_cache.get('Bondora'), ('User1', 'Pass1'))
+
+    def test_get_all_credentials_without_keyring(self, mock_keyring):
+        """Test the batch lookup if no keyring is available."""
+        mock_keyring.get_keyring.return_value = None
+        self.assertEqual(get_all_credentials_from_keyring(['Bondora']), {})
+
+    def test_get_credentials_preloaded(self, mock_keyring):
+        """Test that preloaded credentials are used without keyring."""
+        preload_credentials({'TestPlatform': ('TestUser', 'TestPass')})
+        try:
+            self.assertEqual(
+                get_credentials('TestPlatform', unittest.mock.Mock()),
+                ('TestUser', 'TestPass'))
+            mock_keyring.get_password.assert_not_called()
+        finally:
+            clear_preloaded_credentials()
+        mock_keyring.get_keyring.return_value = True
+        mock_keyring.get_password.side_effect = ['User', 'Pass']
+        self.assertEqual(
+            get_credentials('TestPlatform', unittest.mock.Mock()),
+            ('User', 'Pass'))
+
+    def test_get_credentials_preloaded_empty(self, _):
+        """Test that empty preloaded credentials fail the platform."""
+        preload_credentials({'TestPlatform': ('', '')})
+        try:
+            self.assertRaises(
+                RuntimeError, get_credentials, 'TestPlatform',
+                unittest.mock.Mock())
+        finally:
+            clear_preloaded_credentials()
+
+
+class CredentialCacheTests(unittest.TestCase):
+
+    """Test CredentialCache."""
+
+    def setUp(self) -> None:
+        """Do not return credentials cached by other tests."""
+        credential_cache.clear()
+
+    def track_passwords(self) -> List[bytearray]:
+        """
+        Record the password buffers which are created by CredentialCache.
+        """
+        passwords: List[bytearray] = []
+
+        def create(*args):
+            passwords.append(bytearray(*args))
+            return passwords[-1]
+
+        patcher = unittest.mock.patch(
+            'easyp2p.p2p_credentials.bytearray', side_effect=create,
+            create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return passwords
+
+    def test_get(self):
+        """Test getting cached credentials."""
+        cache = CredentialCache()
+        self.assertIsNone(cache.get('TestPlatform'))
+        cache.put('TestPlatform', 'TestUser', 'TestPäss')
+        self.assertEqual(cache.get('TestPlatform'), ('TestUser', 'TestPäss'))
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.time')
+    def test_expiry(self, mock_time):
+        """Test that expired credentials are removed and zeroed."""
+        passwords = self.track_passwords()
+        mock_time.monotonic.return_value = 100.
+        cache = CredentialCache(ttl=10)
+        cache.put('TestPlatform', 'TestUser', 'TestPass')
+        mock_time.monotonic.return_value = 109.
+        self.assertEqual(cache.get('TestPlatform'), ('TestUser', 'TestPass'))
+        mock_time.monotonic.return_value = 110.
+        self.assertIsNone(cache.get('TestPlatform'))
+        self.assertEqual(passwords, [bytearray(len('TestPass'))])
+
+    def test_invalidate_and_clear(self):
+        """Test that invalidated credentials are removed and zeroed."""
+        passwords = self.track_passwords()
+        cache = CredentialCache()
+        cache.put('Bondora', 'User1', 'Pass1')
+        cache.put('Mintos', 'User2', 'Pass2')
+        cache.invalidate('Bondora')
+        self.assertIsNone(cache.get('Bondora'))
+        self.assertEqual(cache.get('Mintos'), ('User2', 'Pass2'))
+        cache.clear()
+        self.assertIsNone(cache.get('Mintos'))
+        self.assertEqual(passwords, [bytearray(5), bytearray(5)])
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
+    def test_get_credentials_from_keyring_cached(self, mock_keyring):
+        """Test that repeated lookups only query the keyring once."""
+        mock_keyring.get_keyring.return_value = True
+        mock_keyring.get_password.side_effect = ['TestUser', 'TestPass']
+        for _ in range(3):
+            self.assertEqual(
+                get_credentials_from_keyring('TestPlatform'),
+                ('TestUser', 'TestPass'))
+        self.assertEqual(mock_keyring.get_password.call_count, 2)
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
+    def test_get_credentials_from_keyring_concurrent(self, mock_keyring):
+        """Test that concurrent lookups only query the keyring once."""
+        mock_keyring.get_keyring.return_value = True
+
+        def get_password(_, username):
+            time.sleep(0.05)
+            return 'TestUser' if username == 'username' else 'TestPass'
+
+        mock_keyring.get_password.side_effect = get_password
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_credentials_from_keyring('TestPlatform')))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [('TestUser', 'TestPass')] * 4)
+        self.assertEqual(mock_keyring.get_password.call_count, 2)
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
+    def test_save_platform_in_keyring_invalidates_cache(self, mock_keyring):
+        """Test that saving credentials removes them from the cache."""
+        credential_cache.put('TestPlatform', 'OldUser', 'OldPass')
+        save_platform_in_keyring('TestPlatform', 'TestUser', 'TestPass')
+        self.assertIsNone(credential_cache.get('TestPlatform'))
+        mock_keyring.get_keyring.return_value = True
+        mock_keyring.get_password.side_effect = ['TestUser', 'TestPass']
+        self.assertEqual(
+            get_credentials_from_keyring('TestPlatform'),
+            ('TestUser', 'TestPass'))
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
+    def test_save_platform_in_keyring_invalidates_after_write(
+            self, mock_keyring):
+        """
+        Test that the cache is invalidated after writing to the keyring and
+        that the platform lock is held during the write.
+        """
+        def set_password(platform, *_):
+            self.assertTrue(credential_cache.platform_lock(platform).locked())
+            credential_cache.put(platform, 'OldUser', 'OldPass')
+
+        mock_keyring.set_password.side_effect = set_password
+        self.assertTrue(
+            save_platform_in_keyring('TestPlatform', 'TestUser', 'TestPass'))
+        self.assertIsNone(credential_cache.get('TestPlatform'))
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
+    def test_delete_platform_from_keyring_invalidates_cache(
+            self, mock_keyring):
+        """Test that deleting credentials removes them from the cache."""
+        credential_cache.put('TestPlatform', 'TestUser', 'TestPass')
+        mock_keyring.get_password.return_value = 'TestUser'
+        self.assertTrue(delete_platform_from_keyring('TestPlatform'))
+        self.assertIsNone(credential_cache.get('TestPlatform'))
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
+    def test_get_all_credentials_from_cache(self, mock_keyring):
+        """Test that cached credentials are not looked up again."""
+        credential_cache.put('Bondora', 'User1', 'Pass1')
+        self.assertEqual(
+            get_all_credentials_from_keyring(['Bondora']),
+            {'Bondora': ('User1', 'Pass1')})
+        mock_keyring.get_keyring.assert_not_called()
+
+    @unittest.mock.patch('easyp2p.p2p_credentials.keyring')
+    def test_get_all_credentials_concurrent(self, mock_keyring):
+        """
+        Test that concurrent single and batch lookups only query the keyring
+        once.
+        """
+        def get_password(_, username):
+            time.sleep(0.05)
+            return 'TestUser' if username == 'username' else 'TestPass'
+
+        mock_keyring.get_password.side_effect = get_password
+        backend = mock_keyring.get_keyring.return_value
+        backend.get_password.side_effect = get_password
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_credentials_from_keyring('TestPlatform'))),
+            threading.Thread(target=lambda: results.append(
+                get_all_credentials_from_keyring(['TestPlatform'])[
+                    'TestPlatform']))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [('TestUser', 'TestPass')] * 2)
+        self.assertEqual(
+            mock_keyring.get_password.call_count
+            + backend.get_password.call_count, 2)
+
 
 if __name__ == "__main__":
     runner = unittest.TextTestRunner(verbosity=3)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for excel_reader."""
+
+from datetime import datetime, time
+import glob
+import os
+import tempfile
+import unittest
+import warnings
+
+import pandas as pd
+
+from easyp2p.excel_reader import read_xlsx, read_xlsx_streaming
+from easyp2p.p2p_parser import get_df_from_file, ReadOptions
+import easyp2p.platforms as p2p_platforms
+
+INPUT_DIR = os.path.join(os.path.dirname(__file__), 'input')
+
+
+class ReadXlsxStreamingTests(unittest.TestCase):
+
+    """
+    Test that the streaming engine reads xlsx files like pandas.read_excel
+    with the installed reader.
+    """
+
+    def setUp(self) -> None:
+        """Create a temporary directory for the test files."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def compare_with_pandas(self, input_file: str, **kwargs) -> None:
+        """Compare the streaming engine with pandas.read_excel."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            expected = pd.read_excel(input_file, **kwargs)
+        pd.testing.assert_frame_equal(
+            read_xlsx_streaming(input_file, **kwargs), expected)
+
+    def test_platform_statements(self):
+        """Test all xlsx statements with the platform reader settings."""
+        platforms = {
+            name.lower(): getattr(p2p_platforms, name)
+            for name in dir(p2p_platforms) if name[0].isupper()}
+        for input_file in glob.glob(os.path.join(INPUT_DIR, '*.xlsx')):
+            platform = platforms[os.path.basename(input_file).split('_')[2]]
+            with self.subTest(input_file=input_file):
+                self.compare_with_pandas(
+                    input_file, header=platform.HEADER,
+                    skipfooter=platform.SKIP_FOOTER,
+                    usecols=frozenset(platform.USE_COLUMNS).__contains__,
+                    dtype=platform.DTYPES)
+
+    def test_cell_types(self):
+        """Test dates, times, booleans, gaps and mixed columns."""
+        input_file = os.path.join(self.temp_dir.name, 'cell_types.xlsx')
+        df = pd.DataFrame({
+            'Date': [datetime(2020, 2, 1, 10, 30), None, datetime(1900, 1, 1)],
+            'Time': [time(12, 0), time(0, 0, 1), None],
+            'Flag': [True, False, None],
+            'Mixed': [1, 'a', 2.5],
+            'Float': [1.0, 2.5, None],
+        })
+        df.to_excel(input_file, index=False, startrow=2, startcol=1)
+        for header in (0, 2):
+            for skipfooter in (0, 1):
+                with self.subTest(header=header, skipfooter=skipfooter):
+                    self.compare_with_pandas(
+                        input_file, header=header, skipfooter=skipfooter)
+
+    def test_empty_worksheet(self):
+        """Test that an empty worksheet returns an empty DataFrame."""
+        input_file = os.path.join(self.temp_dir.name, 'empty.xlsx')
+        pd.DataFrame().to_excel(input_file, index=False)
+        self.assertTrue(read_xlsx_streaming(input_file).empty)
+
+    def test_invalid_file(self):
+        """Test that a file which is not an xlsx file raises ValueError."""
+        input_file = os.path.join(self.temp_dir.name, 'invalid.xlsx')
+        with open(input_file, 'w', encoding='utf-8') as file:
+            file.write('no xlsx')
+        self.assertRaises(ValueError, read_xlsx_streaming, input_file)
+        self.assertRaises(RuntimeError, get_df_from_file, input_file)
+
+    def test_read_xlsx_engines(self):
+        """Test selecting the engine in read_xlsx and get_df_from_file."""
+        input_file = os.path.join(self.temp_dir.name, 'engines.xlsx')
+        pd.DataFrame({'a': [1, 2]}).to_excel(input_file, index=False)
+        for engine in (None, 'pandas', 'streaming'):
+            with self.subTest(engine=engine):
+                self.assertEqual(
+                    list(read_xlsx(input_file, engine=engine)['a']), [1, 2])
+        self.assertRaises(KeyError, read_xlsx, input_file, engine='unknown')
+        self.assertRaises(
+            RuntimeError, get_df_from_file, input_file,
+            ReadOptions(xlsx_engine='unknown'))
+
+
+if __name__ == '__main__':
+    unittest.main()
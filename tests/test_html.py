@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_html."""
+
+from types import SimpleNamespace
+from typing import Callable, List
+import unittest
+from unittest.mock import patch
+
+from lxml import etree
+
+from easyp2p import p2p_html
+
+PAGE = '''<!DOCTYPE html>
+<html>
+<head>
+<script type="text/x-template" id="report-template">
+  <form><input type="hidden" name="_token" value="script-token"></form>
+</script>
+</head>
+<body>
+<form>
+  <input type="hidden" name="_token" value="tok&amp;en">
+  <input type="hidden" name="__RequestVerificationToken" value="rvt">
+  <input type="hidden" name="empty">
+</form>
+<report-component :initial_report='{"id": 5, "filename": null}'>
+</report-component>
+<a href="/portfolio/download/1">Old</a>
+<a>No link</a>
+<a href="/portfolio/download/2">New</a>
+</body>
+</html>
+'''
+
+
+def counting_parser(feeds: List[str]) -> Callable[..., SimpleNamespace]:
+    """
+    Create a replacement for etree.HTMLPullParser which records the fed
+    chunks.
+
+    Args:
+        feeds: List to which the fed chunks are appended.
+
+    Returns:
+        Function which creates parsers with the arguments of HTMLPullParser.
+
+    """
+    # Bind the class now since etree.HTMLPullParser will be patched
+    pull_parser = etree.HTMLPullParser
+
+    def create(*args, **kwargs) -> SimpleNamespace:
+        parser = pull_parser(*args, **kwargs)
+
+        def feed(data: str) -> None:
+            feeds.append(data)
+            parser.feed(data)
+
+        return SimpleNamespace(
+            feed=feed, read_events=parser.read_events, close=parser.close)
+
+    return create
+
+
+class HTMLBackendTests(unittest.TestCase):
+
+    """Test that all HTML backends extract the same values."""
+
+    def test_get_values_from_tag_by_name(self):
+        """Test extracting values of several tags."""
+        for backend in p2p_html.HTML_BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(
+                    p2p_html.get_values_from_tag_by_name(
+                        PAGE, 'input', ['__RequestVerificationToken', '_token'],
+                        'error', backend=backend),
+                    {'__RequestVerificationToken': 'rvt', '_token': 'tok&en'})
+
+    def test_get_value_from_tag(self):
+        """Test extracting an attribute of the first tag."""
+        for backend in p2p_html.HTML_BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(
+                    p2p_html.get_value_from_tag(
+                        PAGE, 'report-component', ':initial_report', 'error',
+                        backend=backend),
+                    '{"id": 5, "filename": null}')
+
+    def test_get_url_from_partial_link(self):
+        """Test that the last matching link is returned."""
+        for backend in p2p_html.HTML_BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(
+                    p2p_html.get_url_from_partial_link(
+                        PAGE, '/download/', 'error', backend=backend),
+                    '/portfolio/download/2')
+
+    def test_get_value_from_script(self):
+        """Test extracting a value from an HTML template in a script."""
+        for backend in p2p_html.HTML_BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(
+                    p2p_html.get_value_from_script(
+                        PAGE, {'id': 'report-template'}, 'input', '_token',
+                        'error', backend=backend),
+                    'script-token')
+
+    def test_get_value_from_script_by_class(self):
+        """Test that all backends match multi-valued class attributes."""
+        page = (
+            '<script class="template  report" type="text/x-template">'
+            '<input name="_token" value="class-token"></script>')
+        script_ids = [
+            ({'class': 'report'}, 'class-token'),
+            ({'class': 'template report'}, 'class-token'),
+            ({'class': 'report', 'type': 'text/x-template'}, 'class-token'),
+            ({'class': 'report template'}, None),
+            ({'class': 'rep'}, None),
+            ({'class': 'report', 'id': 'report'}, None),
+        ]
+        for backend in p2p_html.HTML_BACKENDS:
+            for script_id, value in script_ids:
+                with self.subTest(backend=backend, script_id=script_id):
+                    if value is None:
+                        self.assertRaises(
+                            RuntimeError, p2p_html.get_value_from_script,
+                            page, script_id, 'input', '_token', 'error',
+                            backend=backend)
+                    else:
+                        self.assertEqual(
+                            p2p_html.get_value_from_script(
+                                page, script_id, 'input', '_token', 'error',
+                                backend=backend),
+                            value)
+
+    def test_not_found(self):
+        """Test that missing values raise RuntimeError with error_msg."""
+        calls = [
+            lambda backend: p2p_html.get_values_from_tag_by_name(
+                PAGE, 'input', ['_token', 'unknown'], 'error',
+                backend=backend),
+            lambda backend: p2p_html.get_values_from_tag_by_name(
+                PAGE, 'input', ['empty'], 'error', backend=backend),
+            lambda backend: p2p_html.get_value_from_tag(
+                PAGE, 'table', 'value', 'error', backend=backend),
+            lambda backend: p2p_html.get_url_from_partial_link(
+                PAGE, '/statement/', 'error', backend=backend),
+            lambda backend: p2p_html.get_value_from_script(
+                PAGE, {'id': 'unknown'}, 'input', '_token', 'error',
+                backend=backend),
+            lambda backend: p2p_html.get_value_from_tag(
+                '', 'input', 'value', 'error', backend=backend),
+        ]
+        for backend in p2p_html.HTML_BACKENDS:
+            for call in calls:
+                with self.subTest(backend=backend):
+                    with self.assertRaisesRegex(RuntimeError, 'error'):
+                        call(backend)
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend raises RuntimeError."""
+        self.assertRaises(
+            RuntimeError, p2p_html.get_value_from_tag, PAGE, 'input',
+            'value', 'error', backend='regex')
+
+    @patch('easyp2p.p2p_html.FEED_SIZE', 100)
+    def test_lxml_stops_early(self):
+        """Test that the lxml backend stops parsing after the last match."""
+        feeds: List[str] = []
+        page = PAGE + '<p>filler</p>' * 10000
+        with patch(
+                'easyp2p.p2p_html.etree.HTMLPullParser',
+                counting_parser(feeds)):
+            self.assertEqual(
+                p2p_html.get_value_from_tag(
+                    page, 'input', 'value', 'error', backend='lxml'),
+                'tok&en')
+        self.assertTrue(feeds)
+        self.assertLess(sum(len(data) for data in feeds), len(PAGE) + 100)
+
+
+class TagProbeTests(unittest.TestCase):
+
+    """Test finding a tag in a page which is received in chunks."""
+
+    def test_stops_at_tag(self):
+        """Test that the probe needs no more chunks after the tag."""
+        probe = p2p_html.TagProbe('report-component', ':initial_report')
+        chunks = [PAGE[pos:pos + 50] for pos in range(0, len(PAGE), 50)]
+        # Number of chunks which were fed until the tag was found
+        count = next((
+            count for count, chunk in enumerate(chunks, 1)
+            if probe.feed(chunk)), len(chunks))
+        self.assertLess(count, len(chunks))
+        self.assertEqual(probe.value, '{"id": 5, "filename": null}')
+
+    def test_not_found(self):
+        """Test a page without the tag."""
+        probe = p2p_html.TagProbe('table', 'value')
+        self.assertFalse(probe.feed(PAGE.encode()))
+        self.assertFalse(probe.close())
+        self.assertIsNone(probe.value)
+
+    def test_empty_page(self):
+        """Test an empty response."""
+        self.assertFalse(p2p_html.TagProbe('table', 'value').close())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_http."""
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import tempfile
+import threading
+import unittest
+
+from easyp2p.p2p_http import (
+    create_session, get_connection_stats, get_content_length,
+    get_shared_adapter, get_validators, P2PHTTPAdapter,
+    reset_connection_stats, StatementWriter)
+from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_signals import PlatformFailedError
+
+STATUS_PAGE = (
+    b'<html><body><report-component :initial_report=\'{"id": 1}\'>'
+    b'</report-component>' + b'<p>filler</p>' * 10000 + b'</body></html>')
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+
+    """Request handler which keeps connections alive."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer every request with a short body."""
+        body = b'ok'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Do not log requests."""
+
+
+class StatusHandler(KeepAliveHandler):
+
+    """Request handler which serves a status page with an ETag."""
+
+    etag = True
+    # Requests which were answered with 200 and 304, respectively
+    full = 0
+    not_modified = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer with 304 if the ETag of the client matches."""
+        if self.etag and self.headers.get('If-None-Match') == '"v1"':
+            type(self).not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        type(self).full += 1
+        self.send_response(200)
+        if self.etag:
+            self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(STATUS_PAGE)))
+        self.end_headers()
+        self.wfile.write(STATUS_PAGE)
+
+
+class P2PHTTPTests(unittest.TestCase):
+
+    """Test the shared connection pools."""
+
+    def setUp(self) -> None:
+        """Start a local HTTP server."""
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.adapter = P2PHTTPAdapter()
+
+    def tearDown(self) -> None:
+        """Stop the HTTP server and close all connections."""
+        self.adapter.close_pools()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_connection_reuse(self):
+        """Test that sessions reuse the connections of other sessions."""
+        for _ in range(2):
+            sess = create_session(self.adapter)
+            for _ in range(3):
+                self.assertEqual(sess.get(self.url).text, 'ok')
+            sess.close()
+        self.assertEqual(
+            self.adapter.stats.as_dict(),
+            {'requests': 6, 'opened': 1, 'reused': 5})
+
+    def test_cookies_not_shared(self):
+        """Test that sessions with the same adapter have their own cookies."""
+        sess1 = create_session(self.adapter)
+        sess2 = create_session(self.adapter)
+        sess1.cookies.set('token', 'secret')
+        self.assertEqual(len(sess2.cookies), 0)
+
+    def test_concurrent_sessions(self):
+        """Test that concurrent sessions open at most one connection per
+        thread."""
+        def get(_):
+            return create_session(self.adapter).get(self.url).text
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(
+                list(executor.map(get, range(20))), ['ok'] * 20)
+        stats = self.adapter.stats.as_dict()
+        self.assertEqual(stats['requests'], 20)
+        self.assertLessEqual(stats['opened'], 4)
+
+    def test_session_download_statement(self):
+        """Test that P2PSession streams the statement to the file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            location = os.path.join(temp_dir, 'statement.csv')
+            with P2PSession('Test', self.url, None) as sess:
+                sess.download_statement(self.url, location, 'get')
+            with open(location) as file:
+                self.assertEqual(file.read(), 'ok')
+            self.assertEqual(os.listdir(temp_dir), ['statement.csv'])
+
+    def test_session_connection_error(self):
+        """Test that P2PSession converts connection errors."""
+        with P2PSession('Test', self.url, None) as sess:
+            self.server.shutdown()
+            self.server.server_close()
+            self.adapter.close_pools()
+            with self.assertRaises(PlatformFailedError):
+                sess.request(self.url + 'closed', 'get', 'Request failed!')
+
+    def test_get_validators(self):
+        """Test the conditional request headers."""
+        self.assertEqual(
+            get_validators({
+                'ETag': '"v1"',
+                'Last-Modified': 'Wed, 01 Jan 2020 00:00:00 GMT'}),
+            {'If-None-Match': '"v1"',
+             'If-Modified-Since': 'Wed, 01 Jan 2020 00:00:00 GMT'})
+        self.assertEqual(get_validators({}), {})
+
+    def test_shared_adapter(self):
+        """Test that create_session uses the shared adapter by default."""
+        sess = create_session()
+        self.assertIs(sess.get_adapter(self.url), get_shared_adapter())
+        self.assertIs(get_shared_adapter(), get_shared_adapter())
+
+    def test_reset_connection_stats(self):
+        """Test resetting the statistics of the shared adapter."""
+        get_connection_stats().add_request('localhost')
+        get_connection_stats().add_connection('localhost')
+        reset_connection_stats()
+        self.assertEqual(
+            get_connection_stats().as_dict(),
+            {'requests': 0, 'opened': 0, 'reused': 0})
+
+
+class ProbeTests(unittest.TestCase):
+
+    """Test P2PSession.probe_value_from_tag."""
+
+    def setUp(self) -> None:
+        """Start a local HTTP server which serves a status page."""
+        StatusHandler.etag = True
+        StatusHandler.full = StatusHandler.not_modified = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StatusHandler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        """Stop the HTTP server."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def probe(self, sess: P2PSession, tag: str = 'report-component') -> str:
+        """Probe the status page."""
+        return sess.probe_value_from_tag(
+            self.url, tag, ':initial_report', 'error')
+
+    def test_conditional_request(self):
+        """Test that unchanged pages are not downloaded again."""
+        with P2PSession('Test', self.url, None) as sess:
+            for _ in range(3):
+                self.assertEqual(self.probe(sess), '{"id": 1}')
+        self.assertEqual(StatusHandler.full, 1)
+        self.assertEqual(StatusHandler.not_modified, 2)
+
+    def test_no_validators(self):
+        """Test probing a page without ETag or Last-Modified header."""
+        StatusHandler.etag = False
+        with P2PSession('Test', self.url, None) as sess:
+            for _ in range(2):
+                self.assertEqual(self.probe(sess), '{"id": 1}')
+        self.assertEqual(StatusHandler.full, 2)
+
+    def test_tag_not_found(self):
+        """Test that a missing tag fails the platform."""
+        with P2PSession('Test', self.url, None) as sess:
+            self.assertRaises(PlatformFailedError, self.probe, sess, 'table')
+
+
+class StatementWriterTests(unittest.TestCase):
+
+    """Test writing downloaded statements in chunks."""
+
+    def setUp(self) -> None:
+        """Create a statement in a temporary directory."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.temp_dir.name, 'statement.xlsx')
+        with open(self.location, 'wb') as file:
+            file.write(b'old statement')
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def test_write_chunks(self):
+        """Test that the statement is replaced after the download."""
+        progress = []
+        with StatementWriter(
+                self.location, 1000,
+                lambda *args: progress.append(args)) as writer:
+            for _ in range(100):
+                writer.write(b'x' * 10)
+            # The old statement is kept until the download is complete
+            with open(self.location, 'rb') as file:
+                self.assertEqual(file.read(), b'old statement')
+        with open(self.location, 'rb') as file:
+            self.assertEqual(file.read(), b'x' * 1000)
+        self.assertEqual(progress[-1], (1000, 1000))
+        self.assertEqual(len(progress), 100)
+        self.assertEqual(os.listdir(self.temp_dir.name), ['statement.xlsx'])
+
+    def test_download_fails(self):
+        """Test that a failed download keeps the existing statement."""
+        with self.assertRaises(ConnectionError):
+            with StatementWriter(self.location) as writer:
+                writer.write(b'new')
+                raise ConnectionError
+        with open(self.location, 'rb') as file:
+            self.assertEqual(file.read(), b'old statement')
+        self.assertEqual(os.listdir(self.temp_dir.name), ['statement.xlsx'])
+
+    def test_get_content_length(self):
+        """Test reading the statement size from the response headers."""
+        self.assertEqual(get_content_length({'Content-Length': '10'}), 10)
+        self.assertIsNone(get_content_length({}))
+        self.assertIsNone(get_content_length({'Content-Length': 'x'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_parser."""
+
+from datetime import date
+import os
+import tempfile
+from typing import Tuple
+import unittest
+
+import pandas as pd
+
+from easyp2p.p2p_parser import (
+    concat_results, get_df_from_file, P2PParser, ReadOptions)
+
+
+class ConcatResultsTests(unittest.TestCase):
+
+    """Test concat_results."""
+
+    def test_concat_results_no_results(self):
+        """Test concat_results if there are no or only empty results."""
+        self.assertTrue(concat_results([]).empty)
+        self.assertTrue(
+            concat_results([pd.DataFrame(), pd.DataFrame()]).empty)
+
+    def test_concat_results_aligned_columns(self):
+        """Test that columns are aligned to P2PParser.TARGET_COLUMNS."""
+        df1 = pd.DataFrame({
+            P2PParser.TOTAL_INCOME: [1.],
+            P2PParser.INTEREST_PAYMENT: [1.]})
+        df2 = pd.DataFrame({
+            'Other': [2.],
+            P2PParser.START_BALANCE_NAME: [2.],
+            P2PParser.INTEREST_PAYMENT: [2.]})
+        df = concat_results(iter([df1, pd.DataFrame(), df2]))
+        self.assertEqual(
+            list(df.columns),
+            [P2PParser.START_BALANCE_NAME, P2PParser.INTEREST_PAYMENT,
+             P2PParser.TOTAL_INCOME, 'Other'])
+        self.assertEqual(list(df[P2PParser.INTEREST_PAYMENT]), [1., 2.])
+        self.assertTrue(pd.isna(df[P2PParser.TOTAL_INCOME].iloc[1]))
+
+    def test_concat_results_keeps_index(self):
+        """Test that the platform/currency/date index is kept."""
+        index = [P2PParser.PLATFORM, P2PParser.CURRENCY, P2PParser.DATE]
+        df1 = pd.DataFrame(
+            [('Bondora', 'EUR', '2020-01-01', 1.)],
+            columns=[*index, P2PParser.INTEREST_PAYMENT]).set_index(index)
+        df2 = pd.DataFrame(
+            [('Twino', 'EUR', '2020-01-01', 2.)],
+            columns=[*index, P2PParser.INTEREST_PAYMENT]).set_index(index)
+        df = concat_results([df1, df2])
+        self.assertEqual(list(df.index.names), index)
+        self.assertEqual(
+            list(df.index.get_level_values(P2PParser.PLATFORM)),
+            ['Bondora', 'Twino'])
+
+
+class GetDfFromFileTests(unittest.TestCase):
+
+    """Test get_df_from_file."""
+
+    def setUp(self) -> None:
+        """Create a temporary directory for the test statements."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def write_csv(self, content: str) -> str:
+        """Write content to a csv file and return its path."""
+        path = os.path.join(self.temp_dir.name, 'statement.csv')
+        with open(path, 'w', newline='') as file:
+            file.write(content)
+        return path
+
+    def compare_with_python_engine(
+            self, content: str, skipfooter: int, header: int = 0) -> None:
+        """Compare the result with pandas.read_csv's python engine."""
+        path = self.write_csv(content)
+        df = get_df_from_file(
+            path, ReadOptions(header=header, skipfooter=skipfooter))
+        expected = pd.read_csv(
+            path, header=header, skipfooter=skipfooter, engine='python')
+        pd.testing.assert_frame_equal(df, expected)
+
+    def test_skipfooter(self):
+        """Test that the footer lines are skipped like by the python engine."""
+        for content in (
+                'a,b\n1,2\n3,4\nTotal,6\n',
+                'a,b\n1,2\n3,4\nTotal,6',
+                'a,b\r\n1,2\r\n3,4\r\nTotal,6\r\n',
+                'a,b\r1,2\r3,4\rTotal,6\r',
+                'a,b\n1,2\n3,4\n\nTotal,6\n'):
+            for skipfooter in (1, 2):
+                with self.subTest(content=content, skipfooter=skipfooter):
+                    self.compare_with_python_engine(content, skipfooter)
+
+    def test_skipfooter_with_header(self):
+        """Test skipfooter if the header is not in the first row."""
+        self.compare_with_python_engine(
+            'Statement\na,b\n1,2\n3,4\nTotal,6\n', skipfooter=1, header=1)
+
+    def test_skipfooter_only_header_left(self):
+        """Test that the header is kept if the footer covers all data."""
+        path = self.write_csv('a,b\n1,2\n')
+        for skipfooter in (1, 2, 5):
+            with self.subTest(skipfooter=skipfooter):
+                df = get_df_from_file(path, ReadOptions(skipfooter=skipfooter))
+                self.assertTrue(df.empty)
+                self.assertEqual(list(df.columns), ['a', 'b'])
+
+    def test_dtype_and_date_columns(self):
+        """Test that dtypes and dates are applied while reading."""
+        path = self.write_csv(
+            'Date,Amount\n01/02/2020 10:00,1\n02/02/2020 11:00,2\nTotal,3\n')
+        df = get_df_from_file(path, ReadOptions(
+            skipfooter=1, dtype={'Amount': 'float64'},
+            date_columns=('Date', 'Missing'), date_format='%d/%m/%Y %H:%M'))
+        self.assertEqual(df['Amount'].dtype, 'float64')
+        self.assertEqual(
+            list(df['Date']),
+            [pd.Timestamp('2020-02-01 10:00'),
+             pd.Timestamp('2020-02-02 11:00')])
+
+    def test_usecols(self):
+        """Test that only usecols are read and missing ones are ignored."""
+        content = 'a,b,c\n1,2,3\nTotal,5,6\n'
+        for skipfooter in (0, 1):
+            with self.subTest(skipfooter=skipfooter):
+                df = get_df_from_file(
+                    self.write_csv(content), ReadOptions(
+                        skipfooter=skipfooter, usecols=('c', 'a', 'missing')))
+                self.assertEqual(list(df.columns), ['a', 'c'])
+
+    def test_usecols_xlsx_and_json(self):
+        """Test usecols, dtype and date_columns for xlsx and json files."""
+        df = pd.DataFrame({
+            'Date': ['01.02.2020', '02.02.2020'], 'Amount': [1, 2],
+            'Other': ['x', 'y']})
+        xlsx_file = os.path.join(self.temp_dir.name, 'statement.xlsx')
+        json_file = os.path.join(self.temp_dir.name, 'statement.json')
+        df.to_excel(xlsx_file, index=False)
+        df.to_json(json_file)
+        for input_file in (xlsx_file, json_file):
+            with self.subTest(input_file=input_file):
+                result = get_df_from_file(input_file, ReadOptions(
+                    usecols=('Date', 'Amount'), dtype={'Amount': 'float64'},
+                    date_columns=('Date',), date_format='%d.%m.%Y'))
+                self.assertEqual(list(result.columns), ['Date', 'Amount'])
+                self.assertEqual(result['Amount'].dtype, 'float64')
+                self.assertEqual(
+                    list(result['Date']),
+                    [pd.Timestamp('2020-02-01'), pd.Timestamp('2020-02-02')])
+
+    def test_invalid_dtype(self):
+        """Test that values which do not match dtype raise RuntimeError."""
+        path = self.write_csv('a,b\n1,x\nTotal,6\n')
+        self.assertRaises(
+            RuntimeError, get_df_from_file, path,
+            ReadOptions(skipfooter=1, dtype={'b': 'float64'}))
+
+
+class AggregateResultsTests(unittest.TestCase):
+
+    """Test aggregation of cash flows and balances in P2PParser."""
+
+    CASH_FLOW_TYPES = {
+        'Deposit': P2PParser.IN_OUT_PAYMENT,
+        'Interest': P2PParser.INTEREST_PAYMENT,
+    }
+
+    def setUp(self) -> None:
+        """Create a temporary directory for the test statements."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def parse(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Write df to a statement file, parse it and return the result."""
+        return self.parse_with_unknown_cf_types(df)[0]
+
+    def parse_with_unknown_cf_types(
+            self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Tuple[str, ...]]:
+        """Write df to a statement file and parse it."""
+        statement = os.path.join(self.temp_dir.name, 'statement.csv')
+        df.to_csv(statement, index=False)
+        parser = P2PParser(
+            'Test', (date(2020, 1, 1), date(2020, 1, 31)), statement)
+        unknown_cf_types = parser.parse(
+            '%Y-%m-%d', {'Date': P2PParser.DATE, 'Cur': P2PParser.CURRENCY},
+            self.CASH_FLOW_TYPES, 'Type', 'Amount', 'Balance')
+        return parser.df, unknown_cf_types
+
+    def test_multiple_currencies(self):
+        """Test start and end balances if a day has several currencies."""
+        df = self.parse(pd.DataFrame(
+            [('2020-01-02', 'EUR', 'Deposit', 100., 100.),
+             ('2020-01-02', 'EUR', 'Interest', 1., 101.),
+             ('2020-01-02', 'USD', 'Deposit', 50., 50.),
+             ('2020-01-02', 'USD', 'Interest', 2., 52.),
+             ('2020-01-03', 'EUR', 'Interest', 3., 104.)],
+            columns=['Date', 'Cur', 'Type', 'Amount', 'Balance']))
+        df = df.reset_index().set_index([P2PParser.CURRENCY, P2PParser.DATE])
+        expected = {
+            ('EUR', date(2020, 1, 2)): (0., 101., 100., 1.),
+            ('USD', date(2020, 1, 2)): (0., 52., 50., 2.),
+            ('EUR', date(2020, 1, 3)): (101., 104., 0., 3.),
+        }
+        for index, values in expected.items():
+            self.assertEqual(
+                tuple(df.loc[index, [
+                    P2PParser.START_BALANCE_NAME, P2PParser.END_BALANCE_NAME,
+                    P2PParser.IN_OUT_PAYMENT, P2PParser.INTEREST_PAYMENT]]),
+                values)
+        self.assertEqual(len(df), 3)
+
+    def test_day_with_only_unknown_cash_flows(self):
+        """Test that days without known cash flows do not shift balances."""
+        df = self.parse(pd.DataFrame(
+            [('2020-01-02', 'EUR', 'Deposit', 100., 100.),
+             ('2020-01-03', 'EUR', 'Unknown', -50., 50.),
+             ('2020-01-04', 'EUR', 'Interest', 1., 51.)],
+            columns=['Date', 'Cur', 'Type', 'Amount', 'Balance']))
+        df = df.reset_index().set_index(P2PParser.DATE)
+        self.assertEqual(list(df.index), [date(2020, 1, 2), date(2020, 1, 4)])
+        self.assertEqual(
+            list(df[P2PParser.START_BALANCE_NAME]), [0., 50.])
+        self.assertEqual(list(df[P2PParser.END_BALANCE_NAME]), [100., 51.])
+
+    def test_cash_flow_types_with_whitespace(self):
+        """Test mapping of cash flow types which differ only by whitespace."""
+        df, unknown_cf_types = self.parse_with_unknown_cf_types(pd.DataFrame(
+            [('2020-01-02', 'EUR', ' Deposit', 100., 100.),
+             ('2020-01-02', 'EUR', 'Deposit ', 10., 110.),
+             ('2020-01-02', 'EUR', 'Unknown ', 5., 115.),
+             ('2020-01-02', 'EUR', ' Unknown', 5., 120.),
+             ('2020-01-02', 'EUR', 'Interest', 1., 121.)],
+            columns=['Date', 'Cur', 'Type', 'Amount', 'Balance']))
+        self.assertEqual(unknown_cf_types, ('Unknown',))
+        self.assertEqual(list(df[P2PParser.IN_OUT_PAYMENT]), [110.])
+        self.assertEqual(list(df[P2PParser.INTEREST_PAYMENT]), [1.])
+        self.assertEqual(list(df[P2PParser.END_BALANCE_NAME]), [121.])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -16,7 +16,7 @@ from selenium.common.exceptions import WebDriverException
 from easyp2p.excel_writer import (
     write_results, DAILY_RESULTS, MONTHLY_RESULTS, TOTAL_RESULTS)
 from easyp2p.p2p_credentials import get_credentials_from_keyring
-from easyp2p.p2p_parser import get_df_from_file, P2PParser
+from easyp2p.p2p_parser import get_df_from_file, P2PParser, ReadOptions
 import easyp2p.platforms as p2p_platforms
 from easyp2p.p2p_signals import PlatformFailedError
 
@@ -459,8 +459,8 @@ def are_files_equal(
 
     """
     try:
-        df1 = get_df_from_file(file1, header=header)
-        df2 = get_df_from_file(file2, header=header)
+        df1 = get_df_from_file(file1, ReadOptions(header=header))
+        df2 = get_df_from_file(file2, ReadOptions(header=header))
     except RuntimeError as err:
         print('File not found: ', err)
         return False
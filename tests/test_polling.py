@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_polling."""
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from easyp2p.p2p_polling import Backoff, GenerationTimes, parse_retry_after
+from easyp2p.p2p_session import P2PSession
+from easyp2p.p2p_signals import PlatformFailedError
+
+
+class BackoffTests(unittest.TestCase):
+
+    """Test the polling delays."""
+
+    def test_delays(self):
+        """Test that the delays grow exponentially up to max_delay."""
+        backoff = Backoff(initial_delay=1, factor=2, max_delay=8, jitter=0.5)
+        delays = backoff.delays()
+        for maximum in (1, 2, 4, 8, 8, 8):
+            delay = next(delays)
+            self.assertGreaterEqual(delay, maximum / 2)
+            self.assertLessEqual(delay, maximum)
+
+    def test_no_jitter(self):
+        """Test the delays without jitter."""
+        delays = Backoff(initial_delay=2, factor=3, jitter=0).delays()
+        self.assertEqual([next(delays) for _ in range(4)], [2, 6, 15, 15])
+
+
+class ParseRetryAfterTests(unittest.TestCase):
+
+    """Test parsing Retry-After headers."""
+
+    def test_seconds(self):
+        """Test a delay in seconds."""
+        self.assertEqual(parse_retry_after({'Retry-After': '5'}), 5.)
+
+    def test_http_date(self):
+        """Test a delay given as HTTP date."""
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+        delay = parse_retry_after(
+            {'Retry-After': format_datetime(retry_at, usegmt=True)})
+        self.assertGreater(delay, 25)
+        self.assertLessEqual(delay, 30)
+
+    def test_invalid(self):
+        """Test missing and invalid headers."""
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after({}))
+        self.assertIsNone(parse_retry_after({'Retry-After': 'soon'}))
+
+
+class GenerationTimesTests(unittest.TestCase):
+
+    """Test recording the statement generation times."""
+
+    def setUp(self) -> None:
+        """Create a temporary directory for the JSON file."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, 'times.json')
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def test_summary(self):
+        """Test that only successful generations are summarized."""
+        times = GenerationTimes()
+        for seconds in (10, 20, 60):
+            times.record('Twino', seconds, True)
+        times.record('Twino', 120, False)
+        times.record('Robocash', 120, False)
+        self.assertEqual(
+            times.summary(),
+            {'Twino': {'count': 3, 'median': 20, 'max': 60}})
+
+    @patch.object(GenerationTimes, 'MAX_RECORDS', 3)
+    def test_save(self):
+        """Test appending the generation times to the JSON file."""
+        times = GenerationTimes()
+        for seconds in range(2):
+            times.record('Twino', seconds, True)
+        times.record('Robocash', 5, True)
+        times.save(self.file_name, {'Twino'})
+        for seconds in range(2, 4):
+            times.record('Twino', seconds, True)
+        times.save(self.file_name)
+
+        with open(self.file_name, encoding='utf-8') as file:
+            saved = json.load(file)
+        self.assertEqual(
+            [record['seconds'] for record in saved['Twino']], [1, 2, 3])
+        self.assertEqual(len(saved['Robocash']), 1)
+        self.assertEqual(times.summary(), {})
+
+    def test_save_unexpected_json(self):
+        """Test that valid JSON of unexpected types is replaced."""
+        for content in ([1, 2], {'Twino': 'invalid'}):
+            with self.subTest(content=content):
+                with open(self.file_name, 'w', encoding='utf-8') as file:
+                    json.dump(content, file)
+                times = GenerationTimes()
+                times.record('Twino', 10, True)
+                times.save(self.file_name)
+                with open(self.file_name, encoding='utf-8') as file:
+                    saved = json.load(file)
+                self.assertEqual(
+                    [record['seconds'] for record in saved['Twino']], [10])
+
+
+class WaitTests(unittest.TestCase):
+
+    """Test P2PSession.wait."""
+
+    def setUp(self) -> None:
+        """Create a P2PSession."""
+        self.sess = P2PSession('Test', 'https://example.com', None)
+
+    @patch('easyp2p.p2p_session.time.sleep')
+    def test_retry_after(self, mock_sleep):
+        """Test that a Retry-After header overrides the backoff delay."""
+        results = iter([False, False, True])
+
+        def ready():
+            self.sess.last_response = Mock(headers={'Retry-After': '7'})
+            return next(results)
+
+        self.sess.wait(ready, backoff=Backoff(jitter=0))
+        self.assertEqual(
+            [call.args[0] for call in mock_sleep.call_args_list], [7, 7])
+
+    @patch('easyp2p.p2p_session.time.sleep')
+    @patch('easyp2p.p2p_session.time.monotonic')
+    def test_deadline(self, mock_monotonic, mock_sleep):
+        """Test that polling stops at the deadline."""
+        clock = [0.]
+        mock_monotonic.side_effect = lambda: clock[0]
+        mock_sleep.side_effect = lambda delay: clock.__setitem__(
+            0, clock[0] + delay)
+        ready = Mock(return_value=False)
+
+        self.assertRaises(
+            PlatformFailedError, self.sess.wait, ready, 20,
+            Backoff(jitter=0))
+        # Delays 1, 2, 4, 8 and the remaining 5 seconds until the deadline
+        self.assertEqual(
+            [call.args[0] for call in mock_sleep.call_args_list],
+            [1, 2, 4, 8, 5])
+        self.assertEqual(ready.call_count, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -47,16 +47,32 @@ class ProgressWindowTests(unittest.TestCase):
 
     def test_progress_bar(self):
         """Test updating progress_bar to maximum value."""
-        for progress in range(2 * 7 + 1):
+        for progress in range(2 * 7):
             self.form.worker.signals.update_progress_bar.emit()
             self.assertEqual(self.form.progress_bar.value(), progress + 1)
-        # 11 is the maximum value for two platforms so the ok button must be
-        # enabled
-        self.assertTrue(
+        # Further stages must not reach the maximum of 15 for two platforms
+        # before the worker is done
+        self.form.worker.signals.update_progress_bar.emit()
+        self.assertEqual(self.form.progress_bar.value(), 14)
+        self.assertFalse(
             self.form.button_box.button(QDialogButtonBox.Ok).isEnabled())
-        # Further increasing the progress_bar should not work
+        self.form.worker.done = True
         self.form.worker.signals.update_progress_bar.emit()
         self.assertEqual(self.form.progress_bar.value(), 15)
+        self.assertTrue(
+            self.form.button_box.button(QDialogButtonBox.Ok).isEnabled())
+
+    def test_add_progress_steps(self):
+        """Test that statement parts increase the maximum."""
+        self.form.worker.signals.add_progress_steps.emit(12)
+        self.assertEqual(self.form.progress_bar.maximum(), 2 * 7 + 1 + 12)
+
+    def test_download_progress(self):
+        """Test showing the download progress in the progress bar text."""
+        self.form.worker.signals.download_progress.emit('Twino', 50, 200)
+        self.assertEqual(self.form.progress_bar.format(), '%p% (Twino: 25%)')
+        self.form.worker.signals.download_progress.emit('Twino', 200, 200)
+        self.assertEqual(self.form.progress_bar.format(), '%p%')
 
     def test_push_button_abort(self):
         """Test that the worker thread is aborted if user clicks cancel."""
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#  Copyright (c) 2018-2020 Niko Sandschneider
+
+"""Module containing tests for p2p_qt."""
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from easyp2p import p2p_qt
+from easyp2p.p2p_qt import HeadlessObject, HeadlessSignal, HeadlessThread
+
+
+class Sender(HeadlessObject):  # pylint: disable=too-few-public-methods
+
+    """Class with headless signals for the tests."""
+
+    text = HeadlessSignal(str, bool)
+    forward = HeadlessSignal(str, bool)
+
+
+class HeadlessSignalTests(unittest.TestCase):
+
+    """Test the pure Python replacements for Qt signals."""
+
+    def test_emit(self):
+        """Test that emitting calls all connected slots."""
+        sender = Sender()
+        slots = [Mock(), Mock()]
+        for slot in slots:
+            sender.text.connect(slot)
+        sender.text.emit('Test', True)
+        for slot in slots:
+            slot.assert_called_once_with('Test', True)
+
+    def test_connect_signal(self):
+        """Test that a signal can be connected to another signal."""
+        sender, receiver = Sender(), Sender()
+        slot = Mock()
+        receiver.forward.connect(slot)
+        sender.text.connect(receiver.forward)
+        sender.text.emit('Test', False)
+        slot.assert_called_once_with('Test', False)
+
+    def test_instances(self):
+        """Test that every instance has its own signals."""
+        sender1, sender2 = Sender(), Sender()
+        slot = Mock()
+        sender1.text.connect(slot)
+        sender2.text.emit('Test', False)
+        slot.assert_not_called()
+        self.assertIs(sender1.text, sender1.text)
+
+    def test_disconnect(self):
+        """Test that disconnect removes all slots."""
+        sender = Sender()
+        slot = Mock()
+        sender.text.connect(slot)
+        sender.text.disconnect()
+        sender.text.emit('Test', False)
+        slot.assert_not_called()
+        self.assertRaises(TypeError, sender.text.disconnect)
+
+
+class HeadlessThreadTests(unittest.TestCase):
+
+    """Test the pure Python replacement for QThread."""
+
+    def test_start(self):
+        """Test that start calls run in another thread."""
+        thread = HeadlessThread()
+        thread.run = Mock()
+        self.assertFalse(thread.isRunning())
+        thread.start()
+        self.assertTrue(thread.wait())
+        thread.run.assert_called_once_with()
+        self.assertFalse(thread.isRunning())
+
+
+class HeadlessModeTests(unittest.TestCase):
+
+    """Test switching to headless mode."""
+
+    def test_translate_headless(self):
+        """Test that texts are not translated in headless mode."""
+        with patch.object(p2p_qt, '_HEADLESS', True):
+            self.assertEqual(p2p_qt.translate('Test', 'Text'), 'Text')
+
+    def test_use_headless_too_late(self):
+        """Test that the mode cannot change after the Qt classes are used."""
+        self.assertIsNotNone(p2p_qt.QObject)
+        self.assertRaises(RuntimeError, p2p_qt.use_headless)
+        self.assertFalse(p2p_qt.is_headless())
+
+    def test_unknown_attribute(self):
+        """Test that unknown attributes raise an AttributeError."""
+        self.assertFalse(hasattr(p2p_qt, 'QWidget'))
+
+    def test_no_pyqt_import(self):
+        """Test that the evaluation does not import PyQt5 in headless mode."""
+        code = (
+            'import sys\n'
+            'from easyp2p import p2p_qt\n'
+            'p2p_qt.use_headless()\n'
+            'import easyp2p.p2p_worker, easyp2p.platforms\n'
+            'sys.exit(any(m.startswith("PyQt5") for m in sys.modules))\n')
+        result = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(__file__)), check=False)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,12 +12,17 @@ difficult to test individually. They are tested in test_download instead.
 import logging
 import os
 import shutil
+import tempfile
+import threading
+import time
 import unittest.mock
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 
 from easyp2p.p2p_chrome import P2PChrome
+from easyp2p.p2p_download_watcher import DownloadWatcher
+from easyp2p.p2p_signals import PlatformFailedError
 from easyp2p.p2p_webdriver import P2PWebDriver
 
 
@@ -90,5 +95,155 @@ class DownloadFinishedTests(unittest.TestCase):
         self.assertFalse(os.path.isfile(self.statement))
 
 
+class DownloadProgressTests(unittest.TestCase):
+
+    """Test the progress based timeouts of download_finished."""
+
+    def setUp(self) -> None:
+        """Create a temporary download directory and a mocked driver."""
+        logging.disable(logging.CRITICAL)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.download_dir = os.path.join(self.temp_dir.name, 'download')
+        os.makedirs(self.download_dir)
+        self.statement = os.path.join(self.temp_dir.name, 'statement.xlsx')
+        self.crdownload = os.path.join(self.download_dir, 'test.crdownload')
+        self.platform = P2PWebDriver(
+            'Test', False, EC.element_to_be_clickable((By.XPATH, 'xxx')),
+            logout_url='xxx')
+        self.platform.driver = unittest.mock.Mock(
+            download_directory=self.download_dir)
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def run_download(self, chunks: int, delay: float) -> threading.Thread:
+        """
+        Simulate a Chrome download in a separate thread.
+
+        Args:
+            chunks: Number of chunks which are written to the download.
+            delay: Delay in seconds between two chunks.
+
+        Returns:
+            The started thread.
+
+        """
+        def download():
+            with open(self.crdownload, 'wb') as file:
+                for _ in range(chunks):
+                    time.sleep(delay)
+                    file.write(b'x' * 1024)
+                    file.flush()
+            os.replace(
+                self.crdownload, os.path.join(self.download_dir, 'test.xlsx'))
+
+        thread = threading.Thread(target=download)
+        thread.start()
+        return thread
+
+    def test_slow_download(self):
+        """Test that a download which makes progress does not time out."""
+        thread = self.run_download(chunks=6, delay=0.3)
+        self.assertTrue(self.platform.download_finished(
+            self.statement, start_timeout=1, stall_timeout=1))
+        thread.join()
+        self.assertEqual(os.path.getsize(self.statement), 6 * 1024)
+
+    def test_stalled_download(self):
+        """Test that a download without progress times out."""
+        with open(self.crdownload, 'w'):
+            pass
+        start = time.monotonic()
+        self.assertFalse(self.platform.download_finished(
+            self.statement, start_timeout=0.1, stall_timeout=0.5))
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertFalse(os.path.isfile(self.statement))
+
+    def test_finished_download_is_detected_immediately(self):
+        """Test that the statement is moved as soon as Chrome is done."""
+        thread = self.run_download(chunks=1, delay=0.2)
+        start = time.monotonic()
+        self.assertTrue(self.platform.download_finished(self.statement))
+        thread.join()
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertTrue(os.path.isfile(self.statement))
+
+
+class DownloadWatcherTests(unittest.TestCase):
+
+    """Test the DownloadWatcher class."""
+
+    def test_wait_returns_on_change(self):
+        """Test that wait returns when a file is created."""
+        with tempfile.TemporaryDirectory() as directory:
+            with DownloadWatcher(directory) as watcher:
+                timer = threading.Timer(0.1, lambda: open(
+                    os.path.join(directory, 'test.xlsx'), 'w').close())
+                timer.start()
+                start = time.monotonic()
+                watcher.wait(5)
+                timer.join()
+                self.assertLess(time.monotonic() - start, 1)
+
+    def test_wait_timeout(self):
+        """Test that wait returns after the timeout without changes."""
+        with tempfile.TemporaryDirectory() as directory:
+            with DownloadWatcher(directory) as watcher:
+                start = time.monotonic()
+                watcher.wait(0.2)
+                self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    @unittest.mock.patch('easyp2p.p2p_download_watcher._LIBC', None)
+    def test_polling_fallback(self):
+        """Test that the directory is polled if inotify is not available."""
+        with tempfile.TemporaryDirectory() as directory:
+            with DownloadWatcher(directory) as watcher:
+                self.assertFalse(watcher.event_driven)
+                start = time.monotonic()
+                watcher.wait(5)
+                self.assertLess(time.monotonic() - start, 0.5)
+
+
+class ContextManagerTests(unittest.TestCase):
+
+    """Test entering the P2PWebDriver context manager."""
+
+    # pylint: disable=protected-access
+
+    def setUp(self) -> None:
+        """Create a P2PWebDriver instance."""
+        logging.disable(logging.CRITICAL)
+        self.platform = P2PWebDriver(
+            'Test', True, EC.element_to_be_clickable((By.XPATH, 'xxx')),
+            logout_url='xxx')
+
+    @unittest.mock.patch.object(P2PWebDriver.signals, 'disconnect_signals')
+    @unittest.mock.patch('easyp2p.p2p_webdriver.chrome_pool.acquire')
+    def test_acquire_fails(self, mock_acquire, mock_disconnect):
+        """Test that a failing acquire does not leave the instance active."""
+        mock_acquire.side_effect = RuntimeError('Chrome failed')
+        with self.assertRaises(PlatformFailedError):
+            with self.platform:
+                pass
+        self.assertEqual(P2PWebDriver._active, 0)
+        mock_disconnect.assert_called_once_with()
+
+    @unittest.mock.patch.object(P2PWebDriver.signals, 'disconnect_signals')
+    @unittest.mock.patch('easyp2p.p2p_webdriver.chrome_pool.acquire')
+    def test_acquire_fails_other_active(self, mock_acquire, mock_disconnect):
+        """
+        Test that a failing acquire keeps the signals of other active
+        instances connected.
+        """
+        mock_acquire.side_effect = OSError('No Chrome')
+        with unittest.mock.patch.object(P2PWebDriver, '_active', 1):
+            with self.assertRaises(OSError):
+                with self.platform:
+                    pass
+            self.assertEqual(P2PWebDriver._active, 1)
+        mock_disconnect.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
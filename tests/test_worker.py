@@ -3,18 +3,27 @@
 
 """Module containing all tests for p2p_worker."""
 
-from datetime import date
+import asyncio
+from datetime import date, datetime, timedelta
 import logging
 import os
+import shutil
+import tempfile
+import threading
+from typing import Optional, Tuple
 import unittest
 from unittest.mock import patch
 
 import pandas as pd
+import requests
 
+from easyp2p.p2p_http import ASYNC_AVAILABLE
 from easyp2p.p2p_settings import Settings
 from easyp2p.p2p_signals import PlatformFailedError
-from easyp2p.p2p_worker import WorkerThread
+from easyp2p.p2p_worker import DOWNLOAD_STEPS, WorkerThread
 import easyp2p.platforms
+from easyp2p.platforms.base_platform import split_date_range
+from tests import INPUT_PREFIX
 
 
 class WorkerTests(unittest.TestCase):
@@ -29,8 +38,16 @@ class WorkerTests(unittest.TestCase):
             os.path.join(os.getcwd(), 'test.xlsx'))
         self.settings.platforms = {
             pl for pl in dir(easyp2p.platforms) if pl[0].isupper()}
+        # The preflight would ask the user for credentials, it is tested
+        # separately
+        self.settings.preflight_credentials = False
         self.worker = WorkerThread(self.settings)
         self.worker.signals.abort = False
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        self.temp_dir.cleanup()
 
     def test_get_platform_instance(self):
         """Test get_platform_instance for all supported platforms."""
@@ -44,6 +61,32 @@ class WorkerTests(unittest.TestCase):
             PlatformFailedError, self.worker.get_platform_instance,
             'TestPlatform')
 
+    def test_get_platform_instance_max_wait_time(self):
+        """Test that max_wait_times of the settings override MAX_WAIT_TIME."""
+        self.settings.max_wait_times = {'Twino': 5}
+        self.assertEqual(
+            self.worker.get_platform_instance('Twino').max_wait_time, 5)
+        self.assertEqual(
+            self.worker.get_platform_instance('Robocash').max_wait_time,
+            easyp2p.platforms.Robocash.MAX_WAIT_TIME)
+
+    def test_platform_failed_traceback_at_debug(self):
+        """Test that the traceback of a failed platform is a debug message."""
+        logging.disable(logging.NOTSET)
+        self.addCleanup(logging.disable, logging.CRITICAL)
+        try:
+            raise PlatformFailedError('Login failed!')
+        except PlatformFailedError as err:
+            with self.assertLogs('easyp2p.p2p_worker', logging.DEBUG) as logs:
+                # pylint: disable=protected-access
+                self.worker._platform_failed('Bondora', err)
+        self.assertEqual(
+            [(rec.levelno, rec.getMessage()) for rec in logs.records],
+            [(logging.ERROR, 'Evaluation of Bondora failed: Login failed!'),
+             (logging.DEBUG, 'Traceback:')])
+        self.assertIsNone(logs.records[0].exc_info)
+        self.assertIsNotNone(logs.records[1].exc_info)
+
     @patch('easyp2p.p2p_worker.p2p_platforms.Bondora.parse_statement')
     @patch('easyp2p.p2p_worker.p2p_platforms.Bondora._session_download')
     def test_evaluate_requests_platform(self, mock_download, mock_parse):
@@ -106,6 +149,214 @@ class WorkerTests(unittest.TestCase):
         mock_download.assert_called_once()
         assert not mock_parse.called
 
+    def create_statement(
+            self, name: str, modified: Optional[datetime] = None) -> None:
+        """Create a dummy account statement in a temporary directory."""
+        self.settings.directory = self.temp_dir.name
+        platform = self.worker.get_platform_instance(name)
+        with open(platform.statement, 'w') as file:
+            file.write('statement')
+        if modified:
+            timestamp = modified.timestamp()
+            os.utime(platform.statement, (timestamp, timestamp))
+
+    def copy_statement(
+            self, name: str, date_range: Tuple[date, date],
+            input_file: str) -> str:
+        """Copy input_file to the statement location for date_range."""
+        self.settings.directory = self.temp_dir.name
+        self.worker.get_statement_location(name)
+        statement = os.path.join(
+            self.temp_dir.name, name.lower(),
+            f'{name.lower()}_statement_{date_range[0]:%Y%m%d}-'
+            f'{date_range[1]:%Y%m%d}{os.path.splitext(input_file)[1]}')
+        shutil.copyfile(input_file, statement)
+        return statement
+
+    @patch('easyp2p.p2p_worker.p2p_platforms.Bondora._session_download')
+    def test_reuse_statement(self, mock_download):
+        """Test that a valid existing statement is not downloaded again."""
+        self.settings.reuse_statements = True
+        self.create_statement('Bondora')
+        self.worker.download_statement('Bondora')
+        mock_download.assert_not_called()
+
+    @patch('easyp2p.p2p_worker.p2p_platforms.Bondora._session_download')
+    def test_reuse_statement_disabled(self, mock_download):
+        """Test that statements are downloaded if reuse is disabled."""
+        self.create_statement('Bondora')
+        self.worker.download_statement('Bondora')
+        mock_download.assert_called_once()
+
+    @patch('easyp2p.p2p_worker.p2p_platforms.Bondora._session_download')
+    def test_reuse_statement_expired(self, mock_download):
+        """Test that statements older than the maximal age are replaced."""
+        self.settings.reuse_statements = True
+        self.settings.statement_max_age = timedelta(days=1)
+        self.create_statement('Bondora', datetime.now() - timedelta(days=2))
+        self.worker.download_statement('Bondora')
+        mock_download.assert_called_once()
+
+    @patch('easyp2p.p2p_worker.p2p_platforms.Bondora._session_download')
+    def test_reuse_statement_incomplete(self, mock_download):
+        """Test that statements downloaded within the date range are
+        replaced since they may be incomplete."""
+        self.settings.reuse_statements = True
+        self.create_statement('Bondora', datetime(2018, 12, 15))
+        self.worker.download_statement('Bondora')
+        mock_download.assert_called_once()
+
+    @patch('easyp2p.p2p_worker.p2p_platforms.Estateguru._session_download')
+    def test_incremental_download(self, mock_download):
+        """Test that only the missing part of the date range is downloaded."""
+        self.settings.incremental_download = True
+        self.copy_statement(
+            'Estateguru', (date(2018, 9, 1), date(2018, 10, 31)),
+            INPUT_PREFIX + 'estateguru_parser_missing_month.csv')
+        platform = self.worker.download_statement('Estateguru')
+        self.assertEqual(
+            [part.date_range for part in platform.parts],
+            [(date(2018, 9, 1), date(2018, 10, 31)),
+             (date(2018, 11, 1), date(2018, 12, 31))])
+        mock_download.assert_called_once()
+        self.assertTrue(platform.parts[1].statement.endswith(
+            'estateguru_statement_20181101-20181231.csv'))
+
+    @patch('easyp2p.p2p_worker.p2p_platforms.Estateguru._session_download')
+    def test_incremental_download_merge(self, mock_download):
+        """Test that the merged parts are equal to the full statement."""
+        self.settings.incremental_download = True
+        input_file = INPUT_PREFIX + 'estateguru_parser_missing_month.csv'
+        for date_range in (
+                (date(2018, 8, 1), date(2018, 10, 15)),
+                (date(2018, 10, 16), date(2019, 3, 31))):
+            self.copy_statement('Estateguru', date_range, input_file)
+        # Statements downloaded before the end of their date range are
+        # ignored since they may be incomplete
+        stale = self.copy_statement(
+            'Estateguru', (date(2018, 9, 1), date(2018, 12, 31)),
+            INPUT_PREFIX + 'estateguru_parser_unknown_cf.csv')
+        timestamp = datetime(2018, 12, 1).timestamp()
+        os.utime(stale, (timestamp, timestamp))
+
+        platform = self.worker.download_statement('Estateguru')
+        mock_download.assert_not_called()
+        self.assertEqual(len(platform.parts), 2)
+        df, unknown_cf_types = platform.parse_statement()
+
+        expected = easyp2p.platforms.Estateguru(
+            self.settings.date_range, os.path.splitext(stale)[0])
+        df_expected, unknown_expected = expected.parse_statement(input_file)
+        pd.testing.assert_frame_equal(df, df_expected)
+        self.assertEqual(unknown_cf_types, unknown_expected)
+
+    def test_split_date_range(self):
+        """Test splitting date ranges into month, quarter and year chunks."""
+        date_range = (date(2018, 11, 15), date(2020, 2, 10))
+        self.assertEqual(split_date_range(date_range, None), [date_range])
+        self.assertEqual(len(split_date_range(date_range, 'month')), 16)
+        self.assertEqual(split_date_range(date_range, 'quarter'), [
+            (date(2018, 11, 15), date(2018, 12, 31)),
+            (date(2019, 1, 1), date(2019, 3, 31)),
+            (date(2019, 4, 1), date(2019, 6, 30)),
+            (date(2019, 7, 1), date(2019, 9, 30)),
+            (date(2019, 10, 1), date(2019, 12, 31)),
+            (date(2020, 1, 1), date(2020, 2, 10))])
+        self.assertEqual(split_date_range(date_range, 'year'), [
+            (date(2018, 11, 15), date(2018, 12, 31)),
+            (date(2019, 1, 1), date(2019, 12, 31)),
+            (date(2020, 1, 1), date(2020, 2, 10))])
+        self.assertRaises(ValueError, split_date_range, date_range, 'week')
+
+    @patch(
+        'easyp2p.p2p_worker.p2p_platforms.Estateguru._session_download',
+        autospec=True)
+    def test_chunked_download(self, mock_download):
+        """Test that only missing chunks are downloaded and that a failed
+        chunk can be retried without downloading the other chunks again."""
+        self.settings.chunk_size = 'month'
+        self.settings.reuse_statements = True
+        self.copy_statement(
+            'Estateguru', (date(2018, 10, 1), date(2018, 10, 31)),
+            INPUT_PREFIX + 'estateguru_parser_missing_month.csv')
+
+        def download(platform, _):
+            if platform.date_range[0] == date(2018, 11, 1):
+                raise PlatformFailedError('Download failed')
+            with open(platform.statement, 'w') as file:
+                file.write('statement')
+
+        mock_download.side_effect = download
+        self.assertRaises(
+            PlatformFailedError, self.worker.download_statement, 'Estateguru')
+        self.assertEqual(mock_download.call_count, 2)
+
+        mock_download.reset_mock()
+        mock_download.side_effect = None
+        platform = self.worker.download_statement('Estateguru')
+        self.assertEqual(
+            [call[0][0].date_range for call in mock_download.call_args_list],
+            [(date(2018, 11, 1), date(2018, 11, 30)),
+             (date(2018, 12, 1), date(2018, 12, 31))])
+        self.assertEqual(len(platform.parts), 4)
+
+    @patch(
+        'easyp2p.p2p_worker.p2p_platforms.Estateguru._session_download',
+        autospec=True)
+    def test_chunked_download_without_reuse(self, mock_download):
+        """
+        Test that chunking alone does not reuse existing statements and that
+        the additional chunks are added to the progress bar.
+        """
+        self.settings.chunk_size = 'month'
+        self.copy_statement(
+            'Estateguru', (date(2018, 10, 1), date(2018, 10, 31)),
+            INPUT_PREFIX + 'estateguru_parser_missing_month.csv')
+        with patch.object(
+                self.worker.signals, 'add_progress_steps') as mock_steps:
+            self.worker.download_statement('Estateguru')
+        self.assertEqual(mock_download.call_count, 4)
+        mock_steps.emit.assert_called_once_with(3 * DOWNLOAD_STEPS)
+
+    @patch(
+        'easyp2p.p2p_worker.p2p_platforms.Bondora._session_download',
+        autospec=True)
+    def test_chunked_download_parallel(self, mock_download):
+        """Test that chunks are downloaded concurrently if possible."""
+        self.settings.chunk_size = 'month'
+        threads = set()
+        barrier = threading.Barrier(self.settings.max_workers, timeout=5)
+
+        def download(*_):
+            threads.add(threading.get_ident())
+            barrier.wait()
+
+        mock_download.side_effect = download
+        self.settings.directory = self.temp_dir.name
+        self.worker.download_statement('Bondora')
+        self.assertEqual(mock_download.call_count, 4)
+        self.assertEqual(len(threads), 4)
+
+    def test_chunked_download_statement_without_date_range(self):
+        """
+        Test that a statement whose name does not contain its date range is
+        downloaded and parsed as a whole.
+        """
+        self.settings.chunk_size = 'month'
+        statement = os.path.join(self.temp_dir.name, 'bondora')
+        platform = easyp2p.platforms.Bondora(
+            self.settings.date_range, statement)
+        self.assertIsNone(platform.get_statement_parts(chunk_size='month'))
+        self.assertEqual(self.worker.get_downloads(platform), [platform])
+        self.assertIsNone(platform.parts)
+
+    def test_chunked_download_invalid_chunk_size(self):
+        """Test that an invalid chunk size fails the platform."""
+        self.settings.chunk_size = 'week'
+        self.settings.directory = self.temp_dir.name
+        self.assertRaises(
+            PlatformFailedError, self.worker.download_statement, 'Bondora')
+
     @patch('easyp2p.p2p_worker.write_results')
     @patch('easyp2p.p2p_worker.p2p_platforms.Bondora.parse_statement')
     @patch('easyp2p.p2p_worker.p2p_platforms.Bondora.download_statement')
@@ -163,11 +414,11 @@ class WorkerTests(unittest.TestCase):
 
     @patch('easyp2p.p2p_worker.WorkerThread.signals.add_progress_text')
     @patch('easyp2p.p2p_worker.write_results')
-    @patch('easyp2p.p2p_worker.WorkerThread.evaluate_platform')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
     def test_run_no_results(
-            self, mock_eval, mock_write_results, mock_text):
+            self, mock_download, mock_write_results, mock_text):
         """Test writing results when there were none."""
-        mock_eval.side_effect = PlatformFailedError
+        mock_download.side_effect = PlatformFailedError
         mock_write_results.return_value = False
         self.worker.run()
         mock_write_results.assert_called_once_with(
@@ -175,6 +426,319 @@ class WorkerTests(unittest.TestCase):
             self.settings.date_range)
         mock_text.emit.assert_called_with('No results available!', True)
 
+    @patch('easyp2p.p2p_worker.preload_credentials')
+    @patch('easyp2p.p2p_worker.ask_user_for_credentials')
+    @patch('easyp2p.p2p_worker.get_all_credentials_from_keyring')
+    def test_preflight_credentials(
+            self, mock_keyring, mock_ask_user, mock_preload):
+        """Test that all missing credentials are resolved up front."""
+        self.settings.reuse_statements = True
+        self.create_statement('Mintos')
+        mock_keyring.return_value = {'Bondora': ('User1', 'Pass1')}
+        mock_ask_user.side_effect = [('User2', 'Pass2'), (None, None)]
+
+        self.worker.preflight_credentials(
+            ['Bondora', 'Grupeer', 'Iuvo', 'Mintos', 'Unknown'])
+
+        # Mintos can reuse its statement and Unknown does not exist
+        mock_keyring.assert_called_once_with(['Bondora', 'Grupeer', 'Iuvo'])
+        self.assertEqual(
+            [args[0][0] for args in mock_ask_user.call_args_list],
+            ['Grupeer', 'Iuvo'])
+        mock_preload.assert_called_once_with({
+            'Bondora': ('User1', 'Pass1'), 'Grupeer': ('User2', 'Pass2'),
+            'Iuvo': ('', '')})
+
+    @patch('easyp2p.p2p_worker.preload_credentials')
+    @patch('easyp2p.p2p_worker.ask_user_for_credentials')
+    @patch('easyp2p.p2p_worker.get_all_credentials_from_keyring')
+    @patch('easyp2p.p2p_worker.WorkerThread.get_downloads')
+    def test_preflight_credentials_without_reuse(
+            self, mock_downloads, mock_keyring, mock_ask_user, _):
+        """
+        Test that the downloads are not planned if statements are never
+        reused.
+        """
+        self.create_statement('Mintos')
+        mock_keyring.return_value = {
+            'Bondora': ('User1', 'Pass1'), 'Mintos': ('User2', 'Pass2')}
+        self.worker.preflight_credentials(['Bondora', 'Mintos', 'Unknown'])
+        mock_downloads.assert_not_called()
+        mock_keyring.assert_called_once_with(['Bondora', 'Mintos'])
+        mock_ask_user.assert_not_called()
+
+    @patch('easyp2p.p2p_worker.preload_credentials')
+    @patch('easyp2p.p2p_worker.get_all_credentials_from_keyring')
+    def test_preflight_credentials_plans_once(self, mock_keyring, _):
+        """Test that the download stage uses the plans of the preflight."""
+        self.settings.reuse_statements = True
+        self.create_statement('Mintos')
+        mock_keyring.return_value = {'Bondora': ('User1', 'Pass1')}
+        with patch.object(
+                self.worker, 'get_downloads',
+                wraps=self.worker.get_downloads) as mock_downloads:
+            self.worker.preflight_credentials(['Bondora', 'Mintos'])
+            self.assertEqual(mock_downloads.call_count, 2)
+            bondora, downloads = self.worker.prepare_download('Bondora')
+            self.assertEqual(downloads, [bondora])
+            self.assertEqual(self.worker.prepare_download('Mintos')[1], [])
+            self.assertEqual(mock_downloads.call_count, 2)
+
+            # Without a plan the downloads are determined again
+            self.worker.prepare_download('Bondora')
+            self.assertEqual(mock_downloads.call_count, 3)
+
+    @patch('easyp2p.p2p_worker.credential_cache')
+    @patch('easyp2p.p2p_worker.clear_preloaded_credentials')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.preflight_credentials')
+    def test_run_preflight_credentials_fails(
+            self, mock_preflight, mock_download, mock_clear, mock_cache):
+        """Test that the credentials are cleared if the preflight fails."""
+        self.settings.preflight_credentials = True
+        mock_preflight.side_effect = KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            self.worker.run()
+        mock_download.assert_not_called()
+        mock_clear.assert_called_once_with()
+        mock_cache.clear.assert_called_once_with()
+
+    @patch('easyp2p.p2p_worker.credential_cache')
+    @patch('easyp2p.p2p_worker.clear_preloaded_credentials')
+    @patch('easyp2p.p2p_worker.write_results')
+    @patch('easyp2p.p2p_worker.WorkerThread.parse_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.preflight_credentials')
+    def test_run_preflight_credentials(
+            self, mock_preflight, mock_download, mock_parse,
+            mock_write_results, mock_clear, mock_cache):
+        """Test that the credentials are resolved before the downloads."""
+        self.settings.preflight_credentials = True
+        self.settings.platforms = {'Bondora'}
+        mock_preflight.side_effect = \
+            lambda _: mock_download.assert_not_called()
+        mock_download.return_value = 'Bondora'
+        mock_parse.return_value = pd.DataFrame()
+        mock_write_results.return_value = True
+        self.worker.run()
+        mock_preflight.assert_called_once_with({'Bondora'})
+        mock_download.assert_called_once_with('Bondora')
+        mock_clear.assert_called_once()
+        mock_cache.clear.assert_called_once_with()
+
+    def test_split_platforms(self):
+        """Test that only session platforms are evaluated concurrently."""
+        concurrent, serial = self.worker.split_platforms()
+        self.assertEqual(
+            concurrent,
+            ['Bondora', 'DoFinance', 'Estateguru', 'PeerBerry', 'Robocash',
+             'Twino', 'Viainvest', 'Viventor'])
+        self.assertEqual(serial, ['Grupeer', 'Iuvo', 'Mintos', 'Swaper'])
+
+    def test_split_platforms_no_concurrency(self):
+        """Test split_platforms if concurrent evaluation is disabled."""
+        self.settings.max_workers = 1
+        concurrent, serial = self.worker.split_platforms()
+        self.assertEqual(concurrent, [])
+        self.assertEqual(serial, sorted(self.settings.platforms))
+
+    def test_split_browser_platforms(self):
+        """Test that only headless webdriver platforms run in parallel."""
+        _, serial = self.worker.split_platforms()
+        browser, serial = self.worker.split_browser_platforms(serial, 2)
+        self.assertEqual(browser, ['Iuvo', 'Swaper'])
+        self.assertEqual(serial, ['Grupeer', 'Mintos'])
+        browser, serial = self.worker.split_browser_platforms(serial, 1)
+        self.assertEqual(browser, [])
+
+    @patch('easyp2p.p2p_worker.get_browser_slots')
+    def test_browser_slots(self, mock_slots):
+        """Test that visible browsers are never run in parallel."""
+        mock_slots.return_value = 3
+        self.settings.max_browsers = 3
+        self.assertEqual(self.worker.browser_slots(), 3)
+        mock_slots.assert_called_once_with(3, None, None)
+        self.settings.headless = False
+        self.assertEqual(self.worker.browser_slots(), 1)
+
+    @patch('easyp2p.p2p_worker.write_results')
+    @patch('easyp2p.p2p_worker.WorkerThread.parse_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.browser_slots')
+    def test_run_parallel_browsers(
+            self, mock_slots, mock_download, mock_parse, mock_write_results):
+        """
+        Test that headless webdriver platforms are downloaded side by side
+        and recaptcha platforms in the worker thread.
+        """
+        mock_slots.return_value = 2
+        self.settings.platforms = {'Grupeer', 'Iuvo', 'Mintos', 'Swaper'}
+        barrier = threading.Barrier(2, timeout=5)
+        download_threads = dict()
+
+        def download(name):
+            download_threads[name] = threading.current_thread()
+            if name in ('Iuvo', 'Swaper'):
+                barrier.wait()
+            return name
+
+        mock_download.side_effect = download
+        mock_parse.side_effect = lambda name, _: pd.DataFrame([name])
+        mock_write_results.return_value = True
+        self.worker.run()
+        for name in ('Grupeer', 'Mintos'):
+            self.assertIs(download_threads[name], threading.current_thread())
+        self.assertIsNot(download_threads['Iuvo'], download_threads['Swaper'])
+        self.assertEqual(
+            sorted(self.worker.df_result[0]), sorted(self.settings.platforms))
+
+    @patch('easyp2p.p2p_worker.write_results')
+    @patch('easyp2p.p2p_worker.WorkerThread.parse_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
+    def test_run_concurrent_platforms(
+            self, mock_download, mock_parse, mock_write_results):
+        """
+        Test that session platforms are not downloaded in the worker thread
+        and that all statements are parsed in a separate parser thread.
+        """
+        download_threads = dict()
+        parse_threads = set()
+
+        def download(name):
+            download_threads[name] = threading.current_thread()
+            return name
+
+        def parse(name, _):
+            parse_threads.add(threading.current_thread())
+            return pd.DataFrame([name])
+
+        mock_download.side_effect = download
+        mock_parse.side_effect = parse
+        mock_write_results.return_value = True
+        self.worker.run()
+        concurrent, serial = self.worker.split_platforms()
+        for name in serial:
+            self.assertIs(download_threads[name], threading.current_thread())
+        for name in concurrent:
+            self.assertIsNot(
+                download_threads[name], threading.current_thread())
+        self.assertEqual(len(parse_threads), 1)
+        self.assertNotIn(threading.current_thread(), parse_threads)
+        self.assertEqual(
+            sorted(self.worker.df_result[0]), sorted(self.settings.platforms))
+
+    @unittest.skipUnless(ASYNC_AVAILABLE, 'httpx is not installed')
+    @patch('easyp2p.p2p_worker.write_results')
+    @patch('easyp2p.p2p_worker.WorkerThread.parse_statement')
+    @patch('easyp2p.platforms.base_platform.BasePlatform.'
+           'async_download_statement', autospec=True)
+    def test_run_async_platforms(
+            self, mock_download, mock_parse, mock_write_results):
+        """
+        Test that all platforms supporting the asyncio engine are downloaded
+        concurrently in a single thread.
+        """
+        self.settings.async_sessions = True
+        self.settings.directory = self.temp_dir.name
+        self.settings.platforms = {'Bondora', 'Estateguru', 'Twino', 'Iuvo'}
+        download_threads = dict()
+        started = set()
+
+        async def download(platform):
+            download_threads[platform.NAME] = threading.current_thread()
+            started.add(platform.NAME)
+            # Only finishes if all downloads run concurrently
+            while len(started) < 3:
+                await asyncio.sleep(0.01)
+
+        mock_download.side_effect = download
+        mock_parse.side_effect = lambda name, _: pd.DataFrame([name])
+        mock_write_results.return_value = True
+        with patch('easyp2p.p2p_worker.p2p_platforms.Iuvo.download_statement'):
+            self.worker.run()
+
+        self.assertEqual(
+            self.worker.split_async_platforms(),
+            (['Bondora', 'Estateguru', 'Twino'], ['Iuvo']))
+        self.assertEqual(set(download_threads), {
+            'Bondora', 'Estateguru', 'Twino'})
+        self.assertEqual(len(set(download_threads.values())), 1)
+        self.assertNotIn(
+            threading.current_thread(), download_threads.values())
+        self.assertEqual(
+            sorted(self.worker.df_result[0]), sorted(self.settings.platforms))
+
+    @patch('easyp2p.p2p_worker.WorkerThread.signals.add_progress_text')
+    @patch('easyp2p.p2p_worker.write_results')
+    @patch('easyp2p.p2p_worker.WorkerThread.parse_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
+    def test_run_concurrent_platform_fails(
+            self, mock_download, mock_parse, mock_write_results, mock_text):
+        """Test that a failing concurrent platform is ignored."""
+        self.settings.platforms = {'Bondora', 'Twino'}
+
+        def download(name):
+            if name == 'Twino':
+                raise PlatformFailedError('Test error')
+            return name
+
+        mock_download.side_effect = download
+        mock_parse.side_effect = lambda name, _: pd.DataFrame([name])
+        mock_write_results.return_value = True
+        self.worker.run()
+        self.assertEqual(list(self.worker.df_result[0]), ['Bondora'])
+        mock_parse.assert_called_once_with('Bondora', 'Bondora')
+        mock_text.emit.assert_any_call('Test error', True)
+        mock_text.emit.assert_any_call('Twino will be ignored!', True)
+
+    @patch('easyp2p.p2p_worker.WorkerThread.signals.add_progress_text')
+    @patch('easyp2p.p2p_worker.write_results')
+    @patch('easyp2p.p2p_worker.WorkerThread.parse_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
+    def test_run_network_error(
+            self, mock_download, mock_parse, mock_write_results, mock_text):
+        """
+        Test that a network error only fails its platform and does not abort
+        the evaluation.
+        """
+        self.settings.platforms = {'Bondora', 'Iuvo', 'Twino'}
+
+        def download(name):
+            if name == 'Twino':
+                raise requests.exceptions.ConnectionError('Connection reset')
+            return name
+
+        mock_download.side_effect = download
+        mock_parse.side_effect = lambda name, _: pd.DataFrame([name])
+        mock_write_results.return_value = True
+        self.worker.run()
+        self.assertEqual(
+            sorted(self.worker.df_result[0]), ['Bondora', 'Iuvo'])
+        mock_text.emit.assert_any_call('Twino: Connection reset', True)
+        mock_text.emit.assert_any_call('Twino will be ignored!', True)
+
+    @patch('easyp2p.p2p_worker.WorkerThread.signals.add_progress_text')
+    @patch('easyp2p.p2p_worker.write_results')
+    @patch('easyp2p.p2p_worker.WorkerThread.parse_statement')
+    @patch('easyp2p.p2p_worker.WorkerThread.download_statement')
+    def test_run_parser_stage_fails(
+            self, mock_download, mock_parse, mock_write_results, mock_text):
+        """Test that a platform is ignored if its parser stage fails."""
+        self.settings.platforms = {'Bondora', 'Twino'}
+
+        def parse(name, _):
+            if name == 'Twino':
+                raise PlatformFailedError('Test error')
+            return pd.DataFrame([name])
+
+        mock_download.side_effect = lambda name: name
+        mock_parse.side_effect = parse
+        mock_write_results.return_value = True
+        self.worker.run()
+        self.assertEqual(list(self.worker.df_result[0]), ['Bondora'])
+        mock_write_results.assert_called_once()
+        mock_text.emit.assert_any_call('Twino will be ignored!', True)
+
 
 if __name__ == "__main__":
     unittest.main()